@@ -0,0 +1,243 @@
+"""
+Subidas reanudables por trozos (al estilo del protocolo tus)
+
+El cliente crea la subida indicando el tamaño total y después envía trozos
+con su posición (Upload-Offset) y, opcionalmente, su checksum
+(Upload-Checksum: sha1 <base64>). Los trozos pueden llegar en cualquier
+orden y en paralelo: cada uno se comprueba y se escribe en su sitio de un
+fichero ya reservado con el tamaño final, sin pasar entero por memoria, y
+la subida recuerda qué rangos han llegado para poder reanudarla.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, List, Optional
+import base64
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+# Tamaño de trozo que se sugiere al cliente
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Lo que se lee de la petición en cada escritura
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Subidas sin actividad que se borran en cleanup()
+UPLOAD_EXPIRATION = timedelta(days=1)
+
+CHECKSUM_ALGORITHMS = {"sha1": hashlib.sha1, "sha256": hashlib.sha256, "md5": hashlib.md5}
+
+class ChecksumMismatchError(ValueError):
+    """El trozo recibido no coincide con su Upload-Checksum"""
+
+class UploadOffsetError(ValueError):
+    """El trozo no cabe en el fichero o su tamaño no es el anunciado"""
+
+def _merge_ranges(ranges: List[List[int]]) -> List[List[int]]:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def parse_checksum(header: Optional[str]):
+    """'sha1 <base64>' -> (algoritmo, digest en bytes); None si no hay cabecera"""
+    if not header:
+        return None
+    try:
+        algorithm, value = header.strip().split(" ", 1)
+        digest = base64.b64decode(value.strip(), validate=True)
+    except ValueError:
+        raise ValueError(f"Upload-Checksum no válido: {header}")
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise ValueError(f"Algoritmo de checksum no soportado: {algorithm}")
+    return algorithm, digest
+
+class UploadStore:
+    """Subidas en curso en una carpeta: .<id>.part (datos) y .<id>.json (estado)"""
+    
+    def __init__(self, folder: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.folder = folder
+        self.chunk_size = chunk_size
+        self._thread_lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+    
+    def _path(self, upload_id: str, suffix: str) -> str:
+        return os.path.join(self.folder, f".{upload_id}{suffix}")
+    
+    @contextmanager
+    def _upload_lock(self, upload_id: str):
+        """Cerrojo entre hilos y procesos sobre el estado de una subida"""
+        with self._thread_lock:
+            with open(self._path(upload_id, ".lock"), 'a') as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                yield
+    
+    def _save(self, info: Dict):
+        meta_file = self._path(info["id"], ".json")
+        tmp_file = f"{meta_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        os.replace(tmp_file, meta_file)
+    
+    def create(self, filename: str, size: int) -> Dict:
+        """Registra una subida nueva y reserva en disco su tamaño final"""
+        if size < 0:
+            raise ValueError("Upload-Length no válido")
+        upload_id = uuid.uuid4().hex
+        with open(self._path(upload_id, ".part"), 'wb') as f:
+            if hasattr(os, "posix_fallocate") and size:
+                try:
+                    # Reserva los bloques de verdad: sin fragmentar y sin
+                    # quedarse sin espacio a mitad de la subida
+                    os.posix_fallocate(f.fileno(), 0, size)
+                except OSError:
+                    f.truncate(size)
+            else:
+                f.truncate(size)
+        now = datetime.now().isoformat()
+        info = {"id": upload_id, "filename": filename, "size": size,
+                "received": [], "created_at": now, "updated_at": now}
+        self._save(info)
+        return info
+    
+    def get(self, upload_id: str) -> Optional[Dict]:
+        """Estado de la subida, o None si no existe"""
+        if not upload_id.isalnum():
+            return None
+        try:
+            with open(self._path(upload_id, ".json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def offset(info: Dict) -> int:
+        """Bytes recibidos seguidos desde el principio (Upload-Offset de tus)"""
+        received = info["received"]
+        return received[0][1] if received and received[0][0] == 0 else 0
+    
+    @staticmethod
+    def is_complete(info: Dict) -> bool:
+        return UploadStore.offset(info) == info["size"]
+    
+    def write_chunk(self, upload_id: str, offset: int, stream: BinaryIO,
+                    length: int, checksum: Optional[str] = None) -> Dict:
+        """
+        Copia un trozo de la petición a su posición del fichero
+        
+        Se lee en bloques de COPY_BUFFER_SIZE, así que nunca está entero en
+        memoria. El trozo pasa primero por un fichero temporal y solo se copia
+        al .part cuando han llegado todos sus bytes y el checksum coincide:
+        un trozo rechazado no toca lo ya recibido (el cliente debe
+        reenviarlo). Devuelve el estado actualizado.
+        """
+        info = self.get(upload_id)
+        if info is None:
+            raise KeyError(upload_id)
+        expected = parse_checksum(checksum)
+        if offset < 0 or length < 0 or offset + length > info["size"]:
+            raise UploadOffsetError(f"El trozo {offset}+{length} no cabe en {info['size']} bytes")
+        
+        hasher = CHECKSUM_ALGORITHMS[expected[0]]() if expected else None
+        written = 0
+        chunk_file = self._path(upload_id, f".{offset}.{os.getpid()}.{threading.get_ident()}.chunk")
+        try:
+            with open(chunk_file, 'w+b') as chunk:
+                while written < length:
+                    block = stream.read(min(COPY_BUFFER_SIZE, length - written))
+                    if not block:
+                        break
+                    chunk.write(block)
+                    if hasher:
+                        hasher.update(block)
+                    written += len(block)
+                if written != length:
+                    raise UploadOffsetError(f"Se esperaban {length} bytes y llegaron {written}")
+                if hasher and hasher.digest() != expected[1]:
+                    raise ChecksumMismatchError(f"Checksum incorrecto en el trozo {offset}+{length}")
+                
+                chunk.seek(0)
+                with open(self._path(upload_id, ".part"), 'r+b') as f:
+                    f.seek(offset)
+                    while True:
+                        block = chunk.read(COPY_BUFFER_SIZE)
+                        if not block:
+                            break
+                        f.write(block)
+                    f.flush()
+                    os.fsync(f.fileno())
+        finally:
+            try:
+                os.remove(chunk_file)
+            except FileNotFoundError:
+                pass
+        
+        with self._upload_lock(upload_id):
+            info = self.get(upload_id)
+            if info is None:
+                raise KeyError(upload_id)
+            if length:
+                info["received"] = _merge_ranges(info["received"] + [[offset, offset + length]])
+            info["updated_at"] = datetime.now().isoformat()
+            self._save(info)
+        return info
+    
+    def finish(self, upload_id: str, dest_path: str) -> str:
+        """Mueve la subida completa a dest_path y olvida su estado"""
+        with self._upload_lock(upload_id):
+            info = self.get(upload_id)
+            if info is None:
+                raise KeyError(upload_id)
+            if not self.is_complete(info):
+                raise UploadOffsetError(f"Faltan datos: {self.offset(info)} de {info['size']} bytes")
+            os.replace(self._path(upload_id, ".part"), dest_path)
+            os.remove(self._path(upload_id, ".json"))
+        self._remove_lock(upload_id)
+        return dest_path
+    
+    def delete(self, upload_id: str) -> bool:
+        """Cancela la subida y borra lo recibido"""
+        if self.get(upload_id) is None:
+            return False
+        with self._upload_lock(upload_id):
+            for suffix in (".part", ".json"):
+                try:
+                    os.remove(self._path(upload_id, suffix))
+                except FileNotFoundError:
+                    pass
+        self._remove_lock(upload_id)
+        return True
+    
+    def _remove_lock(self, upload_id: str):
+        try:
+            os.remove(self._path(upload_id, ".lock"))
+        except FileNotFoundError:
+            pass
+    
+    def cleanup(self) -> int:
+        """Borra las subidas abandonadas (sin trozos desde UPLOAD_EXPIRATION)"""
+        limit = (datetime.now() - UPLOAD_EXPIRATION).isoformat()
+        removed = 0
+        for name in os.listdir(self.folder):
+            if name.startswith('.') and name.endswith('.chunk'):
+                # Trozos a medio recibir de un proceso que terminó
+                path = os.path.join(self.folder, name)
+                if datetime.fromtimestamp(os.path.getmtime(path)).isoformat() < limit:
+                    os.remove(path)
+            elif name.startswith('.') and name.endswith('.json'):
+                info = self.get(name[1:-len('.json')])
+                if info and info["updated_at"] < limit and self.delete(info["id"]):
+                    removed += 1
+        return removed
@@ -0,0 +1,173 @@
+"""
+Episodio del podcast e identificadores de episodio
+"""
+from datetime import datetime
+from typing import Callable, List, Dict, Optional
+import hashlib
+import uuid
+
+class Episode:
+    # Sin __dict__ por episodio: el catálogo completo vive en memoria
+    __slots__ = ('id', 'title', 'audio_url', 'duration', '_pub_date',
+                 'episode_number', 'season', '_description', '_tracklist',
+                 '_content', 'updated_at', '__weakref__')
+    
+    def __init__(self, title: str, description: str, audio_url: str, 
+                 duration: str, pub_date: datetime, episode_number: int = None,
+                 season: int = None, tracklist: List[str] = None,
+                 id: str = None, updated_at: str = None):
+        self.id = id  # Identificador estable, lo asigna EpisodeManager
+        self.title = title
+        self._description = description
+        self.audio_url = audio_url
+        self.duration = duration  # Formato HH:MM:SS
+        self.pub_date = pub_date
+        self.episode_number = episode_number
+        self.season = season
+        self._tracklist = tracklist or []
+        # Descripción y tracklist pueden quedarse en disco: _content es la
+        # pareja (posición, loader) que las lee a través de una LRU acotada.
+        # Va en un solo atributo para que otro hilo nunca vea la posición de
+        # un snapshot con el loader de otro
+        self._content = None
+        # Marca ISO (con microsegundos) de la última modificación, la asigna
+        # el gestor al guardar; permite pedir solo lo que ha cambiado
+        self.updated_at = updated_at
+    
+    @property
+    def pub_date(self) -> datetime:
+        # Desde el snapshot binario llega como texto ISO y se decodifica al usarla
+        value = self._pub_date
+        if isinstance(value, str):
+            value = self._pub_date = datetime.fromisoformat(value)
+        return value
+    
+    @pub_date.setter
+    def pub_date(self, value: datetime):
+        self._pub_date = value
+    
+    def pub_date_iso(self) -> str:
+        """Fecha de publicación en ISO 8601 sin decodificarla si no hace falta"""
+        value = self._pub_date
+        return value if isinstance(value, str) else value.isoformat()
+    
+    @classmethod
+    def lazy(cls, title: str, audio_url: str, duration: str, pub_date,
+             episode_number: int, season: int, id: str,
+             content_ref, content_loader: Callable,
+             updated_at: str = None) -> 'Episode':
+        """Crea un episodio cuya descripción y tracklist se cargan bajo demanda"""
+        episode = cls(title, None, audio_url, duration, pub_date,
+                      episode_number, season, None, id, updated_at)
+        episode._tracklist = None
+        episode._content = (content_ref, content_loader)
+        return episode
+    
+    @property
+    def _content_ref(self):
+        return self._content[0] if self._content is not None else None
+    
+    @property
+    def _content_loader(self) -> Optional[Callable]:
+        return self._content[1] if self._content is not None else None
+    
+    def _stored_content(self) -> Optional[Dict]:
+        content = self._content
+        return content[1](content[0]) if content is not None else None
+    
+    def _load_content(self):
+        """Trae a memoria la descripción y la tracklist antes de modificarlas"""
+        content = self._stored_content()
+        if content is not None:
+            if self._description is None:
+                self._description = content["description"]
+            if self._tracklist is None:
+                self._tracklist = list(content.get("tracklist") or [])
+            self._content = None
+    
+    @property
+    def description(self) -> str:
+        description = self._description
+        if description is None:
+            content = self._stored_content()
+            if content is not None:
+                return content["description"]
+        return description
+    
+    @description.setter
+    def description(self, value: str):
+        self._load_content()
+        self._description = value
+    
+    @property
+    def tracklist(self) -> List[str]:
+        tracklist = self._tracklist
+        if tracklist is None:
+            # La lista leída se queda en el episodio: los cambios sobre ella
+            # (append, etc.) se guardan igual que con la tracklist en memoria
+            content = self._stored_content()
+            tracklist = self._tracklist = list(content.get("tracklist") or []) if content is not None else []
+        return tracklist
+    
+    @tracklist.setter
+    def tracklist(self, value: List[str]):
+        self._load_content()
+        self._tracklist = value or []
+    
+    def copy(self) -> 'Episode':
+        """Copia para cambiar el episodio sin tocar el que ya ven otros hilos"""
+        episode = Episode.__new__(Episode)
+        for name in Episode.__slots__:
+            if name != '__weakref__':
+                setattr(episode, name, getattr(self, name))
+        if episode._tracklist is not None:
+            episode._tracklist = list(episode._tracklist)
+        return episode
+    
+    def to_dict(self) -> Dict:
+        description, tracklist = self._description, self._tracklist
+        if description is None or tracklist is None:
+            content = self._stored_content()
+            if content is not None:
+                if description is None:
+                    description = content["description"]
+                if tracklist is None:
+                    tracklist = content.get("tracklist") or []
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": description,
+            "audio_url": self.audio_url,
+            "duration": self.duration,
+            "pub_date": self.pub_date_iso(),
+            "episode_number": self.episode_number,
+            "season": self.season,
+            "tracklist": tracklist,
+            "updated_at": self.updated_at
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Episode':
+        return cls(
+            title=data["title"],
+            description=data["description"],
+            audio_url=data["audio_url"],
+            duration=data["duration"],
+            pub_date=datetime.fromisoformat(data["pub_date"]),
+            episode_number=data.get("episode_number"),
+            season=data.get("season"),
+            tracklist=data.get("tracklist", []),
+            id=data.get("id"),
+            updated_at=data.get("updated_at")
+        )
+
+def new_episode_id() -> str:
+    """Genera un identificador para un episodio nuevo"""
+    return uuid.uuid4().hex[:12]
+
+def derive_episode_id(episode: Episode, salt: int = 0) -> str:
+    """Identificador determinista para episodios guardados antes de tener id"""
+    key = f"{episode.audio_url}|{episode.pub_date.isoformat()}"
+    if salt:
+        key += f"|{salt}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
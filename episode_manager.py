@@ -1,99 +1,343 @@
 """
 Gestor de episodios del podcast
+
+El episodio está en episode.py, las consultas y el registro de cambios en
+episode_query.py y el snapshot JSON con su diario en episode_store.py; todo
+se sigue pudiendo importar desde aquí.
 """
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
-import json
-import os
+from typing import Callable, List, Dict, Optional, Tuple
+import threading
+from episode import Episode, new_episode_id, derive_episode_id
+from episode_query import (EpisodePage, EpisodeSnapshot, QUERY_MAX_LIMIT, SNAPSHOT_MAX_PENDING,
+                           to_local_datetime, to_change_stamp, new_change_stamp,
+                           encode_cursor, decode_cursor, first_not_after, first_before,
+                           position_of)
+from episode_store import (EpisodeStore, ContentCache, StoreConflictError, MAX_TOMBSTONES,
+                           BINARY_SNAPSHOT_MAGIC, BINARY_SNAPSHOT_VERSION,
+                           write_binary_snapshot, read_binary_snapshot)
 
-class Episode:
-    def __init__(self, title: str, description: str, audio_url: str, 
-                 duration: str, pub_date: datetime, episode_number: int = None,
-                 season: int = None, tracklist: List[str] = None):
-        self.title = title
-        self.description = description
-        self.audio_url = audio_url
-        self.duration = duration  # Formato HH:MM:SS
-        self.pub_date = pub_date
-        self.episode_number = episode_number
-        self.season = season
-        self.tracklist = tracklist or []
-    
-    def to_dict(self) -> Dict:
-        return {
-            "title": self.title,
-            "description": self.description,
-            "audio_url": self.audio_url,
-            "duration": self.duration,
-            "pub_date": self.pub_date.isoformat(),
-            "episode_number": self.episode_number,
-            "season": self.season,
-            "tracklist": self.tracklist
-        }
-    
-    @classmethod
-    def from_dict(cls, data: Dict) -> 'Episode':
-        return cls(
-            title=data["title"],
-            description=data["description"],
-            audio_url=data["audio_url"],
-            duration=data["duration"],
-            pub_date=datetime.fromisoformat(data["pub_date"]),
-            episode_number=data.get("episode_number"),
-            season=data.get("season"),
-            tracklist=data.get("tracklist", [])
-        )
+def run_batch(manager, operation, attempts: int = 3, on_retry: Callable = None):
+    """Ejecuta operation(manager) dentro de manager.batch() y la repite si hay conflicto.
+    
+    Tras un StoreConflictError el gestor ya tiene el estado recargado, así que
+    operation debe volver a leer los episodios en cada intento en lugar de
+    reutilizar objetos de una lectura anterior. Antes de cada reintento se
+    llama a on_retry(intento, error), si se indica; el último conflicto se
+    propaga.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            with manager.batch():
+                return operation(manager)
+        except StoreConflictError as e:
+            if attempt == attempts:
+                raise
+            if on_retry is not None:
+                on_retry(attempt, e)
 
-class EpisodeManager:
-    def __init__(self, episodes_file: str = "episodes.json"):
-        self.episodes_file = episodes_file
+class EpisodeManager(EpisodeStore):
+    """
+    Catálogo de episodios en memoria, guardado en episodes.json
+    
+    La persistencia (snapshot, diario y cerrojo entre procesos) está en
+    EpisodeStore; las lecturas usan el EpisodeSnapshot publicado
+    (ver episode_query).
+    """
+    
+    def __init__(self, episodes_file: str = "episodes.json",
+                 max_journal_bytes: int = 1024 * 1024,
+                 lazy_content: bool = False, content_cache_size: int = 256,
+                 binary_snapshot: bool = False):
+        super().__init__(episodes_file, max_journal_bytes, lazy_content,
+                         content_cache_size, binary_snapshot)
+        # Estado de trabajo de los escritores: lista siempre en orden (más
+        # recientes primero) e índice por id, que solo se tocan con el
+        # cerrojo de escritura. Las lecturas usan el EpisodeSnapshot publicado
         self.episodes: List[Episode] = []
+        self._by_id: Dict[str, Episode] = {}
+        # Dentro de batch() no se ordena ni se persiste hasta el final
+        self._batch_depth = 0
+        self._unsorted = False
+        # Dentro del proceso los escritores se serializan con _thread_lock y
+        # al soltarlo publican un EpisodeSnapshot nuevo. El hilo que escribe
+        # lee su propio estado (_working), aunque aún no esté publicado
+        self._thread_lock = threading.RLock()
+        self._writer: Optional[int] = None
+        self._writer_depth = 0
+        self._generation = 0
+        self._published = EpisodeSnapshot((), {}, 0)
+        self._working: Optional[EpisodeSnapshot] = None
+        # Altas y bajas desde el último snapshot construido, para derivar el
+        # siguiente sin copiar el catálogo; None si hay que construirlo entero
+        self._snapshot_base: Optional[EpisodeSnapshot] = None
+        self._snapshot_ops: Optional[List[Tuple[str, Episode]]] = None
         self.load_episodes()
     
-    def load_episodes(self):
-        """Carga episodios desde el archivo JSON"""
-        if os.path.exists(self.episodes_file):
+    @property
+    def generation(self) -> int:
+        """Se incrementa con cada cambio del catálogo (el que ve este hilo)"""
+        return self._read_state().generation
+    
+    @contextmanager
+    def _writing(self):
+        """Cerrojo de escritura entre hilos; al soltarlo se publica el estado nuevo"""
+        with self._thread_lock:
+            self._writer = threading.get_ident()
+            self._writer_depth += 1
             try:
-                with open(self.episodes_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.episodes = [Episode.from_dict(ep) for ep in data]
-            except Exception as e:
-                print(f"Error cargando episodios: {e}")
-                self.episodes = []
-    
-    def save_episodes(self):
-        """Guarda episodios en el archivo JSON"""
-        try:
-            with open(self.episodes_file, 'w', encoding='utf-8') as f:
-                json.dump([ep.to_dict() for ep in self.episodes], f, 
-                         indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error guardando episodios: {e}")
+                yield
+            finally:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._publish()
+                    self._writer = None
+    
+    def _build_snapshot(self) -> EpisodeSnapshot:
+        self._ensure_sorted()
+        base, ops = self._snapshot_base, self._snapshot_ops
+        if ops is not None and base is not None and base._pending + len(ops) <= SNAPSHOT_MAX_PENDING:
+            snapshot = EpisodeSnapshot(None, None, self._generation, self._tombstones,
+                                       self._change_horizon, self._last_stamp,
+                                       parent=base, ops=tuple(ops))
+        else:
+            snapshot = EpisodeSnapshot(tuple(self.episodes), dict(self._by_id), self._generation,
+                                       self._tombstones, self._change_horizon, self._last_stamp)
+        self._snapshot_base = snapshot
+        self._snapshot_ops = []
+        return snapshot
+    
+    def _publish(self):
+        published, working = self._published, self._working
+        if published.generation != self._generation or published.change_horizon != self._change_horizon:
+            if (working is not None and working.generation == self._generation
+                    and working.change_horizon == self._change_horizon):
+                self._published = working
+            else:
+                self._published = self._build_snapshot()
+        self._working = None
+    
+    def _read_state(self) -> EpisodeSnapshot:
+        """Snapshot que deben ver las lecturas de este hilo"""
+        if self._writer != threading.get_ident():
+            return self._published
+        working = self._working
+        if (working is None or working.generation != self._generation
+                or working.change_horizon != self._change_horizon):
+            working = self._working = self._build_snapshot()
+        return working
+    
+    def snapshot(self) -> EpisodeSnapshot:
+        """Estado actual del catálogo, inmutable: para varias lecturas coherentes entre sí"""
+        return self._read_state()
+    
+    def _rebuild_indexes(self):
+        """Reconstruye el índice por id y asigna id a los episodios que no lo tengan"""
+        self._by_id = {episode.id: episode for episode in self.episodes}
+        if len(self._by_id) == len(self.episodes) and None not in self._by_id:
+            return
+        
+        self._by_id = {}
+        self._snapshot_ops = None
+        self._generation += 1
+        for i, episode in enumerate(self.episodes):
+            if episode.id is None or episode.id in self._by_id:
+                # Copia: el episodio original puede estar en un snapshot publicado
+                episode = self.episodes[i] = episode.copy()
+                salt = 0
+                episode.id = derive_episode_id(episode)
+                while episode.id in self._by_id:
+                    salt += 1
+                    episode.id = derive_episode_id(episode, salt)
+            self._by_id[episode.id] = episode
+    
+    def _position(self, episode: Episode) -> int:
+        return position_of(self.episodes, episode)
+    
+    def _insertion_index(self, pub_date: datetime) -> int:
+        """Búsqueda binaria de la posición de pub_date en la lista ordenada.
+        
+        A igual fecha el nuevo episodio queda detrás de los existentes, igual
+        que con el sort estable que se usaba antes.
+        """
+        return first_before(self.episodes, pub_date)
+    
+    def _add(self, episode: Episode):
+        if episode.id is None or episode.id in self._by_id:
+            episode.id = new_episode_id()
+        if self._batch_depth:
+            # El orden se restablece una sola vez al consultar o al guardar
+            self.episodes.append(episode)
+            self._unsorted = True
+            self._snapshot_ops = None
+        else:
+            self.episodes.insert(self._insertion_index(episode.pub_date), episode)
+            if self._snapshot_ops is not None:
+                self._snapshot_ops.append(("add", episode))
+        self._by_id[episode.id] = episode
+        self._generation += 1
+        self._log_change(episode.updated_at)
+    
+    def _update(self, episode_id: str, episode: Episode) -> bool:
+        if not self._delete(episode_id):
+            return False
+        episode.id = episode_id
+        self._add(episode)
+        return True
+    
+    def _delete(self, episode_id: str) -> bool:
+        current = self._by_id.get(episode_id)
+        if current is None:
+            return False
+        del self.episodes[self._position(current)]
+        del self._by_id[episode_id]
+        if self._snapshot_ops is not None:
+            self._snapshot_ops.append(("delete", current))
+        self._generation += 1
+        return True
+    
+    def _ensure_sorted(self):
+        if self._unsorted:
+            self.episodes.sort(key=lambda x: x.pub_date, reverse=True)
+            self._unsorted = False
+            self._snapshot_ops = None
+    
+    @contextmanager
+    def batch(self):
+        """Agrupa varias operaciones en una sola escritura.
+        
+        Dentro del bloque no se ordena ni se escribe en disco; al salir se
+        guarda el snapshot una vez. Si se produce una excepción se recarga
+        el estado anterior desde disco. Los demás hilos no ven nada del
+        bloque hasta que termina, y sus escrituras esperan a que termine.
+        
+        El almacén no se bloquea durante el bloque: si otro proceso reescribe
+        el snapshot mientras tanto, los cambios del bloque se descartan y se
+        lanza StoreConflictError. Para repetirlo automáticamente usa run_batch().
+        """
+        with self._writing():
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.load_episodes()
+                raise
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                try:
+                    self.save_episodes()
+                except StoreConflictError:
+                    # Los cambios del bloque se pierden: mejor que pisar los ajenos
+                    self.load_episodes()
+                    raise
+    
+    def clear_episodes(self):
+        """Elimina todos los episodios"""
+        with self._write():
+            self.episodes = []
+            self._generation += 1
+            self._snapshot_ops = None
+            self._rebuild_indexes()
+            # Todo el catálogo cambia: quien pida cambios tendrá que recargar
+            self._change_horizon = self._next_stamp()
+            self._log_change(self._change_horizon)
+            self._tombstones = []
+            self._record_digests = {}
+            self.save_episodes()
     
     def add_episode(self, episode: Episode):
         """Añade un nuevo episodio"""
-        self.episodes.append(episode)
-        self.episodes.sort(key=lambda x: x.pub_date, reverse=True)
-        self.save_episodes()
+        with self._write():
+            episode.updated_at = self._next_stamp()
+            self._add(episode)
+            self._append_journal({"op": "add", "episode": episode.to_dict()})
     
-    def get_episodes(self) -> List[Episode]:
+    def get_episodes(self) -> Tuple[Episode, ...]:
         """Obtiene todos los episodios ordenados por fecha (más recientes primero)"""
-        return sorted(self.episodes, key=lambda x: x.pub_date, reverse=True)
+        return self._read_state().episodes
     
     def get_latest_episode(self) -> Optional[Episode]:
         """Obtiene el episodio más reciente"""
-        episodes = self.get_episodes()
+        episodes = self._read_state().episodes
         return episodes[0] if episodes else None
     
-    def update_episode(self, index: int, episode: Episode):
-        """Actualiza un episodio existente"""
-        if 0 <= index < len(self.episodes):
-            self.episodes[index] = episode
-            self.episodes.sort(key=lambda x: x.pub_date, reverse=True)
-            self.save_episodes()
+    def get_episode(self, episode_id: str) -> Optional[Episode]:
+        """Obtiene un episodio por su id"""
+        return self._read_state().by_id.get(episode_id)
     
-    def delete_episode(self, index: int):
-        """Elimina un episodio"""
-        if 0 <= index < len(self.episodes):
-            del self.episodes[index]
-            self.save_episodes()
+    def get_episode_by_audio_url(self, audio_url: str) -> Optional[Episode]:
+        """Busca un episodio por su URL de audio (que también es su GUID en el RSS)"""
+        matches = self._read_state().secondary_indexes()[0].get(audio_url)
+        return matches[0] if matches else None
+    
+    def get_episode_by_number(self, season: int, episode_number: int) -> Optional[Episode]:
+        """Busca un episodio por temporada y número"""
+        matches = self._read_state().secondary_indexes()[1].get((season, episode_number))
+        return matches[0] if matches else None
+    
+    def query(self, limit: int = 50, cursor: str = None, season: int = None,
+              date_from=None, date_to=None, since=None) -> EpisodePage:
+        """Consulta paginada de episodios.
+        
+        Sin since recorre el catálogo (más recientes primero) filtrado por
+        temporada y rango de fechas de publicación; next_cursor pide la
+        página siguiente. Con since devuelve, en orden de modificación, los
+        episodios cambiados y los ids eliminados después de esa marca, y
+        next_since es la marca para la siguiente consulta. Si esos cambios ya
+        no se pueden reconstruir devuelve reset=True: hay que volver a cargar
+        desde el principio.
+        """
+        limit = max(1, min(int(limit), QUERY_MAX_LIMIT))
+        date_from, date_to = to_local_datetime(date_from), to_local_datetime(date_to)
+        since = to_change_stamp(since) if since is not None else None
+        return self._read_state().query(limit, cursor, season, date_from, date_to, since)
+    
+    def update_episode_by_id(self, episode_id: str, episode: Episode) -> bool:
+        """Actualiza el episodio con el id indicado"""
+        with self._write():
+            episode.updated_at = self._next_stamp()
+            if not self._update(episode_id, episode):
+                return False
+            self._append_journal({"op": "update", "id": episode_id,
+                                  "episode": episode.to_dict()})
+        return True
+    
+    def delete_episode_by_id(self, episode_id: str) -> bool:
+        """Elimina el episodio con el id indicado"""
+        with self._write():
+            stamp = self._next_stamp()
+            if not self._delete(episode_id):
+                return False
+            self._record_deletion(episode_id, stamp)
+            self._append_journal({"op": "delete", "id": episode_id, "at": stamp})
+        return True
+    
+    def update_episode(self, episode_id: str, episode: Episode) -> bool:
+        """Actualiza un episodio existente por su id (igual que update_episode_by_id)"""
+        return self.update_episode_by_id(episode_id, episode)
+    
+    def delete_episode(self, episode_id: str) -> bool:
+        """Elimina un episodio por su id (igual que delete_episode_by_id)"""
+        return self.delete_episode_by_id(episode_id)
+
+def create_episode_manager(storage_config: Dict = None):
+    """Crea el gestor de episodios según el backend configurado ("json" o "sqlite")"""
+    if storage_config is None:
+        from podcast_config import STORAGE_CONFIG
+        storage_config = STORAGE_CONFIG
+    
+    backend = storage_config.get("backend", "json")
+    if backend == "sqlite":
+        from sqlite_episode_manager import SQLiteEpisodeManager
+        return SQLiteEpisodeManager(storage_config.get("sqlite_file", "episodes.db"),
+                                    lazy_content=storage_config.get("lazy_content", False),
+                                    content_cache_size=storage_config.get("content_cache_size", 256))
+    if backend == "json":
+        return EpisodeManager(storage_config.get("episodes_file", "episodes.json"),
+                              lazy_content=storage_config.get("lazy_content", False),
+                              content_cache_size=storage_config.get("content_cache_size", 256),
+                              binary_snapshot=storage_config.get("binary_snapshot", False))
+    raise ValueError(f"Backend de almacenamiento desconocido: {backend}")
@@ -0,0 +1,287 @@
+"""
+Consultas sobre el catálogo de episodios
+
+Snapshot inmutable que publica EpisodeManager, con la paginación por cursor
+y el registro de cambios para query(since=...), y las utilidades de fechas,
+marcas y cursores que comparte con SQLiteEpisodeManager.
+"""
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+import base64
+import bisect
+import threading
+from episode import Episode
+
+# Tamaño máximo de página de query()
+QUERY_MAX_LIMIT = 200
+
+class EpisodePage:
+    """Resultado de query(): una página de episodios y cómo pedir la siguiente"""
+    
+    def __init__(self, episodes: List[Episode], next_cursor: str = None,
+                 has_more: bool = False, total: int = None, deleted: List[str] = None,
+                 next_since: str = None, reset: bool = False):
+        self.episodes = episodes
+        self.next_cursor = next_cursor
+        self.has_more = has_more
+        self.total = total
+        self.deleted = deleted or []
+        self.next_since = next_since
+        self.reset = reset
+    
+    def to_dict(self) -> Dict:
+        return {
+            "episodes": [ep.to_dict() for ep in self.episodes],
+            "next_cursor": self.next_cursor,
+            "has_more": self.has_more,
+            "total": self.total,
+            "deleted": self.deleted,
+            "next_since": self.next_since,
+            "reset": self.reset
+        }
+
+def to_local_datetime(value) -> Optional[datetime]:
+    """Convierte una fecha (datetime o texto ISO) a hora local sin zona,
+    como las que se guardan en los episodios"""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+def to_change_stamp(value) -> str:
+    """Normaliza una fecha al formato de updated_at (comparable como texto)"""
+    return to_local_datetime(value).isoformat(timespec='microseconds')
+
+def new_change_stamp(last: str = None) -> str:
+    """Marca para updated_at, siempre posterior a last aunque el reloj no avance"""
+    stamp = datetime.now().isoformat(timespec='microseconds')
+    if last is not None and stamp <= last:
+        stamp = (datetime.fromisoformat(last) + timedelta(microseconds=1)).isoformat(timespec='microseconds')
+    return stamp
+
+def encode_cursor(*parts: str) -> str:
+    return base64.urlsafe_b64encode('|'.join(parts).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str, count: int) -> List[str]:
+    """Descompone un cursor de query(); ValueError si no es válido"""
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+    except (ValueError, UnicodeError):
+        parts = []
+    if len(parts) != count:
+        raise ValueError("Cursor no válido")
+    return parts
+
+def first_not_after(episodes, pub_date: datetime) -> int:
+    """Primera posición con fecha <= pub_date en una lista ordenada de más
+    reciente a más antiguo (búsqueda binaria)"""
+    lo, hi = 0, len(episodes)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if episodes[mid].pub_date > pub_date:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def first_before(episodes, pub_date: datetime) -> int:
+    """Primera posición con fecha < pub_date en una lista ordenada de más
+    reciente a más antiguo (búsqueda binaria)"""
+    lo, hi = 0, len(episodes)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if episodes[mid].pub_date >= pub_date:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def position_of(episodes, episode: Episode) -> int:
+    """Posición de un episodio en una lista ordenada (búsqueda binaria por fecha)"""
+    lo = first_not_after(episodes, episode.pub_date)
+    while lo < len(episodes) and episodes[lo].pub_date == episode.pub_date:
+        if episodes[lo] is episode:
+            return lo
+        lo += 1
+    # La fecha se cambió directamente en el objeto sin guardar
+    return episodes.index(episode)
+
+# Altas y bajas que puede acumular una cadena de snapshots derivados antes
+# de que el escritor construya uno completo
+SNAPSHOT_MAX_PENDING = 256
+
+class EpisodeSnapshot:
+    """
+    Estado del catálogo publicado por EpisodeManager; no se modifica nunca
+    
+    Los escritores trabajan sobre sus propias estructuras con el cerrojo
+    tomado y al terminar publican un snapshot nuevo. Las lecturas usan el
+    último publicado sin cerrojos, así que nunca ven un cambio a medias ni
+    esperan a que termine una escritura.
+    
+    Publicar no copia el catálogo: si desde el snapshot anterior solo ha
+    habido altas y bajas, el nuevo guarda esas operaciones y la tupla y el
+    índice por id se construyen en la primera lectura que los necesite. Los
+    índices por URL y número, las vistas por temporada y el registro de
+    cambios también se construyen al usarlos.
+    """
+    
+    __slots__ = ('_episodes', '_by_id', '_parent', '_ops', '_pending', 'generation',
+                 '_tombstones', '_tombstone_count', 'change_horizon', 'last_stamp',
+                 '_secondary', '_seasons', '_changes')
+    
+    _materialize_lock = threading.Lock()
+    
+    def __init__(self, episodes: Optional[Tuple[Episode, ...]], by_id: Optional[Dict[str, Episode]],
+                 generation: int, tombstones: List[Tuple[str, str]] = (),
+                 change_horizon: str = "", last_stamp: Optional[str] = None,
+                 parent: 'EpisodeSnapshot' = None, ops: Tuple[Tuple[str, Episode], ...] = ()):
+        self._episodes = episodes
+        self._by_id = by_id
+        # Sin episodes: se obtienen aplicando ops ("add"/"delete", episodio) sobre parent
+        self._parent = parent
+        self._ops = ops
+        self._pending = len(ops)
+        if parent is not None and parent._episodes is None:
+            self._pending += parent._pending
+        self.generation = generation
+        # Lista de eliminaciones del gestor: solo crece (al vaciarla o podarla
+        # se sustituye por otra), así que basta con recordar cuántas había
+        self._tombstones = tombstones
+        self._tombstone_count = len(tombstones)
+        self.change_horizon = change_horizon
+        self.last_stamp = last_stamp
+        # Cachés perezosas: si dos hilos las construyen a la vez, gana
+        # cualquiera de las dos (son iguales)
+        self._secondary: Optional[Tuple[Dict, Dict]] = None
+        self._seasons: Dict[Optional[int], Tuple[Episode, ...]] = {}
+        self._changes: Optional[Tuple[List[Tuple], List[str]]] = None
+    
+    @property
+    def episodes(self) -> Tuple[Episode, ...]:
+        if self._episodes is None:
+            self._materialize()
+        return self._episodes
+    
+    @property
+    def by_id(self) -> Dict[str, Episode]:
+        if self._episodes is None:
+            self._materialize()
+        return self._by_id
+    
+    @property
+    def tombstones(self) -> Tuple[Tuple[str, str], ...]:
+        return tuple(self._tombstones[:self._tombstone_count])
+    
+    def _materialize(self):
+        """Aplica las operaciones pendientes sobre el último snapshot construido"""
+        with self._materialize_lock:
+            if self._episodes is not None:
+                return
+            chain = []
+            base = self
+            while base._episodes is None:
+                chain.append(base._ops)
+                base = base._parent
+            episodes, by_id = list(base._episodes), dict(base._by_id)
+            for ops in reversed(chain):
+                for op, episode in ops:
+                    if op == "add":
+                        episodes.insert(first_before(episodes, episode.pub_date), episode)
+                        by_id[episode.id] = episode
+                    else:
+                        del episodes[position_of(episodes, episode)]
+                        del by_id[episode.id]
+            self._by_id = by_id
+            self._episodes = tuple(episodes)
+            # Los snapshots anteriores ya no hacen falta
+            self._parent = None
+            self._ops = ()
+    
+    def secondary_indexes(self) -> Tuple[Dict, Dict]:
+        """Índices por URL de audio y por (temporada, número)"""
+        secondary = self._secondary
+        if secondary is None:
+            by_audio_url, by_number = {}, {}
+            for episode in self.episodes:
+                by_audio_url.setdefault(episode.audio_url, []).append(episode)
+                by_number.setdefault((episode.season, episode.episode_number), []).append(episode)
+            secondary = self._secondary = (by_audio_url, by_number)
+        return secondary
+    
+    def season_view(self, season: Optional[int]) -> Tuple[Episode, ...]:
+        if season is None:
+            return self.episodes
+        view = self._seasons.get(season)
+        if view is None:
+            view = self._seasons[season] = tuple(ep for ep in self.episodes if ep.season == season)
+        return view
+    
+    def change_log(self) -> Tuple[List[Tuple], List[str]]:
+        """Cambios (marca, id, episodio o None si se eliminó) ordenados por marca"""
+        changes = self._changes
+        if changes is None:
+            entries = [(ep.updated_at, ep.id, ep) for ep in self.episodes if ep.updated_at]
+            entries.extend((stamp, episode_id, None) for stamp, episode_id in self.tombstones)
+            entries.sort(key=lambda entry: entry[0])
+            changes = self._changes = (entries, [entry[0] for entry in entries])
+        return changes
+    
+    def query(self, limit: int, cursor: Optional[str], season: Optional[int],
+              date_from: Optional[datetime], date_to: Optional[datetime],
+              since: Optional[str]) -> EpisodePage:
+        """Ver EpisodeManager.query()"""
+        if since is not None:
+            return self._query_changes(since, limit, season, date_from, date_to)
+        
+        episodes = self.season_view(season)
+        start = 0 if date_to is None else first_not_after(episodes, date_to)
+        end = len(episodes) if date_from is None else first_before(episodes, date_from)
+        total = max(0, end - start)
+        if cursor:
+            pub_iso, episode_id = decode_cursor(cursor, 2)
+            cursor_date = datetime.fromisoformat(pub_iso)
+            position = first_not_after(episodes, cursor_date)
+            # A igual fecha se sigue detrás del episodio del cursor; si ya no
+            # existe se repite el grupo (mejor duplicar que saltarse alguno)
+            for i in range(position, len(episodes)):
+                if episodes[i].pub_date != cursor_date:
+                    break
+                if episodes[i].id == episode_id:
+                    position = i + 1
+                    break
+            start = max(start, position)
+        
+        page = list(episodes[start:min(end, start + limit)])
+        has_more = start + limit < end
+        next_cursor = encode_cursor(page[-1].pub_date_iso(), page[-1].id) if has_more else None
+        return EpisodePage(page, next_cursor=next_cursor, has_more=has_more,
+                           total=total, next_since=self.last_stamp)
+    
+    def _query_changes(self, since: str, limit: int, season: Optional[int],
+                       date_from: Optional[datetime], date_to: Optional[datetime]) -> EpisodePage:
+        if since < self.change_horizon:
+            return EpisodePage([], next_since=self.last_stamp, reset=True)
+        
+        log, stamps = self.change_log()
+        position = bisect.bisect_right(stamps, since)
+        episodes, deleted = [], []
+        next_since = since
+        # Tope de entradas recorridas para que el coste no dependa de los filtros
+        budget = limit * 10
+        while position < len(log) and budget and len(episodes) + len(deleted) < limit:
+            stamp, episode_id, episode = log[position]
+            position += 1
+            budget -= 1
+            next_since = stamp
+            if episode is None:
+                deleted.append(episode_id)
+            elif ((season is None or episode.season == season)
+                    and (date_from is None or episode.pub_date >= date_from)
+                    and (date_to is None or episode.pub_date <= date_to)):
+                episodes.append(episode)
+        return EpisodePage(episodes, has_more=position < len(log), deleted=deleted,
+                           next_since=next_since)
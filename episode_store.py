@@ -0,0 +1,701 @@
+"""
+Almacén JSON de EpisodeManager: snapshot, diario de cambios y bloqueo
+
+episodes.json es el snapshot; cada cambio se añade antes como una línea a
+episodes.json.journal y el diario se consolida en el snapshot al crecer.
+Junto al snapshot van episodes.json.changes (registro de cambios para
+query(since=...)), episodes.json.bin (caché binaria de arranque) y
+episodes.json.lock (cerrojo entre procesos).
+"""
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Dict, Optional, Tuple
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from episode import Episode
+from episode_query import new_change_stamp, to_change_stamp
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+class ContentCache:
+    """LRU acotada para descripciones y tracklists leídas bajo demanda"""
+    
+    def __init__(self, loader: Callable, max_size: int = 256):
+        self._loader = loader
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key) -> Dict:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        
+        content = self._loader(key)
+        with self._lock:
+            self._items[key] = content
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return content
+    
+    def discard(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+def _snapshot_reader(snapshot_file) -> Callable:
+    """Lee la descripción y la tracklist de un episodio a partir de su
+    posición (offset, longitud) en bytes dentro del snapshot.
+    
+    Se conserva abierto el fichero del que salieron las posiciones, así que
+    siguen siendo válidas aunque el snapshot se reemplace después. Se lee a
+    través de un mmap de solo lectura: sin seek, los hilos no se pisan, los
+    procesos creados con fork no comparten una posición del fichero y todos
+    usan las mismas páginas de memoria.
+    """
+    try:
+        view = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):  # Fichero vacío: no hay nada que leer
+        view = b""
+    
+    def read(content_ref) -> Dict:
+        offset, length = content_ref
+        data = json.loads(view[offset:offset + length])
+        return {"description": data["description"], "tracklist": data.get("tracklist") or []}
+    return read
+
+# Snapshot binario (episodes.json.bin): caché de arranque rápido.
+# Cabecera con magia, versión, tamaño y mtime_ns de episodes.json y número
+# de episodios; después columnas de enteros de 64 bits (offset y longitud de
+# cada episodio dentro de episodes.json, número y temporada) y un bloque de
+# texto UTF-8 precedido de su longitud con id, título, URL, duración, fecha
+# ISO y marca de modificación de cada episodio separados por NUL. Se lee con
+# unas pocas llamadas en C en lugar de parsear registro a registro.
+BINARY_SNAPSHOT_MAGIC = b'PGKS'
+BINARY_SNAPSHOT_VERSION = 2
+_BINARY_HEADER = struct.Struct('<4sHQQI')
+_BINARY_LENGTH = struct.Struct('<Q')
+_BINARY_NONE = -(2 ** 63)
+_BINARY_TEXT_FIELDS = 6
+
+def write_binary_snapshot(path: str, source_stat: os.stat_result, episodes: List[Episode]):
+    """Escribe el snapshot binario de episodios cargados con lazy_content"""
+    offsets = array('q', (ep._content_ref[0] for ep in episodes))
+    lengths = array('q', (ep._content_ref[1] for ep in episodes))
+    numbers = array('q', (_BINARY_NONE if ep.episode_number is None else ep.episode_number
+                          for ep in episodes))
+    seasons = array('q', (_BINARY_NONE if ep.season is None else ep.season for ep in episodes))
+    texts = []
+    for ep in episodes:
+        texts.extend((ep.id, ep.title, ep.audio_url, ep.duration, ep.pub_date_iso(),
+                      ep.updated_at or ''))
+    if any('\0' in text for text in texts):
+        raise ValueError("un campo de texto contiene el carácter NUL")
+    blob = '\0'.join(texts).encode('utf-8')
+    
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_BINARY_HEADER.pack(BINARY_SNAPSHOT_MAGIC, BINARY_SNAPSHOT_VERSION,
+                                    source_stat.st_size, source_stat.st_mtime_ns,
+                                    len(episodes)))
+        for column in (offsets, lengths, numbers, seasons):
+            f.write(column.tobytes())
+        f.write(_BINARY_LENGTH.pack(len(blob)))
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+def read_binary_snapshot(path: str, source_stat: os.stat_result,
+                         content_loader: Callable) -> Optional[List[Episode]]:
+    """Lee el snapshot binario si corresponde a la versión actual de episodes.json.
+    
+    Devuelve None si no existe, está desactualizado o es de otro formato.
+    Las fechas se dejan en texto y se decodifican al usarlas.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < _BINARY_HEADER.size:
+        return None
+    magic, version, size, mtime_ns, count = _BINARY_HEADER.unpack_from(data, 0)
+    if (magic != BINARY_SNAPSHOT_MAGIC or version != BINARY_SNAPSHOT_VERSION
+            or size != source_stat.st_size or mtime_ns != source_stat.st_mtime_ns):
+        return None
+    
+    pos = _BINARY_HEADER.size
+    columns = []
+    for _ in range(4):
+        column = array('q')
+        column.frombytes(data[pos:pos + count * 8])
+        if sys.byteorder != 'little':
+            column.byteswap()
+        columns.append(column)
+        pos += count * 8
+    offsets, lengths, numbers, seasons = columns
+    (blob_length,) = _BINARY_LENGTH.unpack_from(data, pos)
+    pos += _BINARY_LENGTH.size
+    texts = data[pos:pos + blob_length].decode('utf-8').split('\0') if count else []
+    if len(texts) != count * _BINARY_TEXT_FIELDS:
+        return None
+    
+    episodes = []
+    new_episode = Episode.__new__
+    for i in range(count):
+        # Equivalente a Episode.lazy() sin pasar por __init__
+        ep = new_episode(Episode)
+        base = i * _BINARY_TEXT_FIELDS
+        (ep.id, ep.title, ep.audio_url, ep.duration, ep._pub_date,
+         ep.updated_at) = texts[base:base + _BINARY_TEXT_FIELDS]
+        ep.updated_at = ep.updated_at or None
+        number, season = numbers[i], seasons[i]
+        ep.episode_number = None if number == _BINARY_NONE else number
+        ep.season = None if season == _BINARY_NONE else season
+        ep._description = None
+        ep._tracklist = None
+        ep._content = ((offsets[i], lengths[i]), content_loader)
+        episodes.append(ep)
+    return episodes
+
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+class StoreConflictError(Exception):
+    """Otro proceso reescribió el snapshot mientras había cambios sin guardar.
+    
+    El estado ya se ha recargado desde disco; quien llama debe repetir la
+    operación (ver run_batch()).
+    """
+
+def _stat_or_none(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+def _stat_key(stat: Optional[os.stat_result]) -> Optional[Tuple]:
+    """Identifica una versión concreta de un fichero en disco"""
+    if stat is None:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+# Eliminaciones que se recuerdan para query(since=...); las más antiguas se
+# olvidan y quien pida cambios desde antes de ellas tiene que recargar
+MAX_TOMBSTONES = 10000
+
+class EpisodeStore:
+    """
+    Persistencia de EpisodeManager en episodes.json y sus ficheros auxiliares
+    
+    EpisodeManager hereda de aquí y aporta el estado en memoria (episodes,
+    _by_id, _generation, _batch_depth...), el cerrojo entre hilos
+    (_writing) y las operaciones _add, _update, _delete y _rebuild_indexes
+    con las que se aplica el diario.
+    """
+    
+    def __init__(self, episodes_file: str, max_journal_bytes: int,
+                 lazy_content: bool, content_cache_size: int, binary_snapshot: bool):
+        self.episodes_file = episodes_file
+        # Diario de cambios: cada mutación se añade como una línea JSON
+        # y se consolida en el snapshot al superar max_journal_bytes
+        self.journal_file = episodes_file + ".journal"
+        self.max_journal_bytes = max_journal_bytes
+        # Con lazy_content las descripciones y tracklists se quedan en el
+        # snapshot y se leen bajo demanda a través de una LRU acotada
+        self.lazy_content = lazy_content
+        self.content_cache_size = content_cache_size
+        self._content_cache: Optional[ContentCache] = None
+        self._snapshot_stat: Optional[os.stat_result] = None
+        # Caché binaria para arrancar sin parsear el JSON (requiere lazy_content)
+        self.binary_snapshot = binary_snapshot and lazy_content
+        self.binary_snapshot_file = episodes_file + ".bin"
+        # Registro de cambios para query(since=...): marcas updated_at de los
+        # episodios y eliminaciones. Se guarda en episodes.json.changes con
+        # cada snapshot, junto con un resumen (hash, updated_at) de cada
+        # registro para dar marca nueva a los episodios cambiados directamente
+        # en el objeto. Solo quien pida cambios desde antes de _change_horizon
+        # (eliminaciones ya olvidadas) tiene que recargar desde el principio
+        self.changes_file = episodes_file + ".changes"
+        self._tombstones: List[Tuple[str, str]] = []
+        self._change_horizon = ""
+        self._last_stamp: Optional[str] = None
+        self._record_digests: Optional[Dict[str, Tuple[str, Optional[str]]]] = None
+        # Coherencia entre procesos (servidor web, CLI, scripts): las
+        # escrituras se serializan con un cerrojo sobre episodes.json.lock y
+        # refresh() compara el stat del snapshot y del diario con lo último
+        # leído para recargar solo cuando otro proceso ha cambiado algo
+        self.lock_file = episodes_file + ".lock"
+        self._lock_handle = None
+        self._lock_depth = 0
+        self._journal_inode: Optional[int] = None
+        self._journal_offset = 0
+    
+    @contextmanager
+    def _store_lock(self):
+        """Cerrojo exclusivo (reentrante) sobre el almacén de episodios"""
+        with self._writing():
+            if not self._lock_depth:
+                self._lock_handle = open(self.lock_file, 'a')
+                if fcntl is not None:
+                    fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if not self._lock_depth:
+                    # Cerrar el descriptor libera el flock
+                    self._lock_handle.close()
+                    self._lock_handle = None
+    
+    def load_episodes(self):
+        """Carga episodios desde el snapshot JSON y reaplica el diario"""
+        with self._store_lock():
+            self._load_episodes()
+    
+    def _load_episodes(self):
+        self.episodes = []
+        self._snapshot_stat = None
+        from_binary = False
+        if os.path.exists(self.episodes_file):
+            try:
+                if self.lazy_content:
+                    self.episodes, from_binary = self._load_snapshot_lazy()
+                else:
+                    with open(self.episodes_file, 'rb') as f:
+                        self._snapshot_stat = os.fstat(f.fileno())
+                        data = json.loads(f.read().decode('utf-8'))
+                        self.episodes = [Episode.from_dict(ep) for ep in data]
+                if not from_binary:
+                    # El snapshot ya se guarda ordenado, así que esto es lineal
+                    self.episodes.sort(key=lambda x: x.pub_date, reverse=True)
+            except Exception as e:
+                print(f"Error cargando episodios: {e}")
+                self.episodes = []
+        self._unsorted = False
+        self._generation += 1
+        self._snapshot_ops = None
+        self._rebuild_indexes()
+        if self.binary_snapshot and self.episodes and not from_binary:
+            self._save_binary_snapshot()
+        self._load_changes()
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._read_journal()
+    
+    def _load_changes(self):
+        """Recupera el registro de cambios guardado con el snapshot actual.
+        
+        Si falta o es de otra versión del snapshot se empieza uno nuevo en la
+        fecha del snapshot: quien pida cambios anteriores tendrá que recargar.
+        """
+        state = None
+        if self._snapshot_stat is not None:
+            try:
+                with open(self.changes_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = None
+        if state is not None and state.get("snapshot") == self._snapshot_signature():
+            self._change_horizon = state["horizon"]
+            self._tombstones = [tuple(entry) for entry in state["tombstones"]]
+            self._record_digests = {episode_id: tuple(entry)
+                                    for episode_id, entry in state["records"].items()}
+        elif self._snapshot_stat is None:
+            self._change_horizon = ""
+            self._tombstones = []
+            self._record_digests = {}
+        else:
+            self._change_horizon = to_change_stamp(
+                datetime.fromtimestamp(self._snapshot_stat.st_mtime_ns / 1e9))
+            self._tombstones = []
+            self._record_digests = None
+        self._last_stamp = max((ep.updated_at for ep in self.episodes if ep.updated_at),
+                               default=None)
+        self._log_change(self._tombstones[-1][0] if self._tombstones else None)
+        self._log_change(self._change_horizon or None)
+    
+    def _save_changes(self):
+        """Guarda el registro de cambios junto al snapshot recién escrito"""
+        state = {"snapshot": self._snapshot_signature(), "horizon": self._change_horizon,
+                 "tombstones": self._tombstones, "records": self._record_digests}
+        tmp_file = self.changes_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_file, self.changes_file)
+    
+    def _prune_tombstones(self):
+        """Olvida las eliminaciones más antiguas y mueve el horizonte tras ellas"""
+        if len(self._tombstones) <= MAX_TOMBSTONES:
+            return
+        # Lista nueva: los snapshots publicados comparten la anterior
+        tombstones = sorted(self._tombstones)
+        pruned = len(tombstones) - MAX_TOMBSTONES
+        self._change_horizon = tombstones[pruned - 1][0]
+        self._tombstones = tombstones[pruned:]
+    
+    def _log_change(self, stamp: Optional[str]):
+        if stamp is not None and (self._last_stamp is None or stamp > self._last_stamp):
+            self._last_stamp = stamp
+    
+    def _record_deletion(self, episode_id: str, stamp: Optional[str]):
+        if stamp is None:
+            return
+        self._tombstones.append((stamp, episode_id))
+        self._log_change(stamp)
+    
+    def _next_stamp(self) -> str:
+        return new_change_stamp(self._last_stamp)
+    
+    def _external_change(self) -> Optional[str]:
+        """Compara el disco con lo último leído usando solo stat().
+        
+        Devuelve None si no hay cambios, "journal" si otro proceso ha añadido
+        registros al diario y "snapshot" si hay que recargarlo todo.
+        """
+        if _stat_key(_stat_or_none(self.episodes_file)) != _stat_key(self._snapshot_stat):
+            return "snapshot"
+        journal = _stat_or_none(self.journal_file)
+        if journal is None:
+            return None if self._journal_inode is None else "snapshot"
+        if self._journal_inode is None:
+            return "journal"
+        if journal.st_ino != self._journal_inode or journal.st_size < self._journal_offset:
+            return "snapshot"
+        return "journal" if journal.st_size > self._journal_offset else None
+    
+    def refresh(self) -> bool:
+        """Se pone al día con los cambios hechos por otros procesos.
+        
+        Si solo ha crecido el diario se aplican los registros nuevos; si el
+        snapshot se ha reescrito se recarga entero. Devuelve True si el
+        estado en memoria ha cambiado.
+        """
+        if self._batch_depth or self._external_change() is None:
+            return False
+        if not self._thread_lock.acquire(blocking=False):
+            # Otro hilo está escribiendo: se pondrá al día él mismo y las
+            # lecturas no esperan
+            return False
+        try:
+            with self._store_lock():
+                change = self._external_change()
+                if change == "snapshot":
+                    self._load_episodes()
+                elif change == "journal":
+                    self._read_journal()
+        finally:
+            self._thread_lock.release()
+        return change is not None
+    
+    @contextmanager
+    def _write(self):
+        """Escritura con el almacén bloqueado (flock) y recargado antes de cambiar nada.
+        
+        Es un bloqueo pesimista: ninguna escritura fuera de batch() puede
+        entrar en conflicto. Dentro de batch() no se bloquea; al guardar se
+        aplican las entradas nuevas del diario de otros procesos, pero si otro
+        proceso ha reescrito el snapshot el bloque falla con StoreConflictError.
+        """
+        with self._writing():
+            if self._batch_depth:
+                yield
+                return
+            with self._store_lock():
+                self.refresh()
+                yield
+    
+    def _save_binary_snapshot(self):
+        try:
+            write_binary_snapshot(self.binary_snapshot_file, self._snapshot_stat, self.episodes)
+        except Exception as e:
+            print(f"Error guardando snapshot binario: {e}")
+    
+    def _open_content_cache(self):
+        """Abre el snapshot actual para leer contenido bajo demanda"""
+        snapshot_file = open(self.episodes_file, 'rb')
+        self._snapshot_stat = os.fstat(snapshot_file.fileno())
+        self._content_cache = ContentCache(_snapshot_reader(snapshot_file),
+                                           self.content_cache_size)
+        return snapshot_file
+    
+    def _load_snapshot_lazy(self) -> Tuple[List[Episode], bool]:
+        """Carga el snapshot guardando solo la posición de los campos pesados.
+        
+        Usa el snapshot binario si está al día con episodes.json; devuelve
+        también si los episodios salieron de él (y por tanto ya ordenados).
+        """
+        snapshot_file = self._open_content_cache()
+        if self.binary_snapshot:
+            episodes = read_binary_snapshot(self.binary_snapshot_file, self._snapshot_stat,
+                                            self._content_cache.get)
+            if episodes is not None:
+                return episodes, True
+        
+        text = snapshot_file.read().decode('utf-8')
+        decoder = json.JSONDecoder()
+        episodes = []
+        
+        # Conversión incremental de posiciones de carácter a posiciones de byte
+        char_pos, byte_pos = 0, 0
+        def byte_offset(index):
+            nonlocal char_pos, byte_pos
+            byte_pos += len(text[char_pos:index].encode('utf-8'))
+            char_pos = index
+            return byte_pos
+        
+        index = _JSON_WHITESPACE.match(text, 0).end()
+        if text[index:index + 1] != '[':
+            raise ValueError("el snapshot no es una lista de episodios")
+        index = _JSON_WHITESPACE.match(text, index + 1).end()
+        while text[index:index + 1] not in (']', ''):
+            data, end = decoder.raw_decode(text, index)
+            start = byte_offset(index)
+            content_ref = (start, byte_offset(end) - start)
+            episodes.append(Episode.lazy(
+                title=data["title"],
+                audio_url=data["audio_url"],
+                duration=data["duration"],
+                pub_date=data["pub_date"],
+                episode_number=data.get("episode_number"),
+                season=data.get("season"),
+                id=data.get("id"),
+                content_ref=content_ref,
+                content_loader=self._content_cache.get,
+                updated_at=data.get("updated_at")
+            ))
+            index = _JSON_WHITESPACE.match(text, end).end()
+            if text[index:index + 1] == ',':
+                index = _JSON_WHITESPACE.match(text, index + 1).end()
+        return episodes, False
+    
+    def save_episodes(self):
+        """Guarda todos los episodios en el snapshot JSON y vacía el diario"""
+        if self._batch_depth:
+            # Se guardará una sola vez al cerrar el batch
+            return
+        
+        with self._store_lock():
+            self._merge_external_changes()
+            self._save_snapshot()
+    
+    def _merge_external_changes(self):
+        """Incorpora lo que otros procesos han escrito desde la última lectura.
+        
+        Los registros añadidos al diario se aplican sobre el estado en memoria
+        (incluidos los cambios hechos directamente en los objetos). Si otro
+        proceso ha reescrito el snapshot no hay forma segura de combinarlo y
+        se lanza StoreConflictError en lugar de pisar sus cambios.
+        """
+        change = self._external_change()
+        if change == "snapshot":
+            raise StoreConflictError(
+                f"{self.episodes_file} ha sido modificado por otro proceso; "
+                "recarga los episodios y repite la operación")
+        if change == "journal":
+            self._read_journal()
+    
+    def _save_snapshot(self):
+        # Los scripts pueden haber cambiado fechas, URLs o números
+        # directamente en los objetos
+        self.episodes.sort(key=lambda x: x.pub_date, reverse=True)
+        self._unsorted = False
+        self._snapshot_ops = None
+        self._rebuild_indexes()
+        previous = self._record_digests
+        if previous is None:
+            # Sin el registro del snapshot anterior no se sabe qué ha cambiado
+            self._change_horizon = self._next_stamp()
+            self._log_change(self._change_horizon)
+            self._tombstones = []
+        else:
+            # Quitados directamente de la lista, sin delete_episode_by_id
+            deleted = {episode_id for _, episode_id in self._tombstones}
+            for episode_id in sorted(previous.keys() - self._by_id.keys() - deleted):
+                self._record_deletion(episode_id, self._next_stamp())
+            self._prune_tombstones()
+        try:
+            tmp_file = self.episodes_file + ".tmp"
+            content_refs = []
+            digests = {}
+            restamped = False
+            with open(tmp_file, 'wb') as f:
+                # Mismo formato que json.dump(..., indent=2), escrito episodio
+                # a episodio para conocer la posición de cada uno
+                f.write(b'[\n' if self.episodes else b'[')
+                for i, ep in enumerate(self.episodes):
+                    if i:
+                        f.write(b',\n')
+                    record, digest = self._snapshot_record(ep)
+                    known = previous.get(ep.id) if previous is not None else None
+                    if ((previous is not None and ep.updated_at is None)
+                            or (known is not None and known[0] != digest and known[1] == ep.updated_at)):
+                        # Cambiado directamente en el objeto (o añadido a la
+                        # lista sin add_episode): necesita marca nueva
+                        ep = self.episodes[i] = ep.copy()
+                        ep.updated_at = self._next_stamp()
+                        self._log_change(ep.updated_at)
+                        record, digest = self._snapshot_record(ep)
+                        restamped = True
+                    digests[ep.id] = (digest, ep.updated_at)
+                    content_refs.append((f.tell() + 2, len(record) - 2))
+                    f.write(record)
+                f.write(b'\n]' if self.episodes else b']')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.episodes_file)
+            self._snapshot_stat = os.stat(self.episodes_file)
+            if self.lazy_content:
+                # Los campos pesados vuelven al disco, ahora en el nuevo
+                # snapshot. Se sustituyen por copias: los episodios anteriores
+                # siguen en el snapshot publicado
+                self._open_content_cache()
+                for i, content_ref in enumerate(content_refs):
+                    episode = self.episodes[i] = self.episodes[i].copy()
+                    episode._content = (content_ref, self._content_cache.get)
+                    episode._description = None
+                    episode._tracklist = None
+                if self.binary_snapshot:
+                    self._save_binary_snapshot()
+            if restamped or self.lazy_content:
+                self._by_id = {episode.id: episode for episode in self.episodes}
+            # Se publica aunque solo hayan cambiado las marcas o las eliminaciones
+            self._generation += 1
+            self._record_digests = digests
+            self._save_changes()
+            # Si el proceso muere aquí, la cabecera del diario ya no coincide
+            # con el nuevo snapshot y el diario se descarta al cargar
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self._journal_inode = None
+            self._journal_offset = 0
+        except Exception as e:
+            print(f"Error guardando episodios: {e}")
+    
+    @staticmethod
+    def _snapshot_record(episode: Episode) -> Tuple[bytes, str]:
+        """Registro del episodio tal como va en el snapshot y su hash"""
+        record = json.dumps(episode.to_dict(), indent=2, ensure_ascii=False)
+        record = ('  ' + record.replace('\n', '\n  ')).encode('utf-8')
+        return record, hashlib.blake2b(record, digest_size=8).hexdigest()
+    
+    def _snapshot_signature(self) -> Dict:
+        """Identifica la versión del snapshot sobre la que se escribe el diario"""
+        if self._snapshot_stat is None:
+            return {"size": None, "mtime_ns": None}
+        return {"size": self._snapshot_stat.st_size, "mtime_ns": self._snapshot_stat.st_mtime_ns}
+    
+    def _append_journal(self, record: Dict):
+        """Añade un registro al diario y consolida si ha crecido demasiado.
+        
+        Se llama con el almacén bloqueado y al día (ver _write).
+        """
+        if self._batch_depth:
+            return
+        
+        try:
+            with open(self.journal_file, 'a+b') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self._journal_inode or not self._journal_offset:
+                    # Diario nuevo (o restos sin cabecera válida)
+                    f.truncate(0)
+                    header = {"op": "base", "snapshot": self._snapshot_signature()}
+                    f.write((json.dumps(header) + "\n").encode('utf-8'))
+                else:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        # Línea a medio escribir por una caída: se cierra para
+                        # que el nuevo registro no quede pegado a ella
+                        f.write(b'\n')
+                f.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+                self._journal_inode = inode
+                self._journal_offset = f.tell()
+        except Exception as e:
+            print(f"Error escribiendo diario de episodios: {e}")
+            self._save_snapshot()
+            return
+        
+        if self._journal_offset > self.max_journal_bytes:
+            self._save_snapshot()
+    
+    def _read_journal(self):
+        """Aplica los registros del diario que aún no se han leído.
+        
+        Se llama con el almacén bloqueado, así que no hay escrituras a medias
+        de otros procesos: una línea incompleta solo puede venir de una caída.
+        """
+        try:
+            f = open(self.journal_file, 'rb')
+        except FileNotFoundError:
+            self._journal_inode = None
+            self._journal_offset = 0
+            return
+        
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            if inode != self._journal_inode:
+                self._journal_inode = inode
+                self._journal_offset = 0
+            f.seek(self._journal_offset)
+            
+            if not self._journal_offset:
+                header_line = f.readline()
+                try:
+                    header = json.loads(header_line)
+                except ValueError:
+                    header = {}
+                if header.get("op") != "base" or header.get("snapshot") != self._snapshot_signature():
+                    # El snapshot se reescribió después de este diario: ya incluye sus cambios
+                    if header_line:
+                        print("Diario de episodios obsoleto, se descarta")
+                    os.remove(self.journal_file)
+                    self._journal_inode = None
+                    return
+                self._journal_offset = len(header_line)
+            
+            for line in f:
+                self._journal_offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Restos de un registro interrumpido por una caída
+                    print("Registro incompleto en el diario de episodios, se ignora")
+                    continue
+                self._apply_record(record)
+    
+    def _apply_record(self, record: Dict):
+        """Aplica en memoria un registro del diario"""
+        op = record.get("op")
+        episode_id = record.get("id")
+        if episode_id is None and "index" in record:
+            # Registros escritos antes de que los episodios tuvieran id
+            index = record["index"]
+            if not 0 <= index < len(self.episodes):
+                return
+            episode_id = self.episodes[index].id
+        
+        if op == "add":
+            self._add(Episode.from_dict(record["episode"]))
+        elif op == "update":
+            self._update(episode_id, Episode.from_dict(record["episode"]))
+        elif op == "delete":
+            if self._delete(episode_id):
+                self._record_deletion(episode_id, record.get("at"))
@@ -0,0 +1,101 @@
+"""
+Documentos del feed (RSS, JSON Feed) en memoria para servirlos por HTTP
+
+Cada documento se lee de disco una sola vez por versión: el contenido, su
+versión gzip, el ETag y la fecha de modificación se guardan en un
+FeedDocument inmutable que se sustituye entero cuando el fichero cambia. Las
+peticiones solo miran el fichero (un os.stat) como mucho una vez por
+check_interval segundos.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+RSS_MIMETYPE = "application/rss+xml; charset=utf-8"
+JSON_FEED_MIMETYPE = "application/feed+json; charset=utf-8"
+
+# Por debajo de este tamaño no compensa comprimir
+MIN_GZIP_SIZE = 512
+
+class FeedDocument:
+    """Una versión de un documento del feed, lista para enviar (no se modifica)"""
+    
+    __slots__ = ('body', 'gzip_body', 'etag', 'last_modified', 'mimetype', 'size', 'mtime_ns')
+    
+    def __init__(self, body: bytes, gzip_body: Optional[bytes], etag: str,
+                 last_modified: datetime, mimetype: str, size: int, mtime_ns: int):
+        self.body = body
+        self.gzip_body = gzip_body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.mimetype = mimetype
+        self.size = size
+        self.mtime_ns = mtime_ns
+    
+    def gzip_etag(self) -> str:
+        # Representación distinta, ETag distinto (son ETags fuertes)
+        return f"{self.etag}-gzip"
+
+def load_document(path: str, mimetype: str) -> FeedDocument:
+    """Lee el fichero y prepara su versión comprimida"""
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        body = f.read()
+    gzip_body = None
+    if len(body) >= MIN_GZIP_SIZE:
+        gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gzip_body) >= len(body):
+            gzip_body = None
+    return FeedDocument(
+        body=body,
+        gzip_body=gzip_body,
+        etag=hashlib.sha256(body).hexdigest()[:32],
+        # HTTP solo tiene segundos: sin microsegundos para comparar con If-Modified-Since
+        last_modified=datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc),
+        mimetype=mimetype,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns
+    )
+
+class FeedCache:
+    """Documentos del feed por ruta, recargados cuando cambia el fichero"""
+    
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._documents: Dict[str, FeedDocument] = {}
+        self._checked: Dict[str, float] = {}
+    
+    def get(self, path: str, mimetype: str) -> Optional[FeedDocument]:
+        """Versión actual del documento, o None si el fichero no existe"""
+        document = self._documents.get(path)
+        now = time.monotonic()
+        if document is not None and now - self._checked.get(path, 0) < self.check_interval:
+            return document
+        
+        with self._lock:
+            document = self._documents.get(path)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._documents.pop(path, None)
+                self._checked.pop(path, None)
+                return None
+            if document is None or document.size != stat.st_size or document.mtime_ns != stat.st_mtime_ns:
+                # Los generadores usan os.replace: nunca se lee un fichero a medias
+                document = load_document(path, mimetype)
+                self._documents[path] = document
+            self._checked[path] = now
+            return document
+    
+    def invalidate(self, path: str = None):
+        """Fuerza a mirar el fichero en la próxima petición (tras regenerarlo)"""
+        with self._lock:
+            if path is None:
+                self._checked.clear()
+            else:
+                self._checked.pop(path, None)
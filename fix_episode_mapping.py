@@ -58,29 +58,32 @@ def fix_episode_mapping():
     
     print("\n🔧 Aplicando mapeo corregido...")
     
-    # Actualizar cada episodio
-    for episode in episodes:
-        if episode.title in mapping:
-            new_filename = mapping[episode.title]
-            old_url = episode.audio_url
-            # Usar la configuración actual del servidor
-            from podcast_config import SERVER_CONFIG
-            new_url = f"{SERVER_CONFIG['base_url']}{SERVER_CONFIG['episodes_path']}{new_filename}"
-            
-            # Actualizar URL del audio
-            episode.audio_url = new_url
-            
-            # Actualizar número de episodio basado en el nombre del archivo
-            match = re.search(r'^(\d+)', new_filename)
-            if match:
-                episode.episode_number = int(match.group(1))
-            
-            print(f"✅ {episode.title} -> {new_filename}")
-        else:
-            print(f"⚠️  No se encontró mapeo para: {episode.title}")
+    # Un solo guardado al salir del bloque; si algo falla no se guarda nada
+    with manager.batch():
+        # Actualizar cada episodio
+        for episode in episodes:
+            if episode.title in mapping:
+                new_filename = mapping[episode.title]
+                # Usar la configuración actual del servidor del show
+                server_config = manager.server_config
+                new_url = f"{server_config['base_url']}{server_config['episodes_path']}{new_filename}"
+                
+                # Los episodios de get_episodes() son del snapshot: se edita una copia
+                ep = episode.copy()
+                
+                # Actualizar URL del audio
+                ep.audio_url = new_url
+                
+                # Actualizar número de episodio basado en el nombre del archivo
+                match = re.search(r'^(\d+)', new_filename)
+                if match:
+                    ep.episode_number = int(match.group(1))
+                
+                manager.episode_manager.update_episode_by_id(ep.id, ep)
+                print(f"✅ {episode.title} -> {new_filename}")
+            else:
+                print(f"⚠️  No se encontró mapeo para: {episode.title}")
     
-    # Guardar cambios
-    manager.episode_manager.save_episodes()
     manager.update_rss()
     
     print(f"\n🎉 Mapeo corregido! RSS actualizado.")
@@ -169,26 +169,29 @@ def fix_tracklists():
     
     updated_count = 0
     
-    for episode in episodes:
-        # Si no tiene tracklist o está vacío
-        if not episode.tracklist or len(episode.tracklist) == 0:
-            # Buscar tracklist estándar por título
-            tracklist = None
-            for key, tracks in standard_tracklists.items():
-                if key.lower() in episode.title.lower():
-                    tracklist = tracks
-                    break
-            
-            # Si no se encuentra, crear uno genérico
-            if not tracklist:
-                tracklist = [f"Track {i+1}" for i in range(5)]
-            
-            episode.tracklist = tracklist
-            updated_count += 1
-            print(f"✅ Actualizado: {episode.title} - {len(tracklist)} canciones")
+    # Un solo guardado al salir del bloque; si algo falla no se guarda nada
+    with manager.batch():
+        for episode in episodes:
+            # Si no tiene tracklist o está vacío
+            if not episode.tracklist or len(episode.tracklist) == 0:
+                # Buscar tracklist estándar por título
+                tracklist = None
+                for key, tracks in standard_tracklists.items():
+                    if key.lower() in episode.title.lower():
+                        tracklist = tracks
+                        break
+                
+                # Si no se encuentra, crear uno genérico
+                if not tracklist:
+                    tracklist = [f"Track {i+1}" for i in range(5)]
+                
+                # Los episodios de get_episodes() son del snapshot: se edita una copia
+                ep = episode.copy()
+                ep.tracklist = list(tracklist)
+                manager.episode_manager.update_episode_by_id(ep.id, ep)
+                updated_count += 1
+                print(f"✅ Actualizado: {episode.title} - {len(tracklist)} canciones")
     
-    # Guardar cambios
-    manager.episode_manager.save_episodes()
     manager.update_rss()
     
     print(f"\n🎉 Tracklists corregidos! {updated_count} episodios actualizados")
@@ -7,7 +7,7 @@ from datetime import datetime
 import os
 import re
 from podcast_manager import PodcastManager
-from episode_manager import Episode
+from episode_manager import Episode, run_batch
 
 def parse_rss_file(rss_file):
     """Parsea el archivo RSS de Podgaku y extrae los episodios"""
@@ -59,7 +59,7 @@ def parse_rss_file(rss_file):
             }
             
             episodes.append(episode_data)
-            
+        
         except Exception as e:
             print(f"Error procesando episodio: {e}")
             continue
@@ -178,49 +178,58 @@ def main():
     # Inicializar el gestor del podcast
     manager = PodcastManager()
     
-    # Limpiar episodios existentes
-    print("🗑️  Limpiando episodios existentes...")
-    manager.episode_manager.episodes = []
-    manager.episode_manager.save_episodes()
-    
-    # Importar cada episodio
-    print("📥 Importando episodios...")
-    imported_count = 0
-    
-    for i, ep_data in enumerate(episodes_data):
-        try:
-            # Construir URL del audio
-            if ep_data['audio_filename']:
-                audio_url = f"http://localhost:8080/episodes/{ep_data['audio_filename']}"
-            else:
-                print(f"⚠️  No se encontró archivo de audio para: {ep_data['title']}")
-                continue
-            
-            # Crear episodio
-            episode = Episode(
-                title=ep_data['title'],
-                description=ep_data['description'],
-                audio_url=audio_url,
-                duration=ep_data['duration'],
-                pub_date=ep_data['pub_date'],
-                episode_number=ep_data['episode_number'],
-                season=ep_data['season'],
-                tracklist=ep_data['tracklist']
-            )
+    # Todo el import va en un batch: un solo guardado y un solo RSS al final,
+    # y si algo falla se conservan los episodios anteriores
+    def import_all(manager):
+        # Limpiar episodios existentes
+        print("🗑️  Limpiando episodios existentes...")
+        manager.episode_manager.clear_episodes()
+        
+        # Importar cada episodio
+        print("📥 Importando episodios...")
+        imported_count = 0
+        
+        for i, ep_data in enumerate(episodes_data):
+            try:
+                # Construir URL del audio
+                if ep_data['audio_filename']:
+                    audio_url = f"http://localhost:8080/episodes/{ep_data['audio_filename']}"
+                else:
+                    print(f"⚠️  No se encontró archivo de audio para: {ep_data['title']}")
+                    continue
+                
+                # Crear episodio
+                episode = Episode(
+                    title=ep_data['title'],
+                    description=ep_data['description'],
+                    audio_url=audio_url,
+                    duration=ep_data['duration'],
+                    pub_date=ep_data['pub_date'],
+                    episode_number=ep_data['episode_number'],
+                    season=ep_data['season'],
+                    tracklist=ep_data['tracklist']
+                )
+                
+                # Añadir episodio
+                manager.episode_manager.add_episode(episode)
+                imported_count += 1
+                
+                print(f"✅ Importado: {ep_data['title']}")
             
-            # Añadir episodio
-            manager.episode_manager.add_episode(episode)
-            imported_count += 1
-            
-            print(f"✅ Importado: {ep_data['title']}")
-            
-        except Exception as e:
-            print(f"❌ Error importando episodio {i+1}: {e}")
-            continue
+            except Exception as e:
+                print(f"❌ Error importando episodio {i+1}: {e}")
+                continue
+        
+        # Actualizar RSS
+        print("📡 Generando RSS actualizado...")
+        manager.update_rss()
+        return imported_count
+    
+    # Si otro proceso reescribe los episodios a la vez, se repite el import entero
+    def on_retry(attempt, error):
+        print(f"⚠️  Conflicto con otro proceso, reintentando ({attempt}/2)...")
     
-    # Actualizar RSS
-    print("📡 Generando RSS actualizado...")
-    manager.update_rss()
+    imported_count = run_batch(manager, import_all, attempts=3, on_retry=on_retry)
     
     print(f"🎉 Importación completada! {imported_count} episodios importados")
     print(f"📁 Archivos de audio encontrados: {len(os.listdir('episodes'))}")
@@ -0,0 +1,319 @@
+"""
+Trabajos en segundo plano: metadatos de subidas, regeneración de feeds y despliegues
+
+Cada trabajo se registra en SQLite (jobs.db) antes de ejecutarse, así que su
+estado se puede consultar desde cualquier proceso del servidor y sobrevive a
+un reinicio. Se ejecutan en un pool de `workers` hilos del propio proceso;
+como mucho puede haber `max_pending` esperando, el resto se rechaza con
+JobQueueFullError en lugar de acumularse. Un trabajo que falla se reintenta
+con espera exponencial hasta max_attempts veces.
+
+Un trabajo que estaba en marcha o en cola en un proceso que ya no existe
+(reinicio, SIGHUP del servidor de producción) lo retoma el siguiente proceso
+que llame a start().
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner INTEGER,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+STATUSES = (QUEUED, RUNNING, SUCCEEDED, FAILED)
+
+# Trabajos terminados que se borran en cleanup()
+JOB_RETENTION = timedelta(days=7)
+
+# Cada cuánto start() busca trabajos de procesos que ya no existen
+RECOVER_INTERVAL = 60.0
+
+class JobQueueFullError(RuntimeError):
+    """Ya hay max_pending trabajos esperando"""
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    if pid == os.getpid():
+        return True
+    if os.name != "posix":
+        # Sin fork solo hay un proceso: los demás son de ejecuciones anteriores
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobQueue:
+    """Cola de trabajos con registro persistente y un pool de hilos acotado"""
+    
+    def __init__(self, db_file: str = "jobs.db", workers: int = 2, max_pending: int = 32,
+                 max_attempts: int = 3, retry_delay: float = 5.0):
+        self.db_file = db_file
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._handlers: Dict[str, Callable] = {}
+        self._attempts: Dict[str, int] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._recovered_at: Optional[float] = None
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Una conexión por hilo y proceso (los hijos creados con fork abren la suya)
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            local.conn = sqlite3.connect(self.db_file, timeout=30)
+            local.conn.row_factory = sqlite3.Row
+            local.conn.execute("PRAGMA journal_mode=WAL")
+            local.pid = os.getpid()
+        return local.conn
+    
+    def register(self, kind: str, handler: Callable, max_attempts: int = None):
+        """Asocia un tipo de trabajo a la función que lo ejecuta (recibe params como argumentos)"""
+        self._handlers[kind] = handler
+        self._attempts[kind] = max_attempts or self.max_attempts
+    
+    def kinds(self) -> List[str]:
+        return sorted(self._handlers)
+    
+    def start(self):
+        """Prepara el pool de este proceso y retoma los trabajos huérfanos"""
+        pid = os.getpid()
+        if self._executor_pid == pid and not self._recover_due():
+            return
+        with self._lock:
+            if self._executor_pid != pid:
+                # Tras un fork el pool del padre no tiene hilos en este proceso
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+                self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+                self._executor_pid = pid
+            if not self._recover_due():
+                return
+            self._recovered_at = time.monotonic()
+        self.recover()
+    
+    def _recover_due(self) -> bool:
+        return self._recovered_at is None or time.monotonic() - self._recovered_at >= RECOVER_INTERVAL
+    
+    def recover(self) -> int:
+        """Vuelve a encolar los trabajos sin terminar de procesos que ya no existen"""
+        rows = self.conn.execute("SELECT id, owner, status, attempts, max_attempts FROM jobs "
+                                 "WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchall()
+        recovered = 0
+        for row in rows:
+            if _pid_alive(row["owner"]):
+                continue
+            now = datetime.now().isoformat()
+            if row["status"] == RUNNING and row["attempts"] >= row["max_attempts"]:
+                # Se cortó en su último intento: no se vuelve a ejecutar
+                with self.conn:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? "
+                        "WHERE id = ? AND owner IS ? AND status = ?",
+                        (FAILED, "Interrumpido: el proceso terminó durante el último intento",
+                         now, now, row["id"], row["owner"], RUNNING))
+                continue
+            if not self._slots.acquire(blocking=False):
+                continue
+            with self.conn:
+                # Otro proceso puede estar recuperándolo a la vez: solo uno lo consigue
+                claimed = self.conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ? AND owner IS ? "
+                    "AND status = ?",
+                    (QUEUED, os.getpid(), now, row["id"], row["owner"], row["status"])).rowcount
+            if claimed:
+                self._executor.submit(self._run, row["id"])
+                recovered += 1
+            else:
+                self._slots.release()
+        if recovered:
+            print(f"🔁 {recovered} trabajos retomados de procesos anteriores")
+        return recovered
+    
+    def submit(self, kind: str, params: Dict = None) -> Dict:
+        """
+        Registra un trabajo y lo pone en cola; devuelve su registro
+        
+        ValueError si el tipo no existe o los parámetros no encajan con su
+        función; JobQueueFullError si no cabe en la cola.
+        """
+        params = params or {}
+        handler = self._handlers.get(kind)
+        if handler is None:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        try:
+            inspect.signature(handler).bind(**params)
+        except TypeError as e:
+            raise ValueError(f"Parámetros no válidos para {kind}: {e}")
+        
+        self.start()
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFullError("Demasiados trabajos en cola; inténtalo más tarde")
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO jobs (id, kind, params, status, max_attempts, owner, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, json.dumps(params, ensure_ascii=False), QUEUED,
+                     self._attempts[kind], os.getpid(), now, now))
+            self._executor.submit(self._run, job_id)
+        except Exception:
+            self._slots.release()
+            raise
+        return self.get(job_id)
+    
+    def _run(self, job_id: str):
+        now = datetime.now().isoformat()
+        with self.conn:
+            claimed = self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (RUNNING, now, now, job_id, QUEUED, os.getpid())).rowcount
+        if not claimed:
+            self._slots.release()
+            return
+        row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        handler = self._handlers.get(row["kind"])
+        
+        try:
+            if handler is None:
+                raise ValueError(f"Tipo de trabajo desconocido: {row['kind']}")
+            result = handler(**json.loads(row["params"]))
+            result = json.dumps(result, ensure_ascii=False, default=str)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"❌ Trabajo {row['kind']} {job_id} (intento {row['attempts']}/{row['max_attempts']}): {error}")
+            if handler is None or row["attempts"] >= row["max_attempts"]:
+                traceback.print_exc()
+                self._finish(job_id, FAILED, error=error)
+                return
+            with self.conn:
+                self.conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                                  (QUEUED, error, datetime.now().isoformat(), job_id))
+            # El hueco en la cola se conserva durante la espera
+            delay = self.retry_delay * 2 ** (row["attempts"] - 1)
+            timer = threading.Timer(delay, self._executor.submit, (self._run, job_id))
+            timer.daemon = True
+            timer.start()
+            return
+        self._finish(job_id, SUCCEEDED, result=result)
+    
+    def _finish(self, job_id: str, status: str, result: str = None, error: str = None):
+        now = datetime.now().isoformat()
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ? "
+                    "WHERE id = ?", (status, result, error, now, now, job_id))
+        finally:
+            self._slots.release()
+    
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        del job["owner"]
+        return job
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Registro del trabajo, o None si no existe"""
+        row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+    
+    def list(self, kind: str = None, status: str = None, limit: int = 50) -> List[Dict]:
+        """Trabajos más recientes primero, filtrados por tipo y estado"""
+        query, args = "SELECT * FROM jobs WHERE 1 = 1", []
+        if kind:
+            query += " AND kind = ?"
+            args.append(kind)
+        if status:
+            query += " AND status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        return [self._to_dict(row) for row in self.conn.execute(query, args)]
+    
+    def retry(self, job_id: str) -> Optional[Dict]:
+        """Vuelve a encolar un trabajo fallido con sus intentos a cero; None si no ha fallado"""
+        job = self.get(job_id)
+        if job is None or job["status"] != FAILED:
+            return None
+        self.start()
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFullError("Demasiados trabajos en cola; inténtalo más tarde")
+        with self.conn:
+            claimed = self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, owner = ?, result = NULL, error = NULL, "
+                "finished_at = NULL, updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, os.getpid(), datetime.now().isoformat(), job_id, FAILED)).rowcount
+        if not claimed:
+            self._slots.release()
+            return None
+        self._executor.submit(self._run, job_id)
+        return self.get(job_id)
+    
+    def wait(self, job_id: str, timeout: float = None, interval: float = 0.05) -> Optional[Dict]:
+        """Espera a que el trabajo termine (o se agote el tiempo) y devuelve su registro"""
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in (SUCCEEDED, FAILED):
+                return job
+            if end is not None and time.monotonic() >= end:
+                return job
+            time.sleep(interval)
+    
+    def cleanup(self) -> int:
+        """Borra los trabajos terminados hace más de JOB_RETENTION"""
+        limit = (datetime.now() - JOB_RETENTION).isoformat()
+        with self.conn:
+            return self.conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                                     (SUCCEEDED, FAILED, limit)).rowcount
+    
+    def close(self):
+        """Cierra la conexión de este hilo"""
+        local = self._local
+        if getattr(local, "conn", None) is not None and local.pid == os.getpid():
+            local.conn.close()
+        local.conn = None
@@ -5,15 +5,13 @@ Utilidad para cargar variables de entorno desde archivo .env
 import os
 from pathlib import Path
 
-def load_env_file(env_file='.env'):
-    """Carga variables de entorno desde un archivo .env"""
+def read_env_file(env_file='.env'):
+    """Lee las variables de un archivo .env sin tocar os.environ (None si no existe)"""
     env_path = Path(env_file)
-    
     if not env_path.exists():
-        print(f"⚠️  Archivo {env_file} no encontrado")
-        print(f"💡 Copia env.example a {env_file} y configura tus valores")
-        return False
+        return None
     
+    values = {}
     with open(env_path, 'r') as f:
         for line in f:
             line = line.strip()
@@ -22,9 +20,18 @@ def load_env_file(env_file='.env'):
                 if '=' in line:
                     key, value = line.split('=', 1)
                     # Remover comillas si las hay
-                    value = value.strip('\'"')
-                    os.environ[key.strip()] = value
+                    values[key.strip()] = value.strip('\'"')
+    return values
+
+def load_env_file(env_file='.env'):
+    """Carga variables de entorno desde un archivo .env"""
+    values = read_env_file(env_file)
+    if values is None:
+        print(f"⚠️  Archivo {env_file} no encontrado")
+        print(f"💡 Copia env.example a {env_file} y configura tus valores")
+        return False
     
+    os.environ.update(values)
     print(f"✅ Variables de entorno cargadas desde {env_file}")
     return True
 
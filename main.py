@@ -5,15 +5,37 @@ Script principal para gestionar el podcast Podgaku
 import sys
 from datetime import datetime
 from podcast_manager import PodcastManager
+from podcast_registry import PodcastRegistry
 
 def main():
-    manager = PodcastManager()
+    args = sys.argv[1:]
+    show_id = None
+    if "--show" in args:
+        position = args.index("--show")
+        if position + 1 >= len(args):
+            print("❌ Indica el show: --show <id>")
+            return
+        show_id = args[position + 1]
+        del args[position:position + 2]
     
-    if len(sys.argv) < 2:
+    if not args:
         print_help()
         return
     
-    command = sys.argv[1].lower()
+    command = args[0].lower()
+    
+    if command == "update-all":
+        results = PodcastRegistry().rebuild_feeds()
+        for show, count in results.items():
+            status = f"{count} episodios" if count is not None else "error"
+            print(f"📡 {show}: {status}")
+        return
+    
+    try:
+        manager = PodcastManager(show_id)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
     
     if command == "add":
         add_episode_interactive(manager)
@@ -117,14 +139,20 @@ Comandos disponibles:
   list     - Listar todos los episodios
   latest   - Mostrar el episodio más reciente
   update   - Actualizar el archivo RSS
+  update-all - Actualizar el RSS de todos los shows (en paralelo)
   help     - Mostrar esta ayuda
 
+Opciones:
+
+  --show <id>  - Trabajar sobre otro show de SHOWS (podcast_config.py)
+
 Ejemplos de uso:
 
   python main.py add
   python main.py migrate
   python main.py list
   python main.py update
+  python main.py --show otro_show list
 
 Para añadir un episodio rápidamente desde línea de comandos:
   python main.py add "Título" "Descripción" "audio.mp3" "30:45" 5 1
@@ -0,0 +1,146 @@
+"""
+Índice de los archivos de audio de episodes/
+
+Guarda el tamaño en bytes y el tipo MIME de cada archivo para el
+<enclosure> del RSS. Se actualiza con una sola pasada de os.scandir: solo
+se abren (para mirar sus primeros bytes) los archivos nuevos o cuyo tamaño
+o fecha de modificación han cambiado.
+"""
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+
+# Nombre por defecto del índice, dentro de la carpeta de episodios
+INDEX_NAME = ".media_index.json"
+
+DEFAULT_MIME_TYPE = "audio/mpeg"
+
+# Tipos que esperan las apps de podcasts (mimetypes no conoce todos)
+EXTENSION_MIME_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/x-m4a",
+    ".mp4": "video/mp4",
+    ".aac": "audio/aac",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/opus",
+    ".wav": "audio/wav",
+    ".flac": "audio/flac",
+}
+
+def mime_type_for_name(name: str) -> str:
+    """Tipo MIME según la extensión (audio/mpeg si no se conoce)"""
+    ext = os.path.splitext(name)[1].lower()
+    return EXTENSION_MIME_TYPES.get(ext) or mimetypes.guess_type(name)[0] or DEFAULT_MIME_TYPE
+
+def probe_mime_type(path: str) -> str:
+    """Tipo MIME a partir de los primeros bytes del archivo"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(12)
+    except OSError:
+        return mime_type_for_name(path)
+    if head[4:8] == b'ftyp':
+        # Contenedor MP4: la extensión dice si es solo audio
+        return "video/mp4" if path.lower().endswith(".mp4") else "audio/x-m4a"
+    if head.startswith(b'ID3') or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        # Etiqueta ID3 o cabecera de trama MPEG; 0xFFF1/0xFFF9 es ADTS (AAC)
+        if head[0] == 0xFF and head[1] & 0xF6 == 0xF0:
+            return "audio/aac"
+        return "audio/mpeg"
+    if head.startswith(b'OggS'):
+        return "audio/ogg"
+    if head.startswith(b'fLaC'):
+        return "audio/flac"
+    if head.startswith(b'RIFF') and head[8:12] == b'WAVE':
+        return "audio/wav"
+    return mime_type_for_name(path)
+
+class MediaIndex:
+    """Tamaño y tipo MIME de los archivos de una carpeta, persistido en JSON"""
+    
+    def __init__(self, folder: str, index_file: str = None):
+        self.folder = folder
+        self.index_file = index_file or os.path.join(folder, INDEX_NAME)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self._load()
+    
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save(self):
+        tmp_file = f"{self.index_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=2, ensure_ascii=False, sort_keys=True)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            # Solo es una caché: la próxima vez se vuelven a mirar los archivos
+            print(f"⚠️  No se pudo guardar el índice de audio {self.index_file}: {e}")
+    
+    def refresh(self) -> int:
+        """Recorre la carpeta y actualiza lo que ha cambiado; devuelve cuántos"""
+        with self._lock:
+            try:
+                entries = list(os.scandir(self.folder))
+            except FileNotFoundError:
+                entries = []
+            
+            seen, changed = set(), 0
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                seen.add(entry.name)
+                cached = self._entries.get(entry.name)
+                if (cached and cached.get("size") == stat.st_size
+                        and cached.get("mtime_ns") == stat.st_mtime_ns):
+                    continue
+                self._entries[entry.name] = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "mime_type": probe_mime_type(entry.path)
+                }
+                changed += 1
+            
+            removed = [name for name in self._entries if name not in seen]
+            for name in removed:
+                del self._entries[name]
+            if changed or removed:
+                self._save()
+            return changed + len(removed)
+    
+    def lookup(self, filename: str) -> Optional[Tuple[int, str]]:
+        """(tamaño, tipo MIME) del archivo, o None si no está en la carpeta"""
+        entry = self._entries.get(filename)
+        if entry is None and '%' in filename:
+            entry = self._entries.get(unquote(filename))
+        if entry is None:
+            return None
+        return entry["size"], entry["mime_type"]
+    
+    def entry(self, filename: str, stat: os.stat_result) -> Optional[Dict]:
+        """
+        Entrada del archivo comprobada contra su os.stat actual
+        
+        Si el archivo ha cambiado desde la última pasada se vuelve a
+        recorrer la carpeta (así el índice también queda al día para el RSS).
+        La entrada lleva además un ETag fuerte: nombre + tamaño + fecha.
+        """
+        entry = self._entries.get(filename)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            self.refresh()
+            entry = self._entries.get(filename)
+            if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                return None
+        # Una copia: la entrada del índice la comparten otros hilos y se
+        # guarda en disco tal cual
+        key = f"{filename}:{entry['size']}:{entry['mtime_ns']}".encode("utf-8")
+        return {**entry, "etag": hashlib.sha1(key).hexdigest()[:24]}
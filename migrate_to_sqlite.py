@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Script para migrar los episodios de episodes.json a la base de datos SQLite
+
+- episodes.json (incluido su diario de cambios) pasa a la tabla episodes
+- Los episodes_backup_*.json se guardan en la tabla episode_backups,
+  sin mezclarse con el catálogo publicado
+"""
+import argparse
+import glob
+import json
+import os
+from episode_manager import Episode, EpisodeManager
+from podcast_config import STORAGE_CONFIG
+from sqlite_episode_manager import SQLiteEpisodeManager
+
+BACKUPS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS episode_backups (
+    pk INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_episode_backups_source ON episode_backups (source);
+"""
+
+def migrate(episodes_file, db_file, backup_files, force=False):
+    """Copia episodios y copias de seguridad a la base de datos"""
+    db = SQLiteEpisodeManager(db_file)
+    
+    existing = db.conn.execute("SELECT COUNT(*) FROM episodes").fetchone()[0]
+    if existing and not force:
+        print(f"❌ {db_file} ya contiene {existing} episodios")
+        print("💡 Usa --force para vaciar la base de datos y migrar de nuevo")
+        return False
+    
+    # Episodios publicados. Con --force se vacían también las marcas de
+    # borrado: la marca de cambios de SQLite es la mayor de las dos tablas,
+    # así que empieza de nuevo con los episodios migrados
+    episodes = []
+    # Los últimos cambios pueden estar solo en el diario, sin snapshot aún
+    found = os.path.exists(episodes_file) or os.path.exists(episodes_file + ".journal")
+    if found:
+        source = EpisodeManager(episodes_file)
+        # Insertar en el orden de get_episodes() conserva el desempate por
+        # orden de inserción entre episodios con la misma fecha
+        episodes = source.get_episodes()
+    with db.conn:
+        db.conn.execute("DELETE FROM episodes")
+        db.conn.execute("DELETE FROM episode_tombstones")
+        db.conn.executemany(
+            """INSERT INTO episodes (id, title, description, audio_url, duration,
+               pub_date, episode_number, season, tracklist, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [db._episode_values(ep) for ep in episodes]
+        )
+    if found:
+        print(f"✅ {len(episodes)} episodios migrados desde {episodes_file}")
+    else:
+        print(f"⚠️  No se encontró {episodes_file}, la tabla de episodios queda vacía")
+    
+    # Copias de seguridad
+    with db.conn:
+        db.conn.executescript(BACKUPS_SCHEMA)
+        db.conn.execute("DELETE FROM episode_backups")
+    for backup_file in backup_files:
+        try:
+            with open(backup_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Validar que cada entrada es un episodio antes de guardarla
+            rows = [(os.path.basename(backup_file),
+                     json.dumps(Episode.from_dict(ep).to_dict(), ensure_ascii=False))
+                    for ep in data]
+        except Exception as e:
+            print(f"❌ Error leyendo {backup_file}: {e}")
+            continue
+        with db.conn:
+            db.conn.executemany("INSERT INTO episode_backups (source, data) VALUES (?, ?)", rows)
+        print(f"📦 {len(rows)} episodios de {backup_file} guardados en episode_backups")
+    
+    print(f"\n🎉 Migración completada en {db_file}")
+    if STORAGE_CONFIG.get("backend") != "sqlite":
+        print('💡 Cambia STORAGE_CONFIG["backend"] a "sqlite" en podcast_config.py para usarla')
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra episodes.json a SQLite")
+    parser.add_argument("--episodes-file", default=STORAGE_CONFIG.get("episodes_file", "episodes.json"))
+    parser.add_argument("--db", default=STORAGE_CONFIG.get("sqlite_file", "episodes.db"))
+    parser.add_argument("--force", action="store_true",
+                        help="Vaciar la base de datos si ya contiene episodios")
+    parser.add_argument("backups", nargs="*",
+                        help="Copias de seguridad a importar (por defecto episodes_backup_*.json)")
+    args = parser.parse_args()
+    
+    backup_files = args.backups or sorted(glob.glob("episodes_backup_*.json"))
+    success = migrate(args.episodes_file, args.db, backup_files, force=args.force)
+    return 0 if success else 1
+
+if __name__ == '__main__':
+    exit(main())
@@ -24,6 +24,84 @@ SERVER_CONFIG = {
     "episodes_path": "/episodes/"
 }
 
+# Almacenamiento de episodios: "json" (episodes.json + diario) o "sqlite"
+# Para pasar a SQLite, ejecuta antes: python migrate_to_sqlite.py
+STORAGE_CONFIG = {
+    "backend": "json",
+    "episodes_file": "episodes.json",
+    "sqlite_file": "episodes.db",
+    # Descripciones y tracklists se leen de disco al usarlas; en memoria solo
+    # se guardan las content_cache_size más recientes
+    "lazy_content": False,
+    "content_cache_size": 256,
+    # Caché binaria episodes.json.bin para arrancar sin parsear el JSON
+    # (requiere lazy_content)
+    "binary_snapshot": False
+}
+
+# Servidor web de producción (python start_web.py --production): procesos
+# que atienden (None: uno por CPU), hilos por proceso y conexiones que pueden
+# esperar a un hilo libre en cada proceso antes de responder 503
+WEB_SERVER_CONFIG = {
+    "host": "0.0.0.0",
+    "port": 8080,
+    "workers": None,
+    "threads": 8,
+    "max_queue": 64,
+    "backlog": 128
+}
+
+# Trabajos en segundo plano del servidor web (metadatos de subidas, RSS,
+# despliegue): hilos por proceso, trabajos que pueden esperar en cola,
+# intentos por defecto y espera antes del primer reintento (se duplica)
+JOBS_CONFIG = {
+    "db_file": "jobs.db",
+    "workers": 2,
+    "max_pending": 32,
+    "max_attempts": 3,
+    "retry_delay": 5.0
+}
+
+# Podcasts servidos desde esta instalación. Cada show tiene su propio
+# almacén, metadatos, URLs y RSS; las claves que falten se toman de las
+# configuraciones de arriba
+SHOWS = {
+    "podgaku": {
+        "podcast": PODCAST_CONFIG,
+        "server": SERVER_CONFIG,
+        "storage": STORAGE_CONFIG,
+        "rss_file": "podcast.xml",
+        "episodes_folder": "episodes",
+        # Con un número, podcast.xml lleva solo los episodios más recientes y
+        # el resto va a páginas de archivo podcast-archive-N.xml (RFC 5005)
+        "feed_page_size": None,
+        # JSON Feed 1.1 junto al RSS
+        "json_feed_file": "podcast.json",
+        # Datos ya extraídos del RSS para web_static/app.js y admin.js
+        "web_index_file": "web_static/episodes.json",
+        # Web estática generada a partir de web_static/index.html (portada con
+        # los episodios, episodios/<...>.html y sitemap.xml); la sube upload_web.py
+        "site_dir": "site",
+        # Episodios por página de la portada (index.html, pagina-2.html, ...)
+        "site_page_size": 50,
+        # Servidor web: los cambios que lleguen en este intervalo (segundos)
+        # se agrupan en una sola regeneración del RSS en segundo plano
+        "rebuild_delay": 2.0
+    },
+    # "otro_show": {
+    #     "podcast": {**PODCAST_CONFIG, "title": "Otro show", "description": "..."},
+    #     "server": {**SERVER_CONFIG, "rss_path": "/otro_show/podcast.xml",
+    #                "episodes_path": "/otro_show/episodes/"},
+    #     "storage": {**STORAGE_CONFIG, "episodes_file": "shows/otro_show/episodes.json",
+    #                 "sqlite_file": "shows/otro_show/episodes.db"},
+    #     "rss_file": "shows/otro_show/podcast.xml",
+    #     "episodes_folder": "shows/otro_show/episodes"
+    # },
+}
+
+# Show que usan main.py y las rutas /api/... sin prefijo de show
+DEFAULT_SHOW = "podgaku"
+
 # Configuración para desarrollo local (comentada)
 # SERVER_CONFIG = {
 #     "base_url": "http://localhost:8080",  # Para desarrollo local
@@ -1,15 +1,138 @@
 """
 Gestor principal del podcast - Interfaz fácil para actualizar el RSS
 """
+from contextlib import contextmanager
 from datetime import datetime
-from episode_manager import EpisodeManager, Episode
-from rss_generator import RSSGenerator
-from podcast_config import SERVER_CONFIG
+from typing import Dict
+import os
+import threading
+from episode_manager import Episode, create_episode_manager
+from rss_generator import RSSGenerator, feed_files
+from rss_cache import RSSItemCache
+from precompress import precompress_files
+from media_index import MediaIndex
+from rebuild_scheduler import RebuildScheduler
+from static_site import SITE_PAGE_SIZE, StaticSiteGenerator
+from podcast_config import PODCAST_CONFIG, SERVER_CONFIG, STORAGE_CONFIG, SHOWS, DEFAULT_SHOW
 
 class PodcastManager:
-    def __init__(self):
-        self.episode_manager = EpisodeManager()
-        self.rss_generator = RSSGenerator()
+    def __init__(self, show_id: str = None, show_config: Dict = None):
+        """
+        Gestor de un show. Sin argumentos usa DEFAULT_SHOW de podcast_config.py
+        
+        Args:
+            show_id: Identificador del show en SHOWS
+            show_config: Configuración del show (por defecto SHOWS[show_id])
+        """
+        self.show_id = show_id or DEFAULT_SHOW
+        if show_config is None:
+            if self.show_id not in SHOWS:
+                raise ValueError(f"Show desconocido: {self.show_id}")
+            show_config = SHOWS[self.show_id]
+        
+        self.config = show_config.get("podcast", PODCAST_CONFIG)
+        self.server_config = show_config.get("server", SERVER_CONFIG)
+        self.storage_config = show_config.get("storage", STORAGE_CONFIG)
+        self.rss_file = show_config.get("rss_file", "podcast.xml")
+        self.episodes_folder = show_config.get("episodes_folder", "episodes")
+        # Fragmentos <item> ya renderizados (None para no usar caché)
+        self.rss_cache_file = show_config.get("rss_cache_file", f"{self.rss_file}.items.db")
+        # Episodios en el RSS principal; los antiguos van a páginas de archivo
+        # (podcast-archive-1.xml, ...). None: todos en podcast.xml
+        self.feed_page_size = show_config.get("feed_page_size")
+        # Generar podcast.xml.gz / .br junto al RSS para servirlos tal cual
+        self.precompress = show_config.get("precompress", True)
+        # JSON Feed (podcast.json) y episodes.json para la web, generados en
+        # la misma pasada que el RSS (None para no generarlos)
+        self.json_feed_file = show_config.get("json_feed_file", f"{os.path.splitext(self.rss_file)[0]}.json")
+        self.web_index_file = show_config.get("web_index_file")
+        # Ventana (segundos) en la que se agrupan las peticiones de regenerar
+        # el RSS cuando se regenera en segundo plano (servidor web)
+        self.rebuild_delay = show_config.get("rebuild_delay", 2.0)
+        formats = ("rss",) + (("json",) if self.json_feed_file else ()) + (("web",) if self.web_index_file else ())
+        
+        # Los shows nuevos suelen vivir en su propia carpeta (shows/<id>/...)
+        for path in (self.rss_file, self.storage_config.get("episodes_file"),
+                     self.storage_config.get("sqlite_file")):
+            if path and os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        self.episode_manager = create_episode_manager(self.storage_config)
+        item_cache = RSSItemCache(self.rss_cache_file) if self.rss_cache_file else None
+        self.media_index = MediaIndex(self.episodes_folder, show_config.get("media_index_file"))
+        self.rss_generator = RSSGenerator(self.config, self.server_config, item_cache,
+                                          page_size=self.feed_page_size,
+                                          media_index=self.media_index, formats=formats,
+                                          podcast_namespace=show_config.get("podcasting20", True))
+        # Web estática (portada, páginas de episodio y sitemap) generada junto
+        # al RSS; None para no generarla
+        site_dir = show_config.get("site_dir")
+        self.site_generator = StaticSiteGenerator(
+            self.config, site_dir, show_config.get("site_template", "web_static/index.html"),
+            page_size=show_config.get("site_page_size", SITE_PAGE_SIZE)
+        ) if site_dir else None
+        # Profundidad de batch() y RSS pendiente, de cada hilo: un batch en
+        # curso no cambia cómo se regenera el RSS en las demás peticiones
+        self._batch_state = threading.local()
+        self.rss_scheduler = None
+        # Una sola regeneración a la vez (hilo en segundo plano, rutas de la
+        # API, update-all). Los episodios se leen de un snapshot inmutable, así
+        # que regenerar no bloquea a quien añade o edita mientras tanto
+        self._rss_lock = threading.Lock()
+    
+    def start_background_rebuilds(self) -> RebuildScheduler:
+        """
+        A partir de ahora los cambios regeneran el RSS en segundo plano
+        
+        Las peticiones que llegan dentro de rebuild_delay segundos se agrupan
+        en una sola regeneración. update_rss() sigue regenerando en el acto.
+        """
+        if self.rss_scheduler is None:
+            self.rss_scheduler = RebuildScheduler(self.update_rss, delay=self.rebuild_delay,
+                                                  name=f"RSS de {self.show_id}")
+        return self.rss_scheduler
+    
+    @property
+    def _batch_depth(self) -> int:
+        return getattr(self._batch_state, "depth", 0)
+    
+    def before_fork(self):
+        """Cierra las conexiones a SQLite; cada proceso hijo abre las suyas al usarlas"""
+        if hasattr(self.episode_manager, "close"):
+            self.episode_manager.close()
+        if self.rss_generator.item_cache is not None:
+            self.rss_generator.item_cache.close()
+    
+    def request_rss_update(self):
+        """Regenera el RSS ahora o, con start_background_rebuilds(), en segundo plano"""
+        if self.rss_scheduler is not None and not self._batch_depth:
+            self.rss_scheduler.request()
+        else:
+            self.update_rss()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Agrupa varias operaciones sobre episodios
+        
+        Los episodios se guardan una sola vez y el RSS se regenera una sola
+        vez al salir del bloque. Si hay una excepción se descartan los cambios.
+        """
+        state = self._batch_state
+        state.depth = self._batch_depth + 1
+        try:
+            with self.episode_manager.batch():
+                yield self
+        except BaseException:
+            if state.depth == 1:
+                # Los cambios del bloque se han descartado: no hay nada que regenerar
+                state.pending = False
+            raise
+        finally:
+            state.depth -= 1
+        
+        if not state.depth and getattr(state, "pending", False):
+            self.request_rss_update()
     
     def add_new_episode(self, title: str, description: str, audio_filename: str, 
                        duration: str, episode_number: int = None, 
@@ -27,7 +150,7 @@ class PodcastManager:
             tracklist: Lista de canciones (opcional)
         """
         # Construir URL completa del audio
-        audio_url = f"{SERVER_CONFIG['base_url']}{SERVER_CONFIG['episodes_path']}{audio_filename}"
+        audio_url = f"{self.server_config['base_url']}{self.server_config['episodes_path']}{audio_filename}"
         
         # Crear episodio
         episode = Episode(
@@ -45,15 +168,34 @@ class PodcastManager:
         self.episode_manager.add_episode(episode)
         
         # Actualizar RSS
-        self.update_rss()
+        self.request_rss_update()
         
         print(f"✅ Episodio '{title}' añadido y RSS actualizado")
     
-    def update_rss(self, output_file: str = "podcast.xml"):
+    def update_rss(self, output_file: str = None):
         """Actualiza el archivo RSS con todos los episodios"""
+        if self._batch_depth:
+            # Se regenerará al cerrar el batch
+            self._batch_state.pending = True
+            return
+        
+        with self._rss_lock:
+            self._batch_state.pending = False
+            self._write_feeds(output_file or self.rss_file)
+    
+    def _write_feeds(self, output_file: str):
         episodes = self.episode_manager.get_episodes()
-        self.rss_generator.save_rss(episodes, output_file)
-        print(f"📡 RSS actualizado con {len(episodes)} episodios")
+        if self.rss_generator.save_feeds(episodes, output_file, self.json_feed_file, self.web_index_file):
+            print(f"📡 RSS actualizado con {len(episodes)} episodios")
+        else:
+            print(f"📡 RSS sin cambios ({len(episodes)} episodios)")
+        if self.precompress:
+            # No hace nada si el RSS no ha cambiado desde la última vez
+            precompress_files(feed_files(output_file) + [path for path in (self.json_feed_file, self.web_index_file) if path])
+        if self.site_generator:
+            written = self.site_generator.build(episodes)
+            if self.precompress:
+                precompress_files(written)
     
     def list_episodes(self):
         """Lista todos los episodios"""
@@ -270,25 +412,26 @@ class PodcastManager:
             }
         ]
         
-        for ep_data in anchor_episodes:
-            # Construir URL del audio (asumiendo que tienes los archivos)
-            audio_filename = f"episode_{ep_data['episode_number']}.mp3"
-            audio_url = f"{SERVER_CONFIG['base_url']}{SERVER_CONFIG['episodes_path']}{audio_filename}"
+        with self.batch():
+            for ep_data in anchor_episodes:
+                # Construir URL del audio (asumiendo que tienes los archivos)
+                audio_filename = f"episode_{ep_data['episode_number']}.mp3"
+                audio_url = f"{self.server_config['base_url']}{self.server_config['episodes_path']}{audio_filename}"
+                
+                episode = Episode(
+                    title=ep_data["title"],
+                    description=ep_data["description"],
+                    audio_url=audio_url,
+                    duration=ep_data["duration"],
+                    pub_date=ep_data["pub_date"],
+                    episode_number=ep_data["episode_number"],
+                    season=ep_data["season"],
+                    tracklist=ep_data["tracklist"]
+                )
+                
+                self.episode_manager.add_episode(episode)
+                print(f"✅ Migrado: {ep_data['title']}")
             
-            episode = Episode(
-                title=ep_data["title"],
-                description=ep_data["description"],
-                audio_url=audio_url,
-                duration=ep_data["duration"],
-                pub_date=ep_data["pub_date"],
-                episode_number=ep_data["episode_number"],
-                season=ep_data["season"],
-                tracklist=ep_data["tracklist"]
-            )
-            
-            self.episode_manager.add_episode(episode)
-            print(f"✅ Migrado: {ep_data['title']}")
-        
-        # Actualizar RSS
-        self.update_rss()
+            # Actualizar RSS (se hace una sola vez al cerrar el batch)
+            self.update_rss()
         print(f"🎉 Migración completada! {len(anchor_episodes)} episodios migrados")
@@ -0,0 +1,94 @@
+"""
+Registro de podcasts - Varios shows servidos desde una misma instalación
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+import threading
+from podcast_config import SHOWS, DEFAULT_SHOW
+from podcast_manager import PodcastManager
+
+def _rebuild_feed(show_id: str, show_config: Dict) -> int:
+    """Regenera el RSS de un show en un proceso del pool"""
+    manager = PodcastManager(show_id, show_config)
+    manager.update_rss()
+    return len(manager.episode_manager.get_episodes())
+
+class PodcastRegistry:
+    """
+    Crea bajo demanda un PodcastManager por show
+    
+    Cada show tiene su propio almacén, su propia caché de contenido y su
+    propio RSS, así que los episodios más consultados de un show nunca
+    desalojan a los de otro.
+    """
+    
+    def __init__(self, shows: Dict = None, default_show: str = None,
+                 background_rebuilds: bool = False):
+        self.shows = SHOWS if shows is None else shows
+        self.default_show = default_show or DEFAULT_SHOW
+        # Con True los gestores regeneran el RSS en segundo plano (servidor web)
+        self.background_rebuilds = background_rebuilds
+        self._managers: Dict[str, PodcastManager] = {}
+        self._lock = threading.Lock()
+    
+    def show_ids(self) -> List[str]:
+        """Identificadores de todos los shows configurados"""
+        return list(self.shows)
+    
+    def get(self, show_id: str = None) -> Optional[PodcastManager]:
+        """Gestor del show indicado (o del show por defecto); None si no existe"""
+        show_id = show_id or self.default_show
+        if show_id not in self.shows:
+            return None
+        with self._lock:
+            manager = self._managers.get(show_id)
+            if manager is None:
+                manager = PodcastManager(show_id, self.shows[show_id])
+                if self.background_rebuilds:
+                    manager.start_background_rebuilds()
+                self._managers[show_id] = manager
+        return manager
+    
+    def preload(self) -> List[PodcastManager]:
+        """Carga todos los shows (antes de crear procesos con fork, que los heredan)"""
+        return [self.get(show_id) for show_id in self.shows]
+    
+    def before_fork(self):
+        """Deja los gestores listos para que los hereden procesos hijos"""
+        with self._lock:
+            for manager in self._managers.values():
+                manager.before_fork()
+    
+    def rebuild_feeds(self, show_ids: Iterable[str] = None,
+                      max_workers: int = None) -> Dict[str, Optional[int]]:
+        """
+        Regenera el RSS de varios shows repartiéndolos en un pool de procesos
+        
+        Cada proceso carga el show desde disco, así que se usa lo último que
+        se haya guardado. Devuelve el número de episodios de cada show
+        (None si falló).
+        """
+        show_ids = [show_id for show_id in (show_ids or self.shows) if show_id in self.shows]
+        results = {}
+        if len(show_ids) <= 1 or max_workers == 1:
+            # No compensa arrancar procesos para un único show
+            for show_id in show_ids:
+                try:
+                    manager = self.get(show_id)
+                    manager.update_rss()
+                    results[show_id] = len(manager.episode_manager.get_episodes())
+                except Exception as e:
+                    print(f"❌ Error regenerando el RSS de {show_id}: {e}")
+                    results[show_id] = None
+            return results
+        
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {show_id: pool.submit(_rebuild_feed, show_id, self.shows[show_id])
+                       for show_id in show_ids}
+            for show_id, future in futures.items():
+                try:
+                    results[show_id] = future.result()
+                except Exception as e:
+                    print(f"❌ Error regenerando el RSS de {show_id}: {e}")
+                    results[show_id] = None
+        return results
@@ -0,0 +1,126 @@
+"""
+Variantes precomprimidas (.gz y .br) para servir ficheros estáticos
+
+El servidor de producción puede entregar podcast.xml.gz o style.css.br tal
+cual (gzip_static / brotli_static en nginx) en lugar de comprimir en cada
+petición. Las variantes se generan con la compresión máxima y solo se
+regeneran cuando cambia el contenido del original.
+"""
+from typing import Dict, Iterable, List
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin él solo se generan los .gz
+    brotli = None
+
+# Fichero, en cada carpeta, con el digest de los originales ya comprimidos
+MANIFEST_NAME = ".precompressed.json"
+
+# Extensiones de texto que merece la pena comprimir
+COMPRESSIBLE_EXTENSIONS = ('.xml', '.html', '.js', '.css', '.json', '.svg', '.txt')
+
+_manifest_lock = threading.Lock()
+
+def _compress_gzip(data: bytes) -> bytes:
+    # mtime=0: mismo contenido, mismos bytes (y no hay que volver a subirlos)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def _compress_brotli(data: bytes) -> bytes:
+    return brotli.compress(data, mode=brotli.MODE_TEXT, quality=11)
+
+def _encoders() -> Dict[str, object]:
+    encoders = {".gz": _compress_gzip}
+    if brotli is not None:
+        encoders[".br"] = _compress_brotli
+    return encoders
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _load_manifest(manifest_file: str) -> Dict:
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(manifest_file: str, manifest: Dict):
+    tmp_file = f"{manifest_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, manifest_file)
+
+def variants(path: str) -> List[str]:
+    """Variantes comprimidas que existen ahora mismo junto a path"""
+    return [path + suffix for suffix in (".gz", ".br") if os.path.exists(path + suffix)]
+
+def precompress(path: str) -> List[str]:
+    """
+    Genera path.gz (y path.br si está instalado brotli) si han cambiado
+    
+    Si el fichero no ha cambiado de tamaño ni de fecha no se lee; si ha
+    cambiado se compara su SHA-256 con el de la última compresión. Una
+    variante que no ahorre nada no se genera (y se borra si quedaba una
+    antigua, para que el servidor no entregue contenido desfasado).
+    Devuelve las variantes regeneradas.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    manifest_file = os.path.join(directory, MANIFEST_NAME)
+    stat = os.stat(path)
+    encoders = _encoders()
+    
+    with _manifest_lock:
+        manifest = _load_manifest(manifest_file)
+        entry = manifest.get(name) or {}
+        up_to_date = all(os.path.exists(path + suffix) for suffix in entry.get("variants", []))
+        if (up_to_date and entry.get("encoders") == sorted(encoders)
+                and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns):
+            return []
+        
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if up_to_date and entry.get("encoders") == sorted(encoders) and entry.get("digest") == digest:
+            # Tocado pero idéntico: basta con recordar la nueva fecha
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            _save_manifest(manifest_file, manifest)
+            return []
+        
+        written, kept = [], []
+        for suffix in (".gz", ".br"):
+            variant = path + suffix
+            encode = encoders.get(suffix)
+            compressed = encode(data) if encode else None
+            if compressed is None or len(compressed) >= len(data):
+                if os.path.exists(variant):
+                    os.remove(variant)
+                continue
+            _write_atomic(variant, compressed)
+            written.append(variant)
+            kept.append(suffix)
+        
+        manifest[name] = {"digest": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                          "variants": kept, "encoders": sorted(encoders)}
+        _save_manifest(manifest_file, manifest)
+        return written
+
+def precompress_files(paths: Iterable[str]) -> Dict[str, List[str]]:
+    """precompress() de los ficheros comprimibles de la lista que existan"""
+    results = {}
+    for path in paths:
+        if path.lower().endswith(COMPRESSIBLE_EXTENSIONS) and os.path.exists(path):
+            try:
+                results[path] = precompress(path)
+            except OSError as e:
+                print(f"⚠️  No se pudo comprimir {path}: {e}")
+    return results
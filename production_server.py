@@ -0,0 +1,227 @@
+"""
+Servidor de producción para web_server.app
+
+Un proceso maestro abre el puerto, carga una sola vez los episodios y los
+feeds (preload) y arranca `workers` procesos hijos con fork: los hijos
+heredan ese estado ya cargado (las páginas de memoria se comparten mientras
+nadie las modifica) en lugar de leer cada uno episodes.json. Cada hijo
+atiende con un pool de `threads` hilos y como mucho `max_queue` conexiones
+esperando; el resto recibe un 503 inmediato en vez de acumularse.
+
+Señales del maestro:
+- SIGTERM / SIGINT: los hijos dejan de aceptar conexiones, terminan las
+  peticiones en curso y salen.
+- SIGHUP: recarga en caliente. Se paran los hijos como arriba y el maestro
+  se vuelve a ejecutar (código y configuración nuevos) conservando el
+  socket abierto, así que las conexiones que llegan mientras tanto esperan
+  en la cola del sistema en lugar de rechazarse.
+
+Sin fork (Windows) o con workers=1 se usa un único proceso con el pool.
+Los archivos que la aplicación entrega con wsgi.file_wrapper (el audio) se
+envían con sendfile, sin copiar los datos al proceso.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict
+import io
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+# Variable de entorno con el descriptor del socket que hereda el maestro
+# después de un SIGHUP
+LISTEN_FD_ENV = "PODGAKU_LISTEN_FD"
+
+BUSY_RESPONSE = (b"HTTP/1.1 503 Service Unavailable\r\n"
+                 b"Retry-After: 1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+
+class SendfileWrapper:
+    """
+    wsgi.file_wrapper que copia el archivo al socket con sendfile
+    
+    Primero entrega un bloque vacío para que el servidor escriba las
+    cabeceras y después envía desde la posición actual del archivo: hasta
+    filelike.remaining si lo tiene (un rango) o hasta el final. Si no es un
+    archivo real se lee por bloques.
+    """
+    
+    def __init__(self, connection: socket.socket, filelike, block_size: int = 8192):
+        self.connection = connection
+        self.filelike = filelike
+        self.block_size = block_size
+    
+    def __iter__(self):
+        try:
+            fd = self.filelike.fileno()
+            offset = self.filelike.tell()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            yield from iter(lambda: self.filelike.read(self.block_size), b"")
+            return
+        count = getattr(self.filelike, "remaining", None)
+        if count is None:
+            count = os.fstat(fd).st_size - offset
+        yield b""
+        if count > 0:
+            # socket.sendfile respeta el timeout del socket y, si no se puede
+            # usar sendfile (TLS...), lee el archivo por bloques
+            self.connection.sendfile(self.filelike, offset, count)
+    
+    def close(self):
+        close = getattr(self.filelike, "close", None)
+        if close is not None:
+            close()
+
+class PooledRequestHandler(WSGIRequestHandler):
+    """HTTP/1.1 con keep-alive, pero una conexión inactiva no retiene un hilo para siempre"""
+    protocol_version = "HTTP/1.1"
+    timeout = 15
+    
+    def make_environ(self):
+        environ = super().make_environ()
+        environ["wsgi.file_wrapper"] = partial(SendfileWrapper, self.connection)
+        return environ
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Servidor WSGI con un número fijo de hilos y una cola de espera acotada"""
+    multithread = True
+    
+    def __init__(self, app, fd: int, threads: int, max_queue: int):
+        super().__init__("0.0.0.0", 0, app, handler=PooledRequestHandler, fd=fd)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+        # Hilos ocupados + conexiones esperando
+        self.slots = threading.BoundedSemaphore(threads + max_queue)
+    
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            try:
+                request.sendall(BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self.executor.submit(self._process, request, client_address)
+    
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+    
+    def stop(self):
+        """Deja de aceptar conexiones y espera a que terminen las peticiones en curso"""
+        self.shutdown()
+        self.executor.shutdown(wait=True)
+
+def listen_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """Socket de escucha, reutilizando el heredado tras una recarga"""
+    inherited = os.environ.pop(LISTEN_FD_ENV, None)
+    if inherited is not None:
+        sock = socket.socket(fileno=int(inherited))
+    else:
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        sock = socket.create_server((host, port), family=family, backlog=backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(app, sock: socket.socket, threads: int, max_queue: int):
+    """Atiende peticiones en este proceso hasta recibir SIGTERM"""
+    server = PooledWSGIServer(app, sock.fileno(), threads, max_queue)
+    
+    def stop(signum, frame):
+        # shutdown() espera a serve_forever(): desde otro hilo
+        threading.Thread(target=server.stop).start()
+    
+    signal.signal(signal.SIGTERM, stop)
+    server.serve_forever()
+    server.executor.shutdown(wait=True)
+
+class PreforkServer:
+    """Proceso maestro: crea, vigila y recarga los procesos que atienden"""
+    
+    def __init__(self, app, host: str = "0.0.0.0", port: int = 8080, workers: int = None,
+                 threads: int = 8, max_queue: int = 64, backlog: int = 128,
+                 preload: Callable[[], object] = None):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = threads
+        self.max_queue = max_queue
+        self.backlog = backlog
+        self.preload = preload
+        self.children: Dict[int, int] = {}  # pid -> número de hijo
+        self._stopping = False
+        self._reloading = False
+    
+    def serve(self):
+        sock = listen_socket(self.host, self.port, self.backlog)
+        if self.preload:
+            self.preload()
+        print(f"🚀 Servidor de producción en http://{self.host}:{self.port} "
+              f"({self.workers} procesos × {self.threads} hilos, cola {self.max_queue})")
+        
+        if self.workers == 1 or not hasattr(os, "fork"):
+            run_worker(self.app, sock, self.threads, self.max_queue)
+            return
+        
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        for number in range(self.workers):
+            self._spawn(sock, number)
+        
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+            number = self.children.pop(pid, None)
+            if number is not None and not (self._stopping or self._reloading):
+                # Un hijo que muere sin pedirlo se sustituye
+                print(f"⚠️  El proceso {pid} terminó ({status}); arrancando otro")
+                time.sleep(0.5)
+                self._spawn(sock, number)
+        
+        if self._reloading:
+            print("🔄 Recargando el servidor...")
+            sys.stdout.flush()
+            os.environ[LISTEN_FD_ENV] = str(sock.fileno())
+            os.execv(sys.executable, [sys.executable] + sys.argv)
+        sock.close()
+        print("👋 Servidor detenido")
+    
+    def _spawn(self, sock: socket.socket, number: int):
+        pid = os.fork()
+        if pid == 0:
+            # Ctrl+C llega a todo el grupo: los hijos esperan el SIGTERM del maestro
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            try:
+                run_worker(self.app, sock, self.threads, self.max_queue)
+            finally:
+                os._exit(0)
+        self.children[pid] = number
+    
+    def _stop_children(self):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+        self._stop_children()
+    
+    def _on_reload(self, signum, frame):
+        self._reloading = True
+        self._stop_children()
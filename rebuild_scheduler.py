@@ -0,0 +1,115 @@
+"""
+Regeneración del RSS en segundo plano, agrupando peticiones seguidas
+
+Las rutas del servidor web que modifican episodios solo marcan el RSS como
+pendiente: un hilo lo regenera cuando pasan `delay` segundos sin nuevas
+peticiones (o como mucho `max_delay` segundos después de la primera), así que
+una ráfaga de cambios termina en una sola regeneración y la petición no
+espera a que se escriba el RSS.
+"""
+from datetime import datetime
+from typing import Callable, Dict, Optional
+import threading
+import time
+
+class RebuildScheduler:
+    """Ejecuta build() en un hilo propio cuando se ha pedido y ha pasado la ventana"""
+    
+    def __init__(self, build: Callable[[], object], delay: float = 2.0,
+                 max_delay: float = None, name: str = "rss"):
+        self.build = build
+        self.delay = delay
+        self.max_delay = max_delay if max_delay is not None else delay * 5
+        self.name = name
+        self._cond = threading.Condition()
+        self._first_request: Optional[float] = None
+        self._deadline: Optional[float] = None
+        self._merged = 0
+        self._building = False
+        self._builds = 0
+        self._last_build_at: Optional[datetime] = None
+        self._last_build_duration: Optional[float] = None
+        self._last_build_merged = 0
+        self._last_error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def _ensure_thread(self):
+        # Se arranca con la primera petición: en un proceso creado con fork
+        # el hilo del padre no existe y hay que arrancar otro
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"rebuild-{self.name}", daemon=True)
+            self._thread.start()
+    
+    def request(self, delay: float = None):
+        """Marca el RSS como pendiente; delay=0 para regenerarlo cuanto antes"""
+        delay = self.delay if delay is None else delay
+        with self._cond:
+            now = time.monotonic()
+            if self._first_request is None:
+                self._first_request = now
+            # Cada petición aplaza la regeneración, pero nunca más allá de max_delay
+            self._deadline = min(now + delay, self._first_request + self.max_delay)
+            self._merged += 1
+            self._ensure_thread()
+            self._cond.notify_all()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._deadline is None or self._deadline > time.monotonic():
+                    timeout = None if self._deadline is None else self._deadline - time.monotonic()
+                    self._cond.wait(timeout)
+                merged = self._merged
+                self._first_request = self._deadline = None
+                self._merged = 0
+                self._building = True
+            
+            # Lo que se pida durante la regeneración vuelve a marcar el RSS
+            # como pendiente y se regenera otra vez después
+            started = time.perf_counter()
+            error = None
+            try:
+                self.build()
+            except Exception as e:
+                error = str(e)
+                print(f"❌ Error regenerando {self.name} en segundo plano: {e}")
+            
+            with self._cond:
+                self._building = False
+                self._builds += 1
+                self._last_build_at = datetime.now()
+                self._last_build_duration = time.perf_counter() - started
+                self._last_build_merged = merged
+                self._last_error = error
+                self._cond.notify_all()
+    
+    def wait(self, timeout: float = None) -> bool:
+        """Espera a que no quede nada pendiente; False si se agota el tiempo"""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._building or self._deadline is not None:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+    
+    def status(self) -> Dict:
+        """Estado para la API: pendiente, regenerando y datos de la última regeneración"""
+        with self._cond:
+            if self._building:
+                state = "building"
+            elif self._deadline is not None:
+                state = "pending"
+            else:
+                state = "idle"
+            return {
+                "state": state,
+                "pending_requests": self._merged,
+                "builds": self._builds,
+                "last_build_at": self._last_build_at.isoformat() if self._last_build_at else None,
+                "last_build_duration": (round(self._last_build_duration, 3)
+                                        if self._last_build_duration is not None else None),
+                "last_build_requests": self._last_build_merged,
+                "last_error": self._last_error
+            }
@@ -0,0 +1,184 @@
+"""
+Caché de fragmentos <item> del RSS
+
+Cada episodio se renderiza una sola vez: el XML de su <item> se guarda en
+SQLite con una clave que es el hash de su contenido (y de lo que influye en
+cómo se escribe), así que al regenerar el RSS solo se renderizan los
+episodios nuevos o modificados y el resto se copia tal cual. La base de
+datos se comparte entre procesos (CLI, servidor web, pool de update-all).
+"""
+from typing import Callable, Dict, Iterable, List, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from episode_manager import Episode
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key TEXT PRIMARY KEY,
+    fragment TEXT NOT NULL
+);
+
+-- Atajo id + updated_at -> clave, para no leer de disco la descripción y
+-- la tracklist de los episodios que no han cambiado
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fingerprint TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+);
+"""
+
+def _digest(values) -> str:
+    data = json.dumps(values, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+def item_key(episode: Episode, context) -> str:
+    """Hash del contenido del episodio que aparece en su <item>"""
+    return _digest([context, episode.title, episode.description, episode.audio_url,
+                    episode.duration, episode.pub_date_iso(), episode.episode_number,
+                    episode.season, episode.tracklist])
+
+def item_version(episode: Episode, context: tuple) -> Optional[tuple]:
+    """
+    Identifica barato (sin descripción ni tracklist) una versión del episodio
+    
+    Los gestores cambian updated_at en cada modificación, así que id +
+    updated_at identifican el contenido. Sin ellos devuelve None y hay que
+    calcular item_key().
+    """
+    if not episode.id or not episode.updated_at:
+        return None
+    return (context, episode.id, episode.updated_at, episode.title,
+            episode.audio_url, episode.duration, episode.pub_date_iso(),
+            episode.episode_number, episode.season)
+
+class RSSItemCache:
+    """Fragmentos <item> ya renderizados, en memoria y en un fichero SQLite"""
+    
+    def __init__(self, cache_file: str):
+        self.cache_file = cache_file
+        self._conn = None
+        self._conn_pid = None
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._items: Dict[str, str] = {}
+        self._fingerprints: Dict[str, str] = {}
+        # Igual que _fingerprints pero sin hashear, para las regeneraciones
+        # siguientes dentro del mismo proceso
+        self._versions: Dict[tuple, str] = {}
+        self._loaded = False
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Una conexión por proceso: un hijo creado con fork abre la suya
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = sqlite3.connect(self.cache_file, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn_pid = os.getpid()
+        return self._conn
+    
+    def close(self):
+        """Cierra la conexión (se vuelve a abrir al usarla); antes de un fork"""
+        if self._conn is not None and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+    
+    def _load(self):
+        # Primera regeneración del proceso: todo de una vez en lugar de una
+        # consulta por episodio
+        if not self._loaded:
+            self._items.update(self.conn.execute("SELECT key, fragment FROM items"))
+            self._fingerprints.update(self.conn.execute("SELECT fingerprint, key FROM fingerprints"))
+            self._loaded = True
+    
+    def _lookup(self, key: str) -> Optional[str]:
+        fragment = self._items.get(key)
+        if fragment is None:
+            # Puede haberlo renderizado otro proceso después de _load()
+            row = self.conn.execute("SELECT fragment FROM items WHERE key = ?", (key,)).fetchone()
+            if row:
+                fragment = self._items[key] = row[0]
+        return fragment
+    
+    def render_all(self, episodes: Iterable[Episode], context: Callable[[Episode], tuple],
+                   render: Callable[[Episode], str]) -> List[str]:
+        """
+        Fragmentos de los episodios en orden, renderizando solo los que faltan
+        
+        context(episode) devuelve lo que, además del episodio, influye en su
+        <item> (versión del formato, tamaño del audio...).
+        
+        Al terminar guarda los fragmentos nuevos y olvida los que ya no
+        aparecen en el RSS, para que la caché no crezca sin límite.
+        """
+        with self._lock:
+            self._load()
+            used_items: Dict[str, str] = {}
+            used_versions: Dict[tuple, str] = {}
+            new_items, new_fingerprints = [], []
+            fragments = []
+            
+            for episode in episodes:
+                episode_context = context(episode)
+                version = item_version(episode, episode_context)
+                fingerprint = key = None
+                if version is not None:
+                    key = self._versions.get(version)
+                    if key is None:
+                        fingerprint = _digest(version)
+                        key = self._fingerprints.get(fingerprint)
+                fragment = self._lookup(key) if key else None
+                if fragment is None:
+                    key = item_key(episode, episode_context)
+                    fragment = self._lookup(key)
+                    if fragment is None:
+                        fragment = render(episode)
+                        new_items.append((key, fragment))
+                    if version is not None:
+                        fingerprint = fingerprint or _digest(version)
+                        new_fingerprints.append((fingerprint, key))
+                        self._fingerprints[fingerprint] = key
+                used_items[key] = fragment
+                if version is not None:
+                    used_versions[version] = key
+                fragments.append(fragment)
+            
+            self._save(new_items, new_fingerprints, used_items, used_versions)
+        return fragments
+    
+    def _save(self, new_items, new_fingerprints, used_items, used_versions):
+        stale = any(key not in used_items for key in self._items)
+        self._items, self._versions = used_items, used_versions
+        if stale:
+            self._fingerprints = {fingerprint: key for fingerprint, key in self._fingerprints.items()
+                                  if key in used_items}
+        if not new_items and not new_fingerprints and not stale:
+            return
+        try:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO items (key, fragment) VALUES (?, ?)", new_items)
+                self.conn.executemany("INSERT OR REPLACE INTO fingerprints (fingerprint, key) VALUES (?, ?)",
+                                      new_fingerprints)
+                if stale:
+                    # Lo que no está en este RSS sobra (otro proceso que use
+                    # la misma caché lo volverá a renderizar si lo necesita)
+                    self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS used_keys (key TEXT PRIMARY KEY)")
+                    self.conn.execute("DELETE FROM used_keys")
+                    self.conn.executemany("INSERT OR IGNORE INTO used_keys VALUES (?)",
+                                          ((key,) for key in used_items))
+                    self.conn.execute("DELETE FROM items WHERE key NOT IN (SELECT key FROM used_keys)")
+                    self.conn.execute("DELETE FROM fingerprints WHERE key NOT IN (SELECT key FROM used_keys)")
+        except sqlite3.Error as e:
+            # La caché es opcional: el RSS se genera igualmente
+            print(f"⚠️  No se pudo guardar la caché del RSS {self.cache_file}: {e}")
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._fingerprints.clear()
+            self._versions.clear()
+            with self.conn:
+                self.conn.execute("DELETE FROM items")
+                self.conn.execute("DELETE FROM fingerprints")
@@ -1,17 +1,215 @@
 """
 Generador de RSS para podcast
+
+Además del RSS puede generar, en la misma pasada por los episodios, un JSON
+Feed 1.1 y un episodes.json compacto para la web estática.
 """
 from datetime import datetime
-from typing import List
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import uuid
 from episode_manager import Episode
 from podcast_config import PODCAST_CONFIG, SERVER_CONFIG
+from rss_cache import RSSItemCache
+from media_index import MediaIndex, mime_type_for_name
+
+# Cambia si cambia cómo se escribe un <item>: invalida los fragmentos en caché
+ITEM_RENDER_VERSION = 3
+
+# Formatos que se pueden generar: RSS, JSON Feed 1.1 y el índice de la web
+FEED_FORMATS = ("rss", "json", "web")
+
+# Separa los fragmentos de cada formato dentro de una entrada de la caché
+# (no puede aparecer en XML ni sin escapar en JSON)
+FRAGMENT_SEPARATOR = "\x00"
+
+JSON_FEED_VERSION = "https://jsonfeed.org/version/1.1"
+
+# Podcasting 2.0 (https://podcastindex.org/namespace/1.0)
+PODCAST_NS = "https://podcastindex.org/namespace/1.0"
+PODCAST_GUID_NAMESPACE = uuid.UUID("ead4c236-bf58-58c6-a2c6-a6b28d128cb6")
+
+# RFC 5005 (Feed Paging and Archiving)
+FEED_HISTORY_NS = "http://purl.org/syndication/history/1.0"
+
+# Caracteres que XML 1.0 no admite (el parser de minidom los rechazaba)
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+def escape_xml(data: str) -> str:
+    """Escapa texto y atributos igual que minidom"""
+    if _INVALID_XML_CHARS.search(data):
+        raise ValueError(f"Carácter no válido en XML: {data!r}")
+    return (data.replace("&", "&amp;").replace("<", "&lt;")
+            .replace("\"", "&quot;").replace(">", "&gt;"))
+
+class XMLWriter:
+    """
+    Escritor XML en streaming
+    
+    Produce exactamente lo que salía de ElementTree + minidom.toprettyxml(indent="  ")
+    quitando después las líneas en blanco: un elemento por línea, el texto en
+    la misma línea que su etiqueta, elementos vacíos como <tag/>, fines de
+    línea \r normalizados a \n en el texto y sin salto de línea final.
+    """
+    
+    def __init__(self, out: TextIO, indent: str = "  ", depth: int = 0):
+        self._out = out
+        self._indent = indent
+        self._depth = depth
+        self._pending: Optional[str] = None  # Etiqueta abierta aún sin hijos
+        self._partial = ""
+        self._first_line = True
+    
+    def _write(self, data: str):
+        # Las líneas solo con espacios se descartan, como en la salida histórica
+        lines = (self._partial + data).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            if line.strip():
+                self._out.write(line if self._first_line else "\n" + line)
+                self._first_line = False
+    
+    def _open_tag(self, tag: str, attrs: Sequence[Tuple[str, str]]) -> str:
+        parts = [self._indent * self._depth, "<", tag]
+        if attrs:
+            # minidom coloca las declaraciones de espacios de nombres primero
+            attrs = ([attr for attr in attrs if attr[0].startswith("xmlns")]
+                     + [attr for attr in attrs if not attr[0].startswith("xmlns")])
+            for name, value in attrs:
+                parts.append(f' {name}="{escape_xml(value)}"')
+        return "".join(parts)
+    
+    def _flush_pending(self):
+        if self._pending is not None:
+            self._write(self._pending + ">\n")
+            self._pending = None
+    
+    def declaration(self):
+        self._write('<?xml version="1.0" ?>\n')
+    
+    def start(self, tag: str, attrs: Sequence[Tuple[str, str]] = None):
+        """Abre un elemento con hijos"""
+        self._flush_pending()
+        self._pending = self._open_tag(tag, attrs)
+        self._depth += 1
+    
+    def end(self, tag: str):
+        self._depth -= 1
+        if self._pending is not None:
+            # Sin hijos: <tag/>
+            self._write(self._pending + "/>\n")
+            self._pending = None
+        else:
+            self._write(f"{self._indent * self._depth}</{tag}>\n")
+    
+    def element(self, tag: str, text: str = None, attrs: Sequence[Tuple[str, str]] = None):
+        """Elemento sin hijos, con texto opcional"""
+        self._flush_pending()
+        opening = self._open_tag(tag, attrs)
+        if not text:
+            self._write(opening + "/>\n")
+        else:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+            self._write(f"{opening}>{escape_xml(text)}</{tag}>\n")
+    
+    def raw(self, fragment: str):
+        """Copia tal cual un fragmento escrito antes por otro XMLWriter a esta profundidad"""
+        self._flush_pending()
+        if fragment:
+            self._out.write(fragment if self._first_line else "\n" + fragment)
+            self._first_line = False
+    
+    def close(self):
+        """Escribe lo que quede de la última línea"""
+        self._flush_pending()
+        if self._partial.strip():
+            self._out.write(self._partial if self._first_line else "\n" + self._partial)
+        self._partial = ""
+
+class _DigestWriter:
+    """Pasa la salida a out calculando su SHA-256, salvo mientras está en pausa"""
+    
+    def __init__(self, out: TextIO):
+        self._out = out
+        self._hash = hashlib.sha256()
+        self.paused = False
+    
+    def write(self, data: str):
+        if not self.paused:
+            self._hash.update(data.encode('utf-8'))
+        self._out.write(data)
+    
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+def feed_info_file(rss_file: str) -> str:
+    """Fichero con el digest del RSS (podcast.xml -> podcast.xml.digest.json)"""
+    return f"{rss_file}.digest.json"
+
+def read_feed_info(rss_file: str) -> Optional[Dict]:
+    """
+    Digest, fecha de generación y número de episodios del RSS guardado
+    
+    El digest no incluye lastBuildDate, así que solo cambia cuando cambia el
+    contenido. Devuelve None si no hay información o si el RSS se ha
+    modificado después por otra vía.
+    """
+    try:
+        with open(feed_info_file(rss_file), 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        stat = os.stat(rss_file)
+    except (OSError, ValueError):
+        return None
+    if info.get("size") != stat.st_size or info.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return info
+
+def archive_file(rss_file: str, page: int) -> str:
+    """Página de archivo (podcast.xml -> podcast-archive-1.xml, la más antigua)"""
+    stem, ext = os.path.splitext(rss_file)
+    return f"{stem}-archive-{page}{ext}"
+
+def _archive_pages(rss_file: str) -> List[Tuple[int, str]]:
+    stem, ext = os.path.splitext(rss_file)
+    pattern = re.compile(re.escape(f"{os.path.basename(stem)}-archive-") + r"(\d+)" + re.escape(ext) + "$")
+    pages = []
+    for path in glob.glob(f"{glob.escape(stem)}-archive-*{glob.escape(ext)}"):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            pages.append((int(match.group(1)), path))
+    return sorted(pages)
+
+def archive_files(rss_file: str) -> List[str]:
+    """Páginas de archivo que hay en disco, de la más antigua a la más reciente"""
+    return [path for _, path in _archive_pages(rss_file)]
+
+def feed_files(rss_file: str) -> List[str]:
+    """El RSS principal y sus páginas de archivo"""
+    return [rss_file] + archive_files(rss_file)
 
 class RSSGenerator:
-    def __init__(self):
-        self.config = PODCAST_CONFIG
-        self.server_config = SERVER_CONFIG
+    def __init__(self, config: Dict = None, server_config: Dict = None,
+                 item_cache: RSSItemCache = None, page_size: int = None,
+                 media_index: MediaIndex = None, formats: Sequence[str] = ("rss",),
+                 podcast_namespace: bool = False):
+        self.config = config or PODCAST_CONFIG
+        self.server_config = server_config or SERVER_CONFIG
+        # Con caché solo se renderizan los <item> nuevos o modificados
+        self.item_cache = item_cache
+        # Con page_size, save_rss deja los episodios antiguos en páginas de archivo
+        self.page_size = page_size
+        # Tamaño y tipo reales de los audios de episodes/ para <enclosure>
+        self.media_index = media_index
+        # Formatos que se renderizan de cada episodio (el RSS siempre)
+        self.formats = ("rss",) + tuple(fmt for fmt in FEED_FORMATS[1:] if fmt in formats)
+        # Etiquetas podcast:* de Podcasting 2.0 en el RSS
+        self.podcast_namespace = podcast_namespace
     
     def format_duration(self, duration: str) -> str:
         """Convierte duración de HH:MM:SS a segundos"""
@@ -32,165 +230,496 @@ class RSSGenerator:
         """Formatea fecha en formato RFC 2822 para RSS"""
         return date.strftime("%a, %d %b %Y %H:%M:%S GMT")
     
+    def format_date_rfc3339(self, date: datetime) -> str:
+        """Formatea fecha en RFC 3339 para JSON Feed (sin zona: GMT, como en el RSS)"""
+        if date.tzinfo is None:
+            return date.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return date.isoformat()
+    
     def create_rss(self, episodes: List[Episode]) -> str:
         """Genera el XML RSS completo"""
-        # Crear elemento raíz
-        rss = ET.Element("rss")
-        rss.set("version", "2.0")
-        rss.set("xmlns:itunes", "http://www.itunes.com/dtds/podcast-1.0.dtd")
-        rss.set("xmlns:content", "http://purl.org/rss/1.0/modules/content/")
-        rss.set("xmlns:atom", "http://www.w3.org/2005/Atom")
+        buffer = io.StringIO()
+        self.write_rss(episodes, buffer)
+        return buffer.getvalue()
+    
+    def write_rss(self, episodes: Iterable[Episode], out: TextIO,
+                  build_date: datetime = None) -> str:
+        """
+        Escribe el RSS en out (fichero, socket envuelto, StringIO...) en una sola pasada
+        
+        Devuelve el SHA-256 de lo escrito sin contar lastBuildDate.
+        """
+        self._refresh_media()
+        return self._write_feed(out, episodes, build_date)
+    
+    def _write_feed(self, out: TextIO, episodes: Iterable[Episode] = (),
+                    build_date: datetime = None, fragments: List[str] = None,
+                    page_url: str = None, links: Sequence[Tuple[str, str]] = (),
+                    archive: bool = False) -> str:
+        """
+        Escribe un documento RSS: el principal o una página de archivo
+        
+        fragments son los <item> ya renderizados (en lugar de episodes) y
+        links los atom:link de paginación (rel, href).
+        """
+        out = _DigestWriter(out)
+        xml = XMLWriter(out)
+        xml.declaration()
+        root_attrs = [
+            ("version", "2.0"),
+            ("xmlns:itunes", "http://www.itunes.com/dtds/podcast-1.0.dtd"),
+            ("xmlns:content", "http://purl.org/rss/1.0/modules/content/"),
+            ("xmlns:atom", "http://www.w3.org/2005/Atom")
+        ]
+        if self.podcast_namespace:
+            root_attrs.append(("xmlns:podcast", PODCAST_NS))
+        if archive:
+            root_attrs.append(("xmlns:fh", FEED_HISTORY_NS))
+        xml.start("rss", root_attrs)
         
         # Canal
-        channel = ET.SubElement(rss, "channel")
-        
-        # Título
-        title = ET.SubElement(channel, "title")
-        title.text = self.config["title"]
-        
-        # Descripción
-        description = ET.SubElement(channel, "description")
-        description.text = self.config["description"]
-        
-        # Idioma
-        language = ET.SubElement(channel, "language")
-        language.text = self.config["language"]
-        
-        # Autor
-        author = ET.SubElement(channel, "itunes:author")
-        author.text = self.config["author"]
-        
-        # Email (iTunes)
-        email = ET.SubElement(channel, "itunes:email")
-        email.text = self.config["email"]
+        xml.start("channel")
+        xml.element("title", self.config["title"])
+        xml.element("description", self.config["description"])
+        xml.element("language", self.config["language"])
+        xml.element("itunes:author", self.config["author"])
+        xml.element("itunes:email", self.config["email"])
         
         # Owner (iTunes - requerido por Anchor)
-        owner = ET.SubElement(channel, "itunes:owner")
-        owner_email = ET.SubElement(owner, "itunes:email")
-        owner_email.text = self.config["email"]
+        xml.start("itunes:owner")
+        xml.element("itunes:email", self.config["email"])
+        xml.end("itunes:owner")
         
         # Managing Editor (RSS estándar - requerido por muchas plataformas)
-        managing_editor = ET.SubElement(channel, "managingEditor")
-        managing_editor.text = f"{self.config['email']} ({self.config['author']})"
+        xml.element("managingEditor", f"{self.config['email']} ({self.config['author']})")
         
         # WebMaster (RSS estándar - contacto técnico)
-        webmaster = ET.SubElement(channel, "webMaster")
-        webmaster.text = f"{self.config['email']} ({self.config['author']})"
+        xml.element("webMaster", f"{self.config['email']} ({self.config['author']})")
         
-        # Categoría
-        category = ET.SubElement(channel, "itunes:category")
-        category.set("text", self.config["category"])
-        
-        # Imagen
-        image = ET.SubElement(channel, "itunes:image")
-        image.set("href", self.config["image_url"])
-        
-        # Explicit
-        explicit = ET.SubElement(channel, "itunes:explicit")
-        explicit.text = "false" if not self.config["explicit"] else "true"
-        
-        # Tipo
-        podcast_type = ET.SubElement(channel, "itunes:type")
-        podcast_type.text = self.config["type"]
+        xml.element("itunes:category", attrs=[("text", self.config["category"])])
+        xml.element("itunes:image", attrs=[("href", self.config["image_url"])])
+        xml.element("itunes:explicit", "false" if not self.config["explicit"] else "true")
+        xml.element("itunes:type", self.config["type"])
+        if self.podcast_namespace:
+            xml.element("podcast:guid", self.podcast_guid())
         
         # Link al sitio web
-        link = ET.SubElement(channel, "link")
-        link.text = self.config["website"]
+        xml.element("link", self.config["website"])
         
         # Atom link para auto-discovery
-        atom_link = ET.SubElement(channel, "atom:link")
-        atom_link.set("href", f"{self.server_config['base_url']}{self.server_config['rss_path']}")
-        atom_link.set("rel", "self")
-        atom_link.set("type", "application/rss+xml")
-        
-        # Última fecha de construcción
-        last_build_date = ET.SubElement(channel, "lastBuildDate")
-        last_build_date.text = self.format_date_rfc2822(datetime.now())
-        
-        # Generador
-        generator = ET.SubElement(channel, "generator")
-        generator.text = "Podgaku RSS Generator"
+        xml.element("atom:link", attrs=[
+            ("href", page_url or self.feed_url()),
+            ("rel", "self"),
+            ("type", "application/rss+xml")
+        ])
+        
+        # Paginación (RFC 5005)
+        for rel, href in links:
+            xml.element("atom:link", attrs=[("href", href), ("rel", rel), ("type", "application/rss+xml")])
+        if archive:
+            xml.element("fh:archive")
+        
+        # Cada línea se escribe entera en su llamada, así que basta con pausar
+        out.paused = True
+        xml.element("lastBuildDate", self.format_date_rfc2822(build_date or datetime.now()))
+        out.paused = False
+        xml.element("generator", "Podgaku RSS Generator")
         
         # Añadir episodios
-        for episode in episodes:
-            self._add_episode_to_channel(channel, episode)
-        
-        # Convertir a string XML formateado
-        rough_string = ET.tostring(rss, encoding='unicode')
-        reparsed = minidom.parseString(rough_string)
-        
-        # Formatear el XML con indentación
-        pretty_xml = reparsed.toprettyxml(indent="  ")
-        
-        # Limpiar líneas vacías extra que genera toprettyxml
-        lines = [line for line in pretty_xml.split('\n') if line.strip()]
-        return '\n'.join(lines)
+        if fragments is None and self.item_cache is None:
+            for episode in episodes:
+                self._write_item(xml, episode)
+        else:
+            for fragment in fragments if fragments is not None else self._render_fragments(episodes)["rss"]:
+                xml.raw(fragment)
+        
+        xml.end("channel")
+        xml.end("rss")
+        xml.close()
+        return out.hexdigest()
     
-    def _add_episode_to_channel(self, channel, episode: Episode):
-        """Añade un episodio al canal RSS"""
-        item = ET.SubElement(channel, "item")
-        
-        # Título del episodio
-        title = ET.SubElement(item, "title")
-        title.text = episode.title
-        
-        # Descripción
-        description = ET.SubElement(item, "description")
-        description.text = episode.description
-        
-        # Link al episodio
-        link = ET.SubElement(item, "link")
-        link.text = episode.audio_url
-        
-        # GUID
-        guid = ET.SubElement(item, "guid")
-        guid.text = episode.audio_url
-        guid.set("isPermaLink", "true")
-        
-        # Fecha de publicación
-        pub_date = ET.SubElement(item, "pubDate")
-        pub_date.text = self.format_date_rfc2822(episode.pub_date)
-        
-        # Duración
-        duration = ET.SubElement(item, "itunes:duration")
-        duration.text = self.format_duration(episode.duration)
-        
-        # Número de episodio
+    def feed_url(self, page: int = None) -> str:
+        """URL pública del RSS principal o de una de sus páginas de archivo"""
+        rss_path = self.server_config['rss_path']
+        if page is not None:
+            rss_path = archive_file(rss_path, page)
+        return f"{self.server_config['base_url']}{rss_path}"
+    
+    def json_feed_url(self) -> str:
+        """URL pública del JSON Feed (por defecto la del RSS con extensión .json)"""
+        json_path = self.server_config.get('json_feed_path')
+        if not json_path:
+            json_path = os.path.splitext(self.server_config['rss_path'])[0] + ".json"
+        return f"{self.server_config['base_url']}{json_path}"
+    
+    def podcast_guid(self) -> str:
+        """podcast:guid: UUIDv5 de la URL del RSS sin esquema ni barras finales"""
+        url = re.sub(r'^[a-zA-Z]+://', '', self.feed_url()).rstrip('/')
+        return str(uuid.uuid5(PODCAST_GUID_NAMESPACE, url))
+    
+    def _render_fragments(self, episodes: Iterable[Episode]) -> Dict[str, List[str]]:
+        """
+        Fragmentos de cada formato para todos los episodios
+        
+        Es la única pasada por los episodios: cada uno se renderiza (o se saca
+        de la caché) en todos los formatos a la vez.
+        """
+        if self.item_cache is None:
+            bundles = [self._render_bundle(episode) for episode in episodes]
+        else:
+            bundles = self.item_cache.render_all(episodes, self._item_context, self._render_bundle)
+        if len(self.formats) == 1:
+            return {self.formats[0]: bundles}
+        columns = [[] for _ in self.formats]
+        for bundle in bundles:
+            for column, fragment in zip(columns, bundle.split(FRAGMENT_SEPARATOR)):
+                column.append(fragment)
+        return dict(zip(self.formats, columns))
+    
+    def _render_bundle(self, episode: Episode) -> str:
+        """Fragmentos de un episodio en todos los formatos, unidos por FRAGMENT_SEPARATOR"""
+        fields = self._item_fields(episode)
+        renderers = {"rss": self._render_item, "json": self._json_feed_item, "web": self._web_item}
+        return FRAGMENT_SEPARATOR.join(renderers[fmt](episode, fields) for fmt in self.formats)
+    
+    def _item_fields(self, episode: Episode) -> Dict:
+        """Lo que comparten todos los formatos, calculado una vez por episodio"""
+        length, mime_type = self.enclosure(episode)
+        return {
+            # Descripción y tracklist pueden estar en disco: se leen una vez
+            "description": episode.description,
+            "tracklist": episode.tracklist,
+            "length": length,
+            "mime_type": mime_type,
+            "duration": self.format_duration(episode.duration),
+            "pub_date": self.format_date_rfc2822(episode.pub_date)
+        }
+    
+    def _refresh_media(self):
+        if self.media_index is not None:
+            self.media_index.refresh()
+    
+    def enclosure(self, episode: Episode) -> Tuple[str, str]:
+        """
+        (tamaño en bytes, tipo MIME) del audio del episodio
+        
+        Si la URL apunta a un archivo de la carpeta de episodios se usan los
+        datos del índice; si no, tamaño 0 y el tipo según la extensión.
+        """
+        if self.media_index is not None:
+            prefix = f"{self.server_config['base_url']}{self.server_config['episodes_path']}"
+            if episode.audio_url.startswith(prefix):
+                media = self.media_index.lookup(episode.audio_url[len(prefix):])
+                if media is not None:
+                    return str(media[0]), media[1]
+        return "0", mime_type_for_name(episode.audio_url.split('?', 1)[0])
+    
+    def _item_context(self, episode: Episode) -> Tuple:
+        """Lo que, además del episodio, influye en sus fragmentos"""
+        return (ITEM_RENDER_VERSION, self.formats, self.podcast_namespace) + self.enclosure(episode)
+    
+    def _render_item(self, episode: Episode, fields: Dict = None) -> str:
+        """XML de un <item> a la profundidad que ocupa dentro de <channel>"""
+        buffer = io.StringIO()
+        xml = XMLWriter(buffer, depth=2)
+        self._write_item(xml, episode, fields)
+        xml.close()
+        return buffer.getvalue()
+    
+    def _json_feed_item(self, episode: Episode, fields: Dict) -> str:
+        """Elemento de "items" del JSON Feed"""
+        attachment = {"url": episode.audio_url, "mime_type": fields["mime_type"]}
+        if fields["length"] != "0":
+            attachment["size_in_bytes"] = int(fields["length"])
+        if fields["duration"].isdigit():
+            attachment["duration_in_seconds"] = int(fields["duration"])
+        item = {
+            "id": episode.id or episode.audio_url,
+            "url": episode.audio_url,
+            "title": episode.title,
+            "content_text": fields["description"],
+            "date_published": self.format_date_rfc3339(episode.pub_date),
+            "attachments": [attachment]
+        }
+        # Extensión propia (los nombres con _ los ignoran los lectores)
+        extra = {"episode": episode.episode_number, "season": episode.season,
+                 "tracklist": fields["tracklist"]}
+        extra = {key: value for key, value in extra.items() if value}
+        if extra:
+            item["_podgaku"] = extra
+        return json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+    
+    def _web_item(self, episode: Episode, fields: Dict) -> str:
+        """Episodio de episodes.json con los mismos campos que app.js sacaba del RSS"""
+        item = {
+            "title": episode.title,
+            "description": fields["description"],
+            "audio_url": episode.audio_url,
+            "pub_date": fields["pub_date"],
+            "duration": fields["duration"],
+            "episode_number": episode.episode_number,
+            "season": episode.season,
+            "tracklist": fields["tracklist"]
+        }
+        return json.dumps({key: value for key, value in item.items() if value not in (None, [])},
+                          ensure_ascii=False, separators=(",", ":"))
+    
+    def _write_item(self, xml: 'XMLWriter', episode: Episode, fields: Dict = None):
+        """Escribe el <item> de un episodio"""
+        if fields is None:
+            fields = self._item_fields(episode)
+        xml.start("item")
+        xml.element("title", episode.title)
+        xml.element("description", fields["description"])
+        
+        # Link al episodio y GUID
+        xml.element("link", episode.audio_url)
+        xml.element("guid", episode.audio_url, [("isPermaLink", "true")])
+        
+        xml.element("pubDate", fields["pub_date"])
+        xml.element("itunes:duration", fields["duration"])
+        
+        # Número de episodio y temporada
         if episode.episode_number:
-            episode_num = ET.SubElement(item, "itunes:episode")
-            episode_num.text = str(episode.episode_number)
-        
-        # Temporada
+            xml.element("itunes:episode", str(episode.episode_number))
         if episode.season:
-            season = ET.SubElement(item, "itunes:season")
-            season.text = str(episode.season)
+            xml.element("itunes:season", str(episode.season))
         
-        # Explicit
-        explicit = ET.SubElement(item, "itunes:explicit")
-        explicit.text = "false"
+        xml.element("itunes:explicit", "false")
+        xml.element("itunes:episodeType", "full")
         
-        # Tipo de episodio
-        episode_type = ET.SubElement(item, "itunes:episodeType")
-        episode_type.text = "full"
+        # Podcasting 2.0
+        if self.podcast_namespace:
+            if episode.season:
+                xml.element("podcast:season", str(episode.season))
+            if episode.episode_number:
+                xml.element("podcast:episode", str(episode.episode_number))
         
         # Enclosure (archivo de audio)
-        enclosure = ET.SubElement(item, "enclosure")
-        enclosure.set("url", episode.audio_url)
-        enclosure.set("type", "audio/mpeg")
-        enclosure.set("length", "0")  # Se puede calcular el tamaño real del archivo
+        xml.element("enclosure", attrs=[
+            ("url", episode.audio_url),
+            ("type", fields["mime_type"]),
+            ("length", fields["length"])
+        ])
         
         # Tracklist si existe
-        if episode.tracklist:
-            content = ET.SubElement(item, "content:encoded")
+        tracklist = fields["tracklist"]
+        if tracklist:
             tracklist_html = "<p>TRACKLIST:</p><ul>"
-            for track in episode.tracklist:
+            for track in tracklist:
                 tracklist_html += f"<li>{track}</li>"
             tracklist_html += "</ul>"
-            content.text = f"<![CDATA[{tracklist_html}]]>"
-    
-    def save_rss(self, episodes: List[Episode], output_file: str = "podcast.xml"):
-        """Genera y guarda el RSS en un archivo"""
-        rss_content = self.create_rss(episodes)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(rss_content)
-        print(f"RSS generado y guardado en: {output_file}")
+            xml.element("content:encoded", f"<![CDATA[{tracklist_html}]]>")
+        
+        xml.end("item")
+    
+    def save_feeds(self, episodes: List[Episode], output_file: str = "podcast.xml",
+                   json_feed_file: str = None, web_index_file: str = None) -> bool:
+        """
+        Guarda el RSS y, si se indican, el JSON Feed y el episodes.json de la web
+        
+        Los episodios se recorren una sola vez (_render_fragments) y cada
+        documento se compone con los fragmentos de su formato. Como el RSS,
+        los JSON solo se reescriben si cambian. Devuelve True si ha cambiado
+        algún fichero.
+        """
+        json_feed_file = json_feed_file if "json" in self.formats else None
+        web_index_file = web_index_file if "web" in self.formats else None
+        if not json_feed_file and not web_index_file:
+            return self.save_rss(episodes, output_file)
+        
+        self._refresh_media()
+        fragments = self._render_fragments(episodes)
+        changed = self.save_rss(episodes, output_file, fragments=fragments["rss"])
+        
+        if json_feed_file:
+            json_changed = self._save_document(
+                json_feed_file, len(episodes),
+                lambda out, build_date: self._write_json_feed(out, fragments["json"]))
+            print(f"JSON Feed {'generado y guardado' if json_changed else 'sin cambios'} en: {json_feed_file}")
+            changed = json_changed or changed
+        if web_index_file:
+            web_changed = self._save_document(
+                web_index_file, len(episodes),
+                lambda out, build_date: self._write_web_index(out, fragments["web"], build_date))
+            print(f"Índice de la web {'generado y guardado' if web_changed else 'sin cambios'} en: {web_index_file}")
+            changed = web_changed or changed
+        return changed
+    
+    def _write_json_feed(self, out: TextIO, fragments: List[str]) -> str:
+        """JSON Feed 1.1 con los items ya renderizados; devuelve su digest"""
+        out = _DigestWriter(out)
+        feed = {
+            "version": JSON_FEED_VERSION,
+            "title": self.config["title"],
+            "home_page_url": self.config["website"],
+            "feed_url": self.json_feed_url(),
+            "description": self.config["description"],
+            "icon": self.config["image_url"],
+            "authors": [{"name": self.config["author"]}],
+            "language": self.config["language"]
+        }
+        out.write(json.dumps(feed, ensure_ascii=False, separators=(",", ":"))[:-1] + ',"items":[')
+        out.write(",".join(fragments))
+        out.write("]}")
+        return out.hexdigest()
+    
+    def _write_web_index(self, out: TextIO, fragments: List[str], build_date: datetime) -> str:
+        """
+        episodes.json para app.js y admin.js; devuelve su digest
+        
+        Lleva los datos del canal y de cada episodio que la web sacaba del RSS,
+        ya extraídos, para no tener que descargar y parsear el XML.
+        """
+        out = _DigestWriter(out)
+        podcast = {
+            "title": self.config["title"],
+            "description": self.config["description"],
+            "language": self.config["language"],
+            "author": self.config["author"],
+            "email": self.config["email"],
+            "website": self.config["website"],
+            "image": self.config["image_url"],
+            "generator": "Podgaku RSS Generator"
+        }
+        out.write('{"podcast":' + json.dumps(podcast, ensure_ascii=False, separators=(",", ":"))[:-1])
+        # Como en el RSS, la fecha de generación no cuenta para el digest
+        out.paused = True
+        out.write(',"lastBuildDate":' + json.dumps(self.format_date_rfc2822(build_date)))
+        out.paused = False
+        out.write('},"episodes":[')
+        out.write(",".join(fragments))
+        out.write("]}")
+        return out.hexdigest()
+    
+    def save_rss(self, episodes: List[Episode], output_file: str = "podcast.xml",
+                 fragments: List[str] = None) -> bool:
+        """
+        Genera y guarda el RSS en un archivo
+        
+        Se escribe en un temporal que sustituye al RSS de una vez, así que
+        nadie lee un fichero a medias. Si el contenido no ha cambiado (sin
+        contar lastBuildDate) el RSS se deja como estaba, con su fecha, y
+        devuelve False.
+        
+        Con page_size el RSS principal lleva los episodios más recientes y
+        los antiguos van a páginas de archivo de page_size episodios
+        (RFC 5005), enlazadas con atom:link. Las páginas se numeran desde el
+        episodio más antiguo y solo se crean completas, así que no cambian
+        al publicar y solo se reescriben si cambia alguno de sus episodios.
+        El RSS principal lleva entre page_size y 2 * page_size - 1 episodios.
+        
+        fragments son los <item> ya renderizados, si los hay (save_feeds).
+        """
+        total = len(episodes)
+        pages = total // self.page_size - 1 if self.page_size else 0
+        if pages <= 0:
+            self._remove_archives(output_file, keep=0)
+            if fragments is None:
+                write = lambda out, build_date: self.write_rss(episodes, out, build_date)
+            else:
+                write = lambda out, build_date: self._write_feed(out, build_date=build_date, fragments=fragments)
+            changed = self._save_document(output_file, total, write)
+            print(f"RSS generado y guardado en: {output_file}" if changed else f"RSS sin cambios: {output_file}")
+            return changed
+        
+        # Todos los <item> de una vez: la caché ve el catálogo completo
+        if fragments is None:
+            self._refresh_media()
+            fragments = self._render_fragments(episodes)["rss"]
+        archived = pages * self.page_size
+        current = total - archived
+        
+        updated_pages = 0
+        for page in range(1, pages + 1):
+            # Página 1: los page_size episodios más antiguos
+            start, end = total - page * self.page_size, total - (page - 1) * self.page_size
+            links = [("current", self.feed_url())]
+            if page > 1:
+                links += [("prev-archive", self.feed_url(page - 1)), ("next", self.feed_url(page - 1))]
+            if page < pages:
+                links += [("next-archive", self.feed_url(page + 1)), ("previous", self.feed_url(page + 1))]
+            if self._save_document(
+                    archive_file(output_file, page), end - start,
+                    lambda out, build_date: self._write_feed(
+                        out, build_date=build_date, fragments=fragments[start:end],
+                        page_url=self.feed_url(page), links=links, archive=True),
+                    buffered=True):
+                updated_pages += 1
+        self._remove_archives(output_file, keep=pages)
+        
+        links = [("prev-archive", self.feed_url(pages)), ("next", self.feed_url(pages))]
+        changed = self._save_document(
+            output_file, current,
+            lambda out, build_date: self._write_feed(
+                out, build_date=build_date, fragments=fragments[:current], links=links))
+        print(f"RSS {'generado y guardado' if changed else 'sin cambios'} en: {output_file} "
+              f"({current} episodios; {pages} páginas de archivo, {updated_pages} actualizadas)")
+        return changed or updated_pages > 0
+    
+    def _save_document(self, output_file: str, episode_count: int,
+                       write: Callable[[TextIO, datetime], str], buffered: bool = False) -> bool:
+        """
+        Escribe un documento del RSS solo si su digest ha cambiado
+        
+        write(out, build_date) escribe el documento y devuelve su digest. Con
+        buffered se genera primero en memoria (páginas de archivo, pequeñas y
+        casi siempre sin cambios) y no se toca el disco si no hace falta.
+        """
+        previous = read_feed_info(output_file)
+        build_date = datetime.now()
+        if buffered:
+            buffer = io.StringIO()
+            digest = write(buffer, build_date)
+            if previous is not None and previous.get("digest") == digest:
+                return False
+        
+        tmp_file = f"{output_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                if buffered:
+                    f.write(buffer.getvalue())
+                else:
+                    digest = write(f, build_date)
+                unchanged = previous is not None and previous.get("digest") == digest
+                if not unchanged:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if unchanged:
+                os.remove(tmp_file)
+                return False
+            os.replace(tmp_file, output_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        
+        stat = os.stat(output_file)
+        self._save_feed_info(output_file, {
+            "digest": digest,
+            "build_date": self.format_date_rfc2822(build_date),
+            "episodes": episode_count,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns
+        })
+        return True
+    
+    def _remove_archives(self, output_file: str, keep: int):
+        """Borra las páginas de archivo que sobran (se han borrado episodios)"""
+        for page, path in _archive_pages(output_file):
+            if page <= keep:
+                continue
+            for stale in [path, feed_info_file(path), path + ".gz", path + ".br"]:
+                if os.path.exists(stale):
+                    os.remove(stale)
+    
+    def _save_feed_info(self, output_file: str, info: Dict):
+        info_file = feed_info_file(output_file)
+        tmp_file = f"{info_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(info, f, indent=2)
+            os.replace(tmp_file, info_file)
+        except OSError as e:
+            # Sin él, la próxima vez el RSS se reescribe aunque no cambie
+            print(f"⚠️  No se pudo guardar {info_file}: {e}")
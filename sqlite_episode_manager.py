@@ -0,0 +1,541 @@
+"""
+Gestor de episodios respaldado por SQLite
+
+Alternativa a EpisodeManager (episodes.json) con la misma interfaz. Las
+consultas por fecha, temporada/número y URL de audio usan índices en lugar
+de ordenar la lista completa en Python.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Optional
+import json
+import os
+import sqlite3
+import threading
+import weakref
+from episode_manager import (Episode, EpisodePage, ContentCache, QUERY_MAX_LIMIT,
+                             new_episode_id, derive_episode_id, new_change_stamp,
+                             to_change_stamp, to_local_datetime, encode_cursor,
+                             decode_cursor)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    pk INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    audio_url TEXT NOT NULL,
+    duration TEXT NOT NULL,
+    pub_date TEXT NOT NULL,
+    episode_number INTEGER,
+    season INTEGER,
+    tracklist TEXT NOT NULL DEFAULT '[]',
+    updated_at TEXT
+);
+
+-- Episodios eliminados, para que query(since=...) pueda informar de ellos
+CREATE TABLE IF NOT EXISTS episode_tombstones (
+    id TEXT PRIMARY KEY,
+    deleted_at TEXT NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_episodes_id ON episodes (id);
+CREATE INDEX IF NOT EXISTS idx_episodes_pub_date ON episodes (pub_date DESC, pk);
+CREATE INDEX IF NOT EXISTS idx_episodes_season_number ON episodes (season, episode_number);
+CREATE INDEX IF NOT EXISTS idx_episodes_audio_url ON episodes (audio_url);
+CREATE INDEX IF NOT EXISTS idx_episodes_season_pub_date ON episodes (season, pub_date DESC, pk);
+CREATE INDEX IF NOT EXISTS idx_episodes_updated_at ON episodes (updated_at);
+CREATE INDEX IF NOT EXISTS idx_episode_tombstones_deleted_at ON episode_tombstones (deleted_at);
+"""
+
+# Mismo orden que EpisodeManager: más recientes primero y, a igual fecha,
+# en orden de inserción
+ORDER_BY = "ORDER BY pub_date DESC, pk ASC"
+
+COLUMNS = "pk, id, title, description, audio_url, duration, pub_date, episode_number, season, tracklist, updated_at"
+
+# Sin description ni tracklist, que se leen bajo demanda
+LIGHT_COLUMNS = "pk, id, title, audio_url, duration, pub_date, episode_number, season, updated_at"
+
+# Campos que escriben add_episode() y las actualizaciones (en el orden de
+# _episode_values), y los que se pueden cambiar sin cargar el contenido
+WRITE_FIELDS = ("id", "title", "description", "audio_url", "duration", "pub_date",
+                "episode_number", "season", "tracklist")
+LIGHT_WRITE_FIELDS = ("id", "title", "audio_url", "duration", "pub_date",
+                      "episode_number", "season")
+
+def _light_values(episode: Episode) -> tuple:
+    """Valores de LIGHT_WRITE_FIELDS, en ese orden"""
+    return (episode.id, episode.title, episode.audio_url, episode.duration,
+            episode.pub_date_iso(), episode.episode_number, episode.season)
+
+def _content_values(episode: Episode) -> Optional[tuple]:
+    """(descripción, tracklist en JSON), o None si siguen como en la base de datos"""
+    if episode._content is not None:
+        # Sin cargar, o solo se ha leído la tracklist: cambia si se modificó la lista
+        tracklist = episode._tracklist
+        if tracklist is None or tracklist == (episode._stored_content().get("tracklist") or []):
+            return None
+    return (episode.description, json.dumps(episode.tracklist or [], ensure_ascii=False))
+
+def _update_if_changed(fields) -> str:
+    """UPDATE que solo toca (y marca con updated_at) las filas que cambian"""
+    assignments = ", ".join(f"{field} = ?" for field in fields)
+    changed = " OR ".join(f"{field} IS NOT ?" for field in fields)
+    return f"UPDATE episodes SET {assignments}, updated_at = ? WHERE pk = ? AND ({changed})"
+
+class SQLiteEpisodeManager:
+    def __init__(self, db_file: str = "episodes.db", lazy_content: bool = False,
+                 content_cache_size: int = 256):
+        self.db_file = db_file
+        # Varios procesos (servidor web, CLI, scripts) comparten la base de
+        # datos: con WAL los lectores no bloquean al que escribe y timeout
+        # espera a que termine otra escritura en lugar de fallar. Cada hilo
+        # usa su propia conexión: sus lecturas ven siempre un estado
+        # confirmado (nunca la transacción a medias de otro hilo) sin
+        # cerrojos; las escrituras del proceso se serializan con _write_lock
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        # Con lazy_content la descripción y la tracklist se leen por pk al
+        # usarlas, a través de una LRU acotada
+        self.lazy_content = lazy_content
+        self._columns = LIGHT_COLUMNS if lazy_content else COLUMNS
+        self._content_cache = ContentCache(self._read_content, content_cache_size)
+        # Episodios entregados por get_episodes(), para que save_episodes()
+        # pueda persistir cambios hechos directamente sobre los objetos, y
+        # los valores que tenían en la base de datos: solo se escriben los
+        # que han cambiado desde entonces
+        self._tracked = weakref.WeakValueDictionary()
+        self._saved: Dict[int, tuple] = {}
+        self._tracked_lock = threading.Lock()
+        # Dentro de batch() todo va en una única transacción
+        self._batch_depth = 0
+        # Se incrementa con cada cambio, propio o de otro proceso
+        self.generation = 0
+        self.load_episodes()
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Una conexión por hilo y proceso: un hijo creado con fork abre la suya
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            local.conn = sqlite3.connect(self.db_file, timeout=30)
+            local.conn.row_factory = sqlite3.Row
+            local.conn.execute("PRAGMA journal_mode=WAL")
+            local.pid = os.getpid()
+            local.data_version = None
+        return local.conn
+    
+    def close(self):
+        """Cierra la conexión de este hilo (se vuelve a abrir al usarla); antes de un fork"""
+        local = self._local
+        if getattr(local, "conn", None) is not None and local.pid == os.getpid():
+            local.conn.close()
+        local.conn = None
+    
+    def load_episodes(self):
+        """Crea el esquema si no existe"""
+        with self._write_lock, self.conn:
+            self.conn.executescript(SCHEMA)
+            columns = [row["name"] for row in self.conn.execute("PRAGMA table_info(episodes)")]
+            if "id" not in columns:
+                # Bases de datos creadas antes de que los episodios tuvieran id
+                self.conn.execute("ALTER TABLE episodes ADD COLUMN id TEXT")
+            if "updated_at" not in columns:
+                self.conn.execute("ALTER TABLE episodes ADD COLUMN updated_at TEXT")
+            self._assign_missing_ids()
+            self.conn.executescript(INDEXES)
+        self._reset_tracked()
+        self.refresh()
+    
+    def _track(self, pk: int, episode: Episode, saved: tuple = None):
+        """Sigue el episodio; saved son sus valores en la base de datos (por defecto, los actuales)"""
+        if saved is None:
+            saved = (_light_values(episode), _content_values(episode))
+        with self._tracked_lock:
+            self._tracked[pk] = episode
+            self._saved[pk] = saved
+            if len(self._saved) > 2 * len(self._tracked) + 64:
+                # Olvida los valores de los episodios que ya no usa nadie
+                self._saved = {pk: self._saved[pk] for pk in self._tracked.keys() if pk in self._saved}
+    
+    def _reset_tracked(self):
+        with self._tracked_lock:
+            self._tracked = weakref.WeakValueDictionary()
+            self._saved = {}
+    
+    def refresh(self) -> bool:
+        """Detecta cambios hechos por otros procesos (PRAGMA data_version).
+        
+        Las consultas siempre leen de la base de datos, así que solo hay que
+        descartar las descripciones y tracklists cacheadas. Devuelve True si
+        otro proceso ha modificado la base de datos.
+        """
+        # data_version es de cada conexión: cambia con lo que confirman las
+        # demás, también las de otros hilos de este proceso
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._local.data_version:
+            return False
+        self._local.data_version = version
+        self._content_cache.clear()
+        self.generation += 1
+        return True
+    
+    def _assign_missing_ids(self):
+        rows = self.conn.execute(f"SELECT {self._columns} FROM episodes WHERE id IS NULL {ORDER_BY}").fetchall()
+        for row in rows:
+            episode = self._row_to_episode(row)
+            salt = 0
+            episode_id = derive_episode_id(episode)
+            while self.conn.execute("SELECT 1 FROM episodes WHERE id = ?", (episode_id,)).fetchone():
+                salt += 1
+                episode_id = derive_episode_id(episode, salt)
+            self.conn.execute("UPDATE episodes SET id = ? WHERE pk = ?", (episode_id, row["pk"]))
+    
+    @contextmanager
+    def _write(self):
+        """Transacción de escritura; dentro de batch() se confirma al final.
+        
+        Empieza con BEGIN IMMEDIATE para tener el cerrojo de escritura antes
+        de generar las marcas updated_at: así otro proceso no puede confirmar
+        una marca posterior antes que esta.
+        """
+        with self._write_lock:
+            if self._batch_depth:
+                if not self.conn.in_transaction:
+                    self.conn.execute("BEGIN IMMEDIATE")
+                yield self.conn
+            else:
+                with self.conn:
+                    if not self.conn.in_transaction:
+                        self.conn.execute("BEGIN IMMEDIATE")
+                    yield self.conn
+            self.generation += 1
+    
+    def _last_stamp(self) -> Optional[str]:
+        """Marca del último cambio (usa los índices, no recorre la tabla)"""
+        updated = self.conn.execute("SELECT MAX(updated_at) FROM episodes").fetchone()[0]
+        deleted = self.conn.execute("SELECT MAX(deleted_at) FROM episode_tombstones").fetchone()[0]
+        return max(filter(None, (updated, deleted)), default=None)
+    
+    @contextmanager
+    def batch(self):
+        """Agrupa varias operaciones en una sola transacción.
+        
+        Al salir se confirma la transacción (incluidos los cambios hechos
+        sobre episodios ya cargados); si hay una excepción se deshace. Las
+        escrituras de otros hilos esperan a que termine.
+        """
+        with self._write_lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.conn.rollback()
+                    self._reset_tracked()
+                raise
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.save_episodes()
+    
+    @property
+    def episodes(self) -> List[Episode]:
+        """Compatibilidad con EpisodeManager.episodes (solo lectura)
+        
+        La lista se guarda mientras la base de datos no cambie, así que los
+        scripts que recorren manager.episodes[i] no la reconstruyen en cada
+        acceso (y sus cambios sobre los objetos se conservan hasta guardar).
+        """
+        key = (self.conn.execute("PRAGMA data_version").fetchone()[0], self.generation)
+        local = self._local
+        if getattr(local, "episodes_key", None) != key:
+            local.episodes = self.get_episodes()
+            local.episodes_key = key
+        return local.episodes
+    
+    def _read_content(self, pk: int) -> Dict:
+        row = self.conn.execute("SELECT description, tracklist FROM episodes WHERE pk = ?", (pk,)).fetchone()
+        if row is None:
+            return {"description": "", "tracklist": []}
+        return {"description": row["description"], "tracklist": json.loads(row["tracklist"])}
+    
+    def _row_to_episode(self, row: sqlite3.Row) -> Episode:
+        if self.lazy_content:
+            episode = Episode.lazy(
+                title=row["title"],
+                audio_url=row["audio_url"],
+                duration=row["duration"],
+                pub_date=datetime.fromisoformat(row["pub_date"]),
+                episode_number=row["episode_number"],
+                season=row["season"],
+                id=row["id"],
+                content_ref=row["pk"],
+                content_loader=self._content_cache.get,
+                updated_at=row["updated_at"]
+            )
+            self._track(row["pk"], episode, (self._row_light_values(row), None))
+            return episode
+        
+        episode = Episode(
+            title=row["title"],
+            description=row["description"],
+            audio_url=row["audio_url"],
+            duration=row["duration"],
+            pub_date=datetime.fromisoformat(row["pub_date"]),
+            episode_number=row["episode_number"],
+            season=row["season"],
+            tracklist=json.loads(row["tracklist"]),
+            id=row["id"],
+            updated_at=row["updated_at"]
+        )
+        self._track(row["pk"], episode, (self._row_light_values(row),
+                                         (row["description"], row["tracklist"])))
+        return episode
+    
+    @staticmethod
+    def _row_light_values(row: sqlite3.Row) -> tuple:
+        return (row["id"], row["title"], row["audio_url"], row["duration"], row["pub_date"],
+                row["episode_number"], row["season"])
+    
+    def _episode_values(self, episode: Episode) -> tuple:
+        return (
+            episode.id,
+            episode.title,
+            episode.description,
+            episode.audio_url,
+            episode.duration,
+            episode.pub_date.isoformat(),
+            episode.episode_number,
+            episode.season,
+            json.dumps(episode.tracklist or [], ensure_ascii=False),
+            episode.updated_at
+        )
+    
+    def _pk_of(self, episode_id: str) -> Optional[int]:
+        row = self.conn.execute("SELECT pk FROM episodes WHERE id = ?", (episode_id,)).fetchone()
+        return row["pk"] if row else None
+    
+    def save_episodes(self):
+        """Persiste los cambios hechos sobre los episodios ya cargados"""
+        with self._tracked_lock:
+            tracked = [(pk, ep, self._saved.get(pk)) for pk, ep in self._tracked.items()]
+        # Solo los que difieren de lo que se leyó (o se escribió) la última vez;
+        # si la descripción y la tracklist siguen sin cargar, no han cambiado
+        light_rows, full_rows = [], []
+        for pk, ep, saved in tracked:
+            light, content = _light_values(ep), _content_values(ep)
+            if saved is not None and light == saved[0] and (content is None or content == saved[1]):
+                continue
+            if content is None:
+                light_rows.append((pk, ep, light, content))
+            else:
+                full_rows.append((pk, ep, light, content))
+        if not light_rows and not full_rows:
+            return
+        
+        try:
+            with self._write():
+                # Una marca distinta por fila, aunque solo se usan las de las
+                # filas que de verdad han cambiado
+                stamp = self._last_stamp()
+                rows = []
+                for pk, ep, light, content in full_rows:
+                    stamp = new_change_stamp(stamp)
+                    values = light[:2] + content[:1] + light[2:] + content[1:]
+                    rows.append(values + (stamp, pk) + values)
+                self.conn.executemany(_update_if_changed(WRITE_FIELDS), rows)
+                rows = []
+                for pk, ep, light, content in light_rows:
+                    stamp = new_change_stamp(stamp)
+                    rows.append(light + (stamp, pk) + light)
+                self.conn.executemany(_update_if_changed(LIGHT_WRITE_FIELDS), rows)
+            with self._tracked_lock:
+                for pk, ep, light, content in light_rows + full_rows:
+                    if self._tracked.get(pk) is ep:
+                        self._saved[pk] = (light, content)
+            for pk, ep, light, content in full_rows:
+                self._content_cache.discard(pk)
+        except Exception as e:
+            print(f"Error guardando episodios: {e}")
+    
+    def add_episode(self, episode: Episode):
+        """Añade un nuevo episodio"""
+        with self._write():
+            if episode.id is None or self._pk_of(episode.id) is not None:
+                episode.id = new_episode_id()
+            episode.updated_at = new_change_stamp(self._last_stamp())
+            cursor = self.conn.execute(
+                """INSERT INTO episodes (id, title, description, audio_url, duration,
+                   pub_date, episode_number, season, tracklist, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                self._episode_values(episode)
+            )
+            self.conn.execute("DELETE FROM episode_tombstones WHERE id = ?", (episode.id,))
+        self._track(cursor.lastrowid, episode)
+    
+    def get_episodes(self) -> List[Episode]:
+        """Obtiene todos los episodios ordenados por fecha (más recientes primero)"""
+        rows = self.conn.execute(f"SELECT {self._columns} FROM episodes {ORDER_BY}").fetchall()
+        return [self._row_to_episode(row) for row in rows]
+    
+    def get_latest_episode(self) -> Optional[Episode]:
+        """Obtiene el episodio más reciente"""
+        row = self.conn.execute(f"SELECT {self._columns} FROM episodes {ORDER_BY} LIMIT 1").fetchone()
+        return self._row_to_episode(row) if row else None
+    
+    def get_episode(self, episode_id: str) -> Optional[Episode]:
+        """Obtiene un episodio por su id"""
+        row = self.conn.execute(f"SELECT {self._columns} FROM episodes WHERE id = ?", (episode_id,)).fetchone()
+        return self._row_to_episode(row) if row else None
+    
+    def get_episode_by_audio_url(self, audio_url: str) -> Optional[Episode]:
+        """Busca un episodio por su URL de audio"""
+        row = self.conn.execute(
+            f"SELECT {self._columns} FROM episodes WHERE audio_url = ? LIMIT 1", (audio_url,)
+        ).fetchone()
+        return self._row_to_episode(row) if row else None
+    
+    def get_episode_by_number(self, season: int, episode_number: int) -> Optional[Episode]:
+        """Busca un episodio por temporada y número"""
+        row = self.conn.execute(
+            f"SELECT {self._columns} FROM episodes WHERE season IS ? AND episode_number IS ? {ORDER_BY} LIMIT 1",
+            (season, episode_number)
+        ).fetchone()
+        return self._row_to_episode(row) if row else None
+    
+    def query(self, limit: int = 50, cursor: str = None, season: int = None,
+              date_from=None, date_to=None, since=None) -> EpisodePage:
+        """Consulta paginada de episodios (misma semántica que EpisodeManager.query).
+        
+        Las eliminaciones se guardan en episode_tombstones, así que los
+        cambios desde cualquier marca se pueden reconstruir (nunca reset).
+        """
+        limit = max(1, min(int(limit), QUERY_MAX_LIMIT))
+        conditions, params = [], []
+        if season is not None:
+            conditions.append("season = ?")
+            params.append(season)
+        if date_from is not None:
+            conditions.append("pub_date >= ?")
+            params.append(to_local_datetime(date_from).isoformat())
+        if date_to is not None:
+            conditions.append("pub_date <= ?")
+            params.append(to_local_datetime(date_to).isoformat())
+        if since is not None:
+            return self._query_changes(to_change_stamp(since), limit, conditions, params)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        total = self.conn.execute(f"SELECT COUNT(*) FROM episodes {where}", params).fetchone()[0]
+        next_since = self._last_stamp()
+        if cursor:
+            pub_iso, episode_id = decode_cursor(cursor, 2)
+            pk = self._pk_of(episode_id)
+            if pk is not None:
+                conditions.append("(pub_date < ? OR (pub_date = ? AND pk > ?))")
+                params.extend((pub_iso, pub_iso, pk))
+            else:
+                # El episodio del cursor ya no existe: se repite su fecha
+                conditions.append("pub_date <= ?")
+                params.append(pub_iso)
+            where = f"WHERE {' AND '.join(conditions)}"
+        
+        rows = self.conn.execute(
+            f"SELECT {self._columns} FROM episodes {where} {ORDER_BY} LIMIT ?", params + [limit + 1]
+        ).fetchall()
+        has_more = len(rows) > limit
+        episodes = [self._row_to_episode(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(episodes[-1].pub_date_iso(), episodes[-1].id) if has_more else None
+        return EpisodePage(episodes, next_cursor=next_cursor, has_more=has_more,
+                           total=total, next_since=next_since)
+    
+    def _query_changes(self, since: str, limit: int, conditions: List[str], params: List) -> EpisodePage:
+        where = " AND ".join(["updated_at > ?"] + conditions)
+        rows = self.conn.execute(
+            f"SELECT {self._columns} FROM episodes WHERE {where} ORDER BY updated_at LIMIT ?",
+            [since] + params + [limit + 1]
+        ).fetchall()
+        tombstones = self.conn.execute(
+            "SELECT id, deleted_at FROM episode_tombstones WHERE deleted_at > ? ORDER BY deleted_at LIMIT ?",
+            (since, limit + 1)
+        ).fetchall()
+        entries = sorted([(row["updated_at"], row, None) for row in rows]
+                         + [(row["deleted_at"], None, row["id"]) for row in tombstones],
+                         key=lambda entry: entry[0])
+        
+        episodes, deleted = [], []
+        for stamp, row, episode_id in entries[:limit]:
+            if row is None:
+                deleted.append(episode_id)
+            else:
+                episodes.append(self._row_to_episode(row))
+        next_since = entries[min(limit, len(entries)) - 1][0] if entries else since
+        return EpisodePage(episodes, has_more=len(entries) > limit, deleted=deleted,
+                           next_since=next_since)
+    
+    def update_episode_by_id(self, episode_id: str, episode: Episode) -> bool:
+        """Actualiza el episodio con el id indicado"""
+        with self._write_lock:
+            pk = self._pk_of(episode_id)
+            if pk is None:
+                return False
+            episode.id = episode_id
+            self._update_pk(pk, episode)
+        return True
+    
+    def delete_episode_by_id(self, episode_id: str) -> bool:
+        """Elimina el episodio con el id indicado"""
+        with self._write_lock:
+            pk = self._pk_of(episode_id)
+            if pk is None:
+                return False
+            self._delete_pk(pk)
+        return True
+    
+    def update_episode(self, episode_id: str, episode: Episode) -> bool:
+        """Actualiza un episodio existente por su id (igual que update_episode_by_id)"""
+        return self.update_episode_by_id(episode_id, episode)
+    
+    def delete_episode(self, episode_id: str) -> bool:
+        """Elimina un episodio por su id (igual que delete_episode_by_id)"""
+        return self.delete_episode_by_id(episode_id)
+    
+    def _update_pk(self, pk: int, episode: Episode):
+        with self._write():
+            episode.updated_at = new_change_stamp(self._last_stamp())
+            self.conn.execute(
+                """UPDATE episodes SET id = ?, title = ?, description = ?, audio_url = ?,
+                   duration = ?, pub_date = ?, episode_number = ?, season = ?,
+                   tracklist = ?, updated_at = ? WHERE pk = ?""",
+                self._episode_values(episode) + (pk,)
+            )
+        self._track(pk, episode)
+        self._content_cache.discard(pk)
+    
+    def _delete_pk(self, pk: int):
+        with self._write():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO episode_tombstones (id, deleted_at) SELECT id, ? FROM episodes WHERE pk = ?",
+                (new_change_stamp(self._last_stamp()), pk)
+            )
+            self.conn.execute("DELETE FROM episodes WHERE pk = ?", (pk,))
+        with self._tracked_lock:
+            self._tracked.pop(pk, None)
+        self._content_cache.discard(pk)
+    
+    def clear_episodes(self):
+        """Elimina todos los episodios"""
+        with self._write():
+            stamp = self._last_stamp()
+            tombstones = []
+            for row in self.conn.execute("SELECT id FROM episodes ORDER BY pk"):
+                stamp = new_change_stamp(stamp)
+                tombstones.append((row["id"], stamp))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO episode_tombstones (id, deleted_at) VALUES (?, ?)", tombstones)
+            self.conn.execute("DELETE FROM episodes")
+        self._reset_tracked()
+        self._content_cache.clear()
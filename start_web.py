@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
 """
 Script para iniciar el servidor web del podcast
+    
+    python start_web.py                  # desarrollo (recarga y depurador)
+    python start_web.py --production     # varios procesos, ver WEB_SERVER_CONFIG
 """
+import argparse
 import os
 import sys
-from web_server import app
+from podcast_config import WEB_SERVER_CONFIG
+from web_server import app, preload
 
 def main():
+    parser = argparse.ArgumentParser(description="Servidor web de Podgaku")
+    parser.add_argument('--production', action='store_true',
+                        help='Servidor de producción con varios procesos e hilos')
+    parser.add_argument('--workers', type=int, help='Procesos que atienden peticiones')
+    parser.add_argument('--threads', type=int, help='Hilos por proceso')
+    parser.add_argument('--port', type=int, default=WEB_SERVER_CONFIG["port"])
+    args = parser.parse_args()
+    
     print("🎙️  Iniciando Podgaku Web Server...")
-    print("📡 Servidor disponible en: http://localhost:8080")
+    print(f"📡 Servidor disponible en: http://localhost:{args.port}")
     print("🔄 Presiona Ctrl+C para detener el servidor")
     print("-" * 50)
     
@@ -16,8 +29,22 @@ def main():
     os.makedirs('uploads', exist_ok=True)
     os.makedirs('episodes', exist_ok=True)
     
+    if args.production:
+        from production_server import PreforkServer
+        PreforkServer(
+            app,
+            host=WEB_SERVER_CONFIG["host"],
+            port=args.port,
+            workers=args.workers or WEB_SERVER_CONFIG["workers"],
+            threads=args.threads or WEB_SERVER_CONFIG["threads"],
+            max_queue=WEB_SERVER_CONFIG["max_queue"],
+            backlog=WEB_SERVER_CONFIG["backlog"],
+            preload=preload
+        ).serve()
+        return
+    
     # Iniciar el servidor
-    app.run(debug=True, host='0.0.0.0', port=8080)
+    app.run(debug=True, host='0.0.0.0', port=args.port)
 
 if __name__ == '__main__':
     main()
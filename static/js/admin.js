@@ -8,6 +8,11 @@ class AdminManager {
         this.filteredEpisodes = [];
         this.currentFilter = 'all';
         this.currentFile = null;
+        // Marca del último cambio visto, para pedir solo lo que cambie después
+        this.since = null;
+        this.pageSize = 100;
+        // Trozos del audio que se suben a la vez
+        this.uploadConcurrency = 4;
         this.init();
     }
 
@@ -90,19 +95,64 @@ class AdminManager {
         document.getElementById('episodeForm').addEventListener('submit', this.handleFormSubmit.bind(this));
     }
 
+    async fetchEpisodesPage(params) {
+        const query = new URLSearchParams({ limit: this.pageSize, ...params });
+        const response = await fetch(`/api/episodes?${query}`);
+        if (!response.ok) {
+            throw new Error('Error al cargar episodios');
+        }
+        return response.json();
+    }
+
     async loadEpisodes() {
+        // Carga por páginas, mostrando cada una según llega
         try {
-            const response = await fetch('/api/episodes');
-            if (!response.ok) {
-                throw new Error('Error al cargar episodios');
-            }
-            this.episodes = await response.json();
+            this.episodes = [];
+            let cursor = null;
+            do {
+                const page = await this.fetchEpisodesPage(cursor ? { cursor } : {});
+                if (!cursor) {
+                    this.since = page.next_since;
+                }
+                const known = new Set(this.episodes.map(episode => episode.id));
+                this.episodes.push(...page.episodes.filter(episode => !known.has(episode.id)));
+                this.filterEpisodes(this.currentFilter);
+                cursor = page.next_cursor;
+            } while (cursor);
         } catch (error) {
             console.error('Error:', error);
             this.showNotification('Error al cargar los episodios', 'error');
         }
     }
 
+    async syncEpisodes() {
+        // Pide solo los episodios cambiados o eliminados desde la última carga
+        if (!this.since) {
+            return this.loadEpisodes();
+        }
+        try {
+            let page;
+            do {
+                page = await this.fetchEpisodesPage({ since: this.since });
+                if (page.reset) {
+                    this.since = null;
+                    return this.loadEpisodes();
+                }
+                const changed = new Map(page.episodes.map(episode => [episode.id, episode]));
+                const deleted = new Set(page.deleted);
+                this.episodes = this.episodes
+                    .filter(episode => !changed.has(episode.id) && !deleted.has(episode.id))
+                    .concat(page.episodes)
+                    .sort((a, b) => new Date(b.pub_date) - new Date(a.pub_date));
+                this.since = page.next_since;
+            } while (page.has_more);
+            this.filterEpisodes(this.currentFilter);
+        } catch (error) {
+            console.error('Error:', error);
+            this.showNotification('Error al actualizar los episodios', 'error');
+        }
+    }
+
     handleDragOver(e) {
         e.preventDefault();
         e.currentTarget.classList.add('dragover');
@@ -204,10 +254,7 @@ class AdminManager {
             await this.uploadEpisode(episodeData);
             this.showNotification('Episodio guardado correctamente', 'success');
             this.resetForm();
-            await this.loadEpisodes();
-            this.filteredEpisodes = [...this.episodes];
-            this.renderEpisodes();
-            this.updateEpisodeCount();
+            await this.syncEpisodes();
         } catch (error) {
             console.error('Error al guardar episodio:', error);
             this.showNotification('Error al guardar el episodio', 'error');
@@ -215,18 +262,28 @@ class AdminManager {
     }
 
     async uploadEpisode(episodeData) {
-        const formData = new FormData();
-        formData.append('title', episodeData.title);
-        formData.append('description', episodeData.description);
-        formData.append('duration', episodeData.duration);
-        formData.append('episode_number', episodeData.episode_number || '');
-        formData.append('season', episodeData.season || '');
-        formData.append('tracklist', JSON.stringify(episodeData.tracklist));
-        formData.append('audio_file', episodeData.audio_file);
+        // Primero el audio, por trozos reanudables; después el episodio
+        const upload = await this.uploadFileResumable(episodeData.audio_file);
+        if (!episodeData.duration && upload.job) {
+            // Sin duración en el formulario: la de los metadatos del servidor
+            const job = await this.waitForJob(upload.job).catch(() => null);
+            if (job && job.result && job.result.metadata) {
+                episodeData.duration = job.result.metadata.duration || episodeData.duration;
+            }
+        }
 
         const response = await fetch('/api/episodes', {
             method: 'POST',
-            body: formData
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                title: episodeData.title,
+                description: episodeData.description,
+                duration: episodeData.duration,
+                episode_number: episodeData.episode_number,
+                season: episodeData.season,
+                tracklist: episodeData.tracklist,
+                filename: upload.filename
+            })
         });
 
         if (!response.ok) {
@@ -234,6 +291,140 @@ class AdminManager {
         }
     }
 
+    async uploadFileResumable(file) {
+        // Subida por trozos (/api/uploads, al estilo tus): los trozos van en
+        // paralelo y, si se corta, se reanuda desde lo que ya llegó
+        const storageKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+        let status = null;
+        const savedId = localStorage.getItem(storageKey);
+        if (savedId) {
+            const response = await fetch(`/api/uploads/${savedId}`);
+            if (response.ok) {
+                status = await response.json();
+            }
+        }
+        if (!status) {
+            const response = await fetch('/api/uploads', {
+                method: 'POST',
+                headers: {
+                    'Tus-Resumable': '1.0.0',
+                    'Upload-Length': String(file.size),
+                    'Upload-Metadata': `filename ${btoa(unescape(encodeURIComponent(file.name)))}`
+                }
+            });
+            if (!response.ok) {
+                const error = await response.json().catch(() => ({}));
+                throw new Error(error.error || 'Error al iniciar la subida');
+            }
+            status = await response.json();
+            status.received = [];
+            localStorage.setItem(storageKey, status.id);
+        }
+
+        // Trozos que faltan según los rangos que ya tiene el servidor
+        const chunkSize = status.chunk_size;
+        const pending = [];
+        for (let offset = 0; offset < file.size; offset += chunkSize) {
+            const end = Math.min(offset + chunkSize, file.size);
+            if (!status.received.some(([start, stop]) => start <= offset && end <= stop)) {
+                pending.push(offset);
+            }
+        }
+
+        let done = Math.ceil(file.size / chunkSize) - pending.length;
+        const total = Math.ceil(file.size / chunkSize);
+        let lastPercent = 0;
+        const worker = async () => {
+            while (pending.length > 0) {
+                const offset = pending.shift();
+                await this.uploadChunk(status.id, file.slice(offset, offset + chunkSize), offset);
+                done++;
+                const percent = Math.floor(done * 10 / total) * 10;
+                if (percent > lastPercent) {
+                    lastPercent = percent;
+                    this.showNotification(`Subiendo audio: ${percent}%`, 'info');
+                }
+            }
+        };
+        await Promise.all(Array.from({ length: this.uploadConcurrency }, worker));
+
+        const response = await fetch(`/api/uploads/${status.id}/complete`, { method: 'POST' });
+        if (!response.ok) {
+            throw new Error('Error al completar la subida');
+        }
+        localStorage.removeItem(storageKey);
+        // 202: los metadatos se extraen en un trabajo (upload.job)
+        return response.json();
+    }
+
+    async waitForJob(job, interval = 1000) {
+        // Consulta /api/jobs/<id> hasta que el trabajo termine
+        while (job.status === 'queued' || job.status === 'running') {
+            await new Promise(resolve => setTimeout(resolve, interval));
+            const response = await fetch(`/api/jobs/${job.id}`);
+            if (!response.ok) {
+                throw new Error('Error consultando el trabajo');
+            }
+            job = await response.json();
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'El trabajo ha fallado');
+        }
+        return job;
+    }
+
+    async runJob(kind, label, params = {}) {
+        // Encola un trabajo (RSS, despliegue) y avisa cuando termine
+        const response = await fetch('/api/jobs', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ kind, params })
+        });
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok) {
+            this.showNotification(data.error || `Error: ${label}`, 'error');
+            return;
+        }
+        this.showNotification(`${label} en curso...`, 'info');
+        try {
+            await this.waitForJob(data.job, 2000);
+            this.showNotification(`${label}: completado`, 'success');
+        } catch (error) {
+            console.error(`Error en ${kind}:`, error);
+            this.showNotification(`${label}: ${error.message}`, 'error');
+        }
+    }
+
+    async uploadChunk(uploadId, chunk, offset, attempts = 3) {
+        const headers = {
+            'Tus-Resumable': '1.0.0',
+            'Content-Type': 'application/offset+octet-stream',
+            'Upload-Offset': String(offset)
+        };
+        if (window.crypto && crypto.subtle) {
+            const digest = await crypto.subtle.digest('SHA-1', await chunk.arrayBuffer());
+            headers['Upload-Checksum'] = `sha1 ${btoa(String.fromCharCode(...new Uint8Array(digest)))}`;
+        }
+        for (let attempt = 1; ; attempt++) {
+            // Reintenta cortes de red y checksums incorrectos (460)
+            let response = null;
+            try {
+                response = await fetch(`/api/uploads/${uploadId}`, { method: 'PATCH', headers, body: chunk });
+            } catch (error) {
+                if (attempt >= attempts) {
+                    throw error;
+                }
+                continue;
+            }
+            if (response.ok) {
+                return;
+            }
+            if (attempt >= attempts) {
+                throw new Error(`Error subiendo el trozo ${offset}: ${response.status}`);
+            }
+        }
+    }
+
     resetForm() {
         document.getElementById('episodeForm').reset();
         document.getElementById('fileInput').value = '';
@@ -0,0 +1,299 @@
+"""
+Generador de la web estática: portada paginada, una página por episodio y sitemap.xml
+
+Parte de la plantilla de la web pública (web_static/index.html) y escribe en
+site_dir el HTML ya con los episodios, para que se vean sin esperar a que
+app.js descargue y procese el RSS (app.js sigue funcionando encima: filtros
+por temporada, reproducir). Las páginas de episodio solo se regeneran cuando
+cambia su episodio o la plantilla.
+"""
+from datetime import datetime
+from html import escape
+from typing import Dict, List
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from episode_manager import Episode
+from rss_cache import item_key, item_version
+from rss_generator import XMLWriter
+
+# Súbelo cuando cambie el HTML que se genera para cada episodio
+SITE_RENDER_VERSION = 1
+
+EPISODES_DIR = "episodios"
+MANIFEST_NAME = ".site_manifest.json"
+# Episodios por página de la portada: index.html y luego pagina-2.html, ...
+SITE_PAGE_SIZE = 50
+
+_EPISODES_LIST = re.compile(r'(<div id="episodesList"[^>]*>).*?(</div>\s*</section>)', re.S)
+_EPISODE_COUNT = re.compile(r'(<span id="episodeCount"[^>]*>)[^<]*(</span>)')
+_MAIN = re.compile(r'<main class="main-content">.*?</main>', re.S)
+_APP_SCRIPT = re.compile(r'\s*<script src="app\.js[^"]*"></script>')
+_TITLE = re.compile(r'<title>[^<]*</title>')
+_PAGE_ID = re.compile(r'[/-]([^/-]+)\.html$')
+
+def _write_if_changed(path: str, content: str) -> bool:
+    data = content.encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+def _page_key(episode: Episode, context: tuple) -> str:
+    """Clave de la página de un episodio: id + updated_at si los hay, sin leer su contenido"""
+    version = item_version(episode, context)
+    if version is None:
+        return item_key(episode, context)
+    data = json.dumps(version, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+def _page_id(path: str) -> str:
+    """Id del episodio a partir de la ruta de su página (va siempre al final)"""
+    match = _PAGE_ID.search(path)
+    return match.group(1) if match else path
+
+class StaticSiteGenerator:
+    def __init__(self, config: Dict, site_dir: str = "site",
+                 template_file: str = "web_static/index.html", site_url: str = None,
+                 page_size: int = SITE_PAGE_SIZE):
+        self.config = config
+        self.site_dir = site_dir
+        self.template_file = template_file
+        self.site_url = (site_url or config["website"]).rstrip('/')
+        self.page_size = max(1, page_size)
+        if os.path.abspath(os.path.join(site_dir, "index.html")) == os.path.abspath(template_file):
+            raise ValueError("site_dir no puede ser la carpeta de la plantilla (se sobrescribiría)")
+    
+    def episode_path(self, episode: Episode) -> str:
+        """Ruta de la página del episodio dentro de la web (episodios/<número>-<id>.html)"""
+        # Sin el título: la URL no cambia al editarlo. Si cambia el número, la
+        # ruta anterior se queda como redirección (ver build)
+        suffix = episode.id or item_key(episode, None)[:12]
+        prefix = f"{episode.episode_number}-" if episode.episode_number else ""
+        return f"{EPISODES_DIR}/{prefix}{suffix}.html"
+    
+    @staticmethod
+    def index_path(page: int) -> str:
+        """Ruta de una página de la portada (la primera es index.html)"""
+        return "index.html" if page == 1 else f"pagina-{page}.html"
+    
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(os.path.join(self.site_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def build(self, episodes: List[Episode]) -> List[str]:
+        """
+        Genera la web en site_dir; devuelve los ficheros escritos
+        
+        Las páginas de episodio y las de la portada usan el manifiesto (claves
+        id + updated_at) para no renderizar, ni leer la descripción y la
+        tracklist, de lo que no ha cambiado. Las páginas de episodios borrados
+        se eliminan.
+        """
+        with open(self.template_file, 'r', encoding='utf-8') as f:
+            template = f.read()
+        context = (SITE_RENDER_VERSION, hashlib.sha1(template.encode('utf-8')).hexdigest(), self.site_url)
+        os.makedirs(os.path.join(self.site_dir, EPISODES_DIR), exist_ok=True)
+        
+        manifest = self._load_manifest()
+        pages = manifest.get("pages", {})
+        redirects = manifest.get("redirects", {})
+        new_pages, written = {}, []
+        paths_by_id, keys = {}, []
+        for episode in episodes:
+            path = self.episode_path(episode)
+            key = _page_key(episode, context)
+            keys.append(key)
+            full_path = os.path.join(self.site_dir, path)
+            if pages.get(path) != key or not os.path.exists(full_path):
+                if _write_if_changed(full_path, self.render_episode_page(template, episode)):
+                    written.append(full_path)
+            new_pages[path] = key
+            paths_by_id[_page_id(path)] = path
+        
+        # Las rutas antiguas de episodios que siguen existiendo (con el título
+        # en el nombre o con otro número) redirigen a la actual
+        new_redirects = {}
+        for path in set(pages) | set(redirects):
+            if path in new_pages:
+                continue
+            target = paths_by_id.get(_page_id(path))
+            full_path = os.path.join(self.site_dir, path)
+            if target is None:
+                try:
+                    os.remove(full_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            if redirects.get(path) != target or not os.path.exists(full_path):
+                if _write_if_changed(full_path, self.render_redirect(target)):
+                    written.append(full_path)
+            new_redirects[path] = target
+        
+        old_index_pages = manifest.get("index_pages") or {}
+        if isinstance(old_index_pages, list):
+            old_index_pages = dict.fromkeys(old_index_pages)
+        index_pages = {}
+        page_count = max(1, -(-len(episodes) // self.page_size))
+        for page in range(1, page_count + 1):
+            path = self.index_path(page)
+            start = (page - 1) * self.page_size
+            key = hashlib.sha1(json.dumps([context, page, len(episodes), keys[start:start + self.page_size]])
+                               .encode('utf-8')).hexdigest()
+            index_file = os.path.join(self.site_dir, path)
+            if old_index_pages.get(path) != key or not os.path.exists(index_file):
+                if _write_if_changed(index_file, self.render_index(template, episodes, page)):
+                    written.append(index_file)
+            index_pages[path] = key
+        for path in set(old_index_pages) - set(index_pages):
+            try:
+                os.remove(os.path.join(self.site_dir, path))
+            except FileNotFoundError:
+                pass
+        sitemap_file = os.path.join(self.site_dir, "sitemap.xml")
+        if _write_if_changed(sitemap_file, self.render_sitemap(episodes)):
+            written.append(sitemap_file)
+        
+        if (new_pages, new_redirects, index_pages) != (pages, redirects, manifest.get("index_pages")):
+            manifest.update(pages=new_pages, redirects=new_redirects, index_pages=index_pages)
+            _write_if_changed(os.path.join(self.site_dir, MANIFEST_NAME),
+                              json.dumps(manifest, indent=2, ensure_ascii=False, sort_keys=True))
+        print(f"🌐 Web estática en {self.site_dir}: {len(written)} ficheros actualizados, "
+              f"{len(episodes)} episodios")
+        return written
+    
+    def _episode_card(self, episode: Episode, link: bool = True, player: bool = False) -> str:
+        """Tarjeta de episodio con el mismo HTML que renderEpisodes() de app.js"""
+        title = escape(episode.title)
+        if link:
+            title = f'<a href="{self.episode_path(episode)}">{title}</a>'
+        meta = [f'<span><i class="fas fa-calendar"></i> {episode.pub_date.day}/{episode.pub_date.month}/{episode.pub_date.year}</span>',
+                f'<span><i class="fas fa-clock"></i> {escape(episode.duration or "")}</span>']
+        if episode.episode_number:
+            meta.append(f'<span><i class="fas fa-hashtag"></i> Episodio {episode.episode_number}</span>')
+        if episode.season:
+            meta.append(f'<span><i class="fas fa-tv"></i> Temporada {episode.season}</span>')
+        audio_url = escape(episode.audio_url)
+        if player:
+            actions = f'<audio controls preload="none" src="{audio_url}"></audio>'
+        else:
+            actions = (f'<button class="btn btn-small btn-outline" data-audio-url="{audio_url}">\n'
+                       f'                            <i class="fas fa-play"></i> Reproducir\n'
+                       f'                        </button>')
+        tracklist = ""
+        if episode.tracklist:
+            tracks = "".join(f"<li>{escape(track)}</li>" for track in episode.tracklist)
+            tracklist = f"""
+                    <div class="tracklist">
+                        <h4><i class="fas fa-music"></i> Tracklist</h4>
+                        <ul>{tracks}</ul>
+                    </div>"""
+        description = escape(episode.description).replace("\n", "<br>")
+        return f"""
+            <div class="episode-card" data-season="{episode.season or ''}">
+                <div class="episode-header">
+                    <div>
+                        <div class="episode-title">{title}</div>
+                        <div class="episode-meta">
+                            {''.join(meta)}
+                        </div>
+                    </div>
+                    <div class="episode-actions">
+                        {actions}
+                        <a href="{audio_url}" download class="btn btn-small btn-secondary">
+                            <i class="fas fa-download"></i> Descargar
+                        </a>
+                    </div>
+                </div>
+                <div class="episode-content">
+                    <div class="episode-description">{description}</div>{tracklist}
+                </div>
+            </div>"""
+    
+    def render_index(self, template: str, episodes: List[Episode], page: int = 1) -> str:
+        """Página de la portada con sus episodios ya en el HTML (app.js la sustituye por la lista completa)"""
+        start = (page - 1) * self.page_size
+        cards = "".join(self._episode_card(episode) for episode in episodes[start:start + self.page_size])
+        page_count = max(1, -(-len(episodes) // self.page_size))
+        if page_count > 1:
+            links = []
+            if page > 1:
+                links.append(f'<a href="{self.index_path(page - 1)}" class="btn btn-small btn-outline">'
+                             f'<i class="fas fa-arrow-left"></i> Más recientes</a>')
+            links.append(f'<span>Página {page} de {page_count}</span>')
+            if page < page_count:
+                links.append(f'<a href="{self.index_path(page + 1)}" class="btn btn-small btn-outline">'
+                             f'Más antiguos <i class="fas fa-arrow-right"></i></a>')
+            cards += f"""
+            <nav class="pagination">
+                {' '.join(links)}
+            </nav>"""
+        count = f"{len(episodes)} episodio{'s' if len(episodes) != 1 else ''}"
+        html = _EPISODES_LIST.sub(lambda m: m.group(1) + cards + "\n                " + m.group(2), template, count=1)
+        return _EPISODE_COUNT.sub(lambda m: m.group(1) + count + m.group(2), html, count=1)
+    
+    def render_episode_page(self, template: str, episode: Episode) -> str:
+        """Página de un episodio, con la cabecera y estilos de la portada"""
+        summary = escape(" ".join(episode.description.split())[:160])
+        head = (f'<title>{escape(episode.title)} - {escape(self.config["title"].split(":")[0])}</title>\n'
+                f'    <base href="../">\n'
+                f'    <meta name="description" content="{summary}">\n'
+                f'    <link rel="canonical" href="{self.site_url}/{self.episode_path(episode)}">')
+        main = f"""<main class="main-content">
+            <section class="episodes-section">
+                <h3><a href="index.html"><i class="fas fa-arrow-left"></i> Todos los episodios</a></h3>
+                <div class="episodes-list">{self._episode_card(episode, link=False, player=True)}
+                </div>
+            </section>
+        </main>"""
+        html = _TITLE.sub(lambda m: head, template, count=1)
+        html = _MAIN.sub(lambda m: main, html, count=1)
+        # Sin app.js: volvería a pintar la lista completa de episodios
+        return _APP_SCRIPT.sub("", html, count=1)
+    
+    def render_redirect(self, target: str) -> str:
+        """Página mínima que lleva de una ruta antigua de episodio a la actual"""
+        url = escape(f"{self.site_url}/{target}")
+        return (f'<!DOCTYPE html>\n<html lang="es">\n<head>\n'
+                f'    <meta charset="UTF-8">\n'
+                f'    <meta http-equiv="refresh" content="0; url={url}">\n'
+                f'    <link rel="canonical" href="{url}">\n'
+                f'    <title>Redirigiendo...</title>\n'
+                f'</head>\n<body>\n    <a href="{url}">{url}</a>\n</body>\n</html>\n')
+    
+    def render_sitemap(self, episodes: List[Episode]) -> str:
+        """sitemap.xml con la portada y las páginas de episodio"""
+        buffer = io.StringIO()
+        xml = XMLWriter(buffer)
+        xml.declaration()
+        xml.start("urlset", [("xmlns", "http://www.sitemaps.org/schemas/sitemap/0.9")])
+        xml.start("url")
+        xml.element("loc", f"{self.site_url}/")
+        if episodes:
+            xml.element("lastmod", max(self._lastmod(episode) for episode in episodes))
+        xml.end("url")
+        for episode in episodes:
+            xml.start("url")
+            xml.element("loc", f"{self.site_url}/{self.episode_path(episode)}")
+            xml.element("lastmod", self._lastmod(episode))
+            xml.end("url")
+        xml.end("urlset")
+        xml.close()
+        return buffer.getvalue()
+    
+    def _lastmod(self, episode: Episode) -> str:
+        value = episode.updated_at or episode.pub_date_iso()
+        return datetime.fromisoformat(value).strftime("%Y-%m-%d")
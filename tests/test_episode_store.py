@@ -0,0 +1,207 @@
+"""
+Pruebas del almacén JSON de EpisodeManager: diario, consolidación,
+conflictos entre procesos y query(since=...) después de consolidar
+"""
+from datetime import datetime
+import os
+import subprocess
+import sys
+import pytest
+import episode_store
+from episode_manager import Episode, EpisodeManager, StoreConflictError, run_batch
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_episode(n: int) -> Episode:
+    return Episode(title=f"Episodio {n}", description=f"Descripción {n}",
+                   audio_url=f"https://example.com/{n}.mp3", duration="00:30:00",
+                   pub_date=datetime(2024, 1, n), episode_number=n,
+                   tracklist=[f"Canción {n}"])
+
+def titles(manager: EpisodeManager):
+    return [episode.title for episode in manager.get_episodes()]
+
+@pytest.fixture
+def episodes_file(tmp_path):
+    return str(tmp_path / "episodes.json")
+
+# Diario y consolidación
+
+def test_journal_replay(episodes_file):
+    manager = EpisodeManager(episodes_file)
+    for n in (1, 2, 3):
+        manager.add_episode(make_episode(n))
+    first, second = manager.get_episodes()[2], manager.get_episodes()[1]
+    manager.delete_episode_by_id(first.id)
+    edited = second.copy()
+    edited.title = "Editado"
+    manager.update_episode_by_id(second.id, edited)
+    
+    # Todo está aún en el diario, sin snapshot
+    assert not os.path.exists(episodes_file)
+    assert os.path.exists(episodes_file + ".journal")
+    reloaded = EpisodeManager(episodes_file)
+    assert titles(reloaded) == ["Episodio 3", "Editado"]
+    assert reloaded.get_episode(second.id).tracklist == ["Canción 2"]
+    assert reloaded.get_episode(first.id) is None
+
+def test_journal_ignores_torn_record(episodes_file):
+    manager = EpisodeManager(episodes_file)
+    manager.add_episode(make_episode(1))
+    with open(episodes_file + ".journal", "ab") as f:
+        f.write(b'{"op": "add", "episode": {"tit')
+    
+    reloaded = EpisodeManager(episodes_file)
+    assert titles(reloaded) == ["Episodio 1"]
+    # El siguiente registro no queda pegado a la línea rota
+    reloaded.add_episode(make_episode(2))
+    assert titles(EpisodeManager(episodes_file)) == ["Episodio 2", "Episodio 1"]
+
+def test_journal_compacts_into_snapshot(episodes_file):
+    manager = EpisodeManager(episodes_file, max_journal_bytes=1)
+    manager.add_episode(make_episode(1))
+    manager.add_episode(make_episode(2))
+    
+    assert os.path.exists(episodes_file)
+    assert not os.path.exists(episodes_file + ".journal")
+    assert titles(EpisodeManager(episodes_file)) == ["Episodio 2", "Episodio 1"]
+
+def test_stale_journal_is_discarded(episodes_file):
+    manager = EpisodeManager(episodes_file)
+    manager.add_episode(make_episode(1))
+    with open(episodes_file + ".journal", "rb") as f:
+        journal = f.read()
+    manager.save_episodes()
+    # Un diario escrito sobre un snapshot anterior ya está incluido en el actual
+    with open(episodes_file + ".journal", "wb") as f:
+        f.write(journal)
+    
+    assert titles(EpisodeManager(episodes_file)) == ["Episodio 1"]
+    assert not os.path.exists(episodes_file + ".journal")
+
+# Varios procesos sobre el mismo almacén
+
+def test_refresh_applies_changes_from_another_process(episodes_file):
+    manager = EpisodeManager(episodes_file)
+    manager.add_episode(make_episode(1))
+    
+    subprocess.run([sys.executable, "-c", (
+        "import sys; from datetime import datetime;"
+        "from episode_manager import Episode, EpisodeManager;"
+        "EpisodeManager(sys.argv[1]).add_episode(Episode('Episodio 2', '', 'u', '1',"
+        " datetime(2024, 1, 2)))"), episodes_file], cwd=REPO_DIR, check=True)
+    
+    assert manager.refresh()
+    assert titles(manager) == ["Episodio 2", "Episodio 1"]
+    # Las escrituras se hacen sobre el estado al día, sin perder la ajena
+    manager.add_episode(make_episode(3))
+    assert titles(EpisodeManager(episodes_file)) == ["Episodio 3", "Episodio 2", "Episodio 1"]
+
+def test_batch_conflicts_when_snapshot_is_rewritten(episodes_file):
+    manager = EpisodeManager(episodes_file)
+    other = EpisodeManager(episodes_file)
+    
+    with pytest.raises(StoreConflictError):
+        with manager.batch():
+            manager.add_episode(make_episode(1))
+            other.add_episode(make_episode(2))
+            other.save_episodes()
+    
+    # Los cambios del bloque se descartan y el estado queda recargado
+    assert titles(manager) == ["Episodio 2"]
+    assert titles(EpisodeManager(episodes_file)) == ["Episodio 2"]
+
+def test_batch_merges_journal_from_another_process(episodes_file):
+    manager = EpisodeManager(episodes_file)
+    other = EpisodeManager(episodes_file)
+    
+    with manager.batch():
+        manager.add_episode(make_episode(1))
+        other.add_episode(make_episode(2))
+    
+    assert titles(EpisodeManager(episodes_file)) == ["Episodio 2", "Episodio 1"]
+
+def test_run_batch_retries_after_conflict(episodes_file):
+    manager = EpisodeManager(episodes_file)
+    other = EpisodeManager(episodes_file)
+    attempts, retries = [], []
+    
+    def operation(m):
+        attempts.append(len(m.get_episodes()))
+        m.add_episode(make_episode(1))
+        if len(attempts) == 1:
+            other.add_episode(make_episode(2))
+            other.save_episodes()
+        return len(attempts)
+    
+    result = run_batch(manager, operation, on_retry=lambda attempt, error: retries.append(attempt))
+    assert result == 2
+    assert retries == [1]
+    # El segundo intento ya parte del estado recargado
+    assert attempts == [0, 1]
+    assert titles(EpisodeManager(episodes_file)) == ["Episodio 2", "Episodio 1"]
+
+def test_run_batch_gives_up_after_attempts(episodes_file):
+    manager = EpisodeManager(episodes_file)
+    other = EpisodeManager(episodes_file)
+    
+    def operation(m):
+        m.add_episode(make_episode(1))
+        other.save_episodes()
+    
+    with pytest.raises(StoreConflictError):
+        run_batch(manager, operation, attempts=2)
+    assert titles(EpisodeManager(episodes_file)) == []
+
+# query(since=...) después de consolidar
+
+def test_since_survives_compaction(episodes_file):
+    manager = EpisodeManager(episodes_file)
+    for n in (1, 2, 3):
+        manager.add_episode(make_episode(n))
+    manager.save_episodes()
+    since = manager.snapshot().last_stamp
+    
+    removed, kept = manager.get_episodes()[1], manager.get_episodes()[0]
+    manager.delete_episode_by_id(removed.id)
+    edited = kept.copy()
+    edited.title = "Editado"
+    manager.update_episode_by_id(kept.id, edited)
+    manager.save_episodes()
+    
+    page = EpisodeManager(episodes_file).query(since=since)
+    assert not page.reset
+    assert page.deleted == [removed.id]
+    assert [episode.title for episode in page.episodes] == ["Editado"]
+    # Nada más desde la última marca
+    last = EpisodeManager(episodes_file).query(since=page.next_since)
+    assert (last.episodes, last.deleted, last.reset) == ([], [], False)
+
+def test_since_resets_after_pruned_deletions(episodes_file, monkeypatch):
+    monkeypatch.setattr(episode_store, "MAX_TOMBSTONES", 2)
+    manager = EpisodeManager(episodes_file)
+    for n in (1, 2, 3, 4):
+        manager.add_episode(make_episode(n))
+    since = manager.snapshot().last_stamp
+    for episode in manager.get_episodes()[:3]:
+        manager.delete_episode_by_id(episode.id)
+    manager.save_episodes()
+    
+    reloaded = EpisodeManager(episodes_file)
+    # La primera eliminación se ha olvidado: hay que recargar
+    assert reloaded.query(since=since).reset
+    assert len(reloaded.snapshot().tombstones) == 2
+    page = reloaded.query()
+    assert not reloaded.query(since=page.next_since).reset
+
+def test_since_resets_without_change_log(episodes_file):
+    manager = EpisodeManager(episodes_file)
+    manager.add_episode(make_episode(1))
+    manager.save_episodes()
+    since = manager.snapshot().last_stamp
+    manager.add_episode(make_episode(2))
+    manager.save_episodes()
+    os.remove(episodes_file + ".changes")
+    
+    # Sin el registro no se sabe qué se borró antes del snapshot
+    assert EpisodeManager(episodes_file).query(since=since).reset
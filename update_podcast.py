@@ -2,15 +2,19 @@
 """
 Script inteligente para actualizar el podcast en el servidor SFTP
 - Solo sube episodios nuevos (que no existen en el servidor)
-- Siempre actualiza el RSS
+- Solo sube el RSS si su contenido ha cambiado
 - Mantiene un registro de archivos subidos
 """
 import os
 import json
+import posixpath
 import paramiko
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime
+from podcast_config import SHOWS, DEFAULT_SHOW
+from rss_generator import read_feed_info, archive_files
+from precompress import precompress_files, variants
 
 def load_env_file():
     """Cargar variables de entorno desde .env"""
@@ -54,20 +58,58 @@ def check_remote_file_exists(sftp, remote_path):
     except:
         return False
 
-def update_podcast():
-    """Función principal para actualizar el podcast"""
-    load_env_file()
+def upload_feed_file(sftp, local_file, remote_path, uploaded_files):
+    """Sube un documento del RSS (y sus .gz / .br) solo si ha cambiado"""
+    # El digest de rss_generator no cuenta lastBuildDate: regenerar el
+    # RSS sin cambios en los episodios no obliga a subirlo otra vez
+    rss_info = read_feed_info(str(local_file))
+    rss_hash = f"sha256:{rss_info['digest']}" if rss_info else get_file_hash(local_file)
+    stored_hash = uploaded_files.get(local_file.name, {}).get('hash')
+    if stored_hash == rss_hash and check_remote_file_exists(sftp, remote_path):
+        print(f"\n⏭️ {local_file.name} sin cambios, no se sube")
+        return "⏭️ Sin cambios"
+    
+    print(f"\n📄 Actualizando RSS en {remote_path}...")
+    try:
+        # Versiones .gz / .br para que el servidor no comprima en cada petición
+        precompress_files([str(local_file)])
+        for variant in variants(str(local_file)):
+            suffix = variant[len(str(local_file)):]
+            sftp.put(variant, remote_path + suffix)
+            print(f"   ✅ Subido: {remote_path}{suffix}")
+        sftp.put(str(local_file), remote_path)
+        uploaded_files[local_file.name] = {
+            'hash': rss_hash,
+            'uploaded_at': datetime.now().isoformat(),
+            'size': os.path.getsize(local_file)
+        }
+        print("✅ RSS actualizado correctamente")
+        return "✅ Actualizado"
+    except Exception as e:
+        print(f"❌ Error actualizando RSS: {e}")
+        print(f"💡 Verifica que el directorio padre de {remote_path} existe")
+        return "❌ Error"
+
+def update_podcast(env=None):
+    """Función principal para actualizar el podcast
+    
+    Con env (un dict, p. ej. de load_env.read_env_file) las credenciales se
+    leen de ahí sin tocar os.environ; si no, se cargan desde .env.
+    """
+    if env is None:
+        load_env_file()
+        env = os.environ
     
     print("🎙️ ACTUALIZADOR INTELIGENTE DE PODCAST")
     print("=" * 45)
     
     # Cargar variables de entorno
-    ftp_host = os.getenv('FTP_HOST')
-    ftp_username = os.getenv('FTP_USERNAME') 
-    ftp_password = os.getenv('FTP_PASSWORD')
-    ftp_port = int(os.getenv('FTP_PORT', 22))
-    episodes_dir = os.getenv('FTP_EPISODES_DIR')
-    rss_path = os.getenv('FTP_RSS_PATH')
+    ftp_host = env.get('FTP_HOST')
+    ftp_username = env.get('FTP_USERNAME') 
+    ftp_password = env.get('FTP_PASSWORD')
+    ftp_port = int(env.get('FTP_PORT', 22))
+    episodes_dir = env.get('FTP_EPISODES_DIR')
+    rss_path = env.get('FTP_RSS_PATH')
     
     # Verificar variables requeridas
     required_vars = {
@@ -151,22 +193,32 @@ def update_podcast():
                         new_episodes.append(file_name)
                     
                     print(f"   ✅ Subido: {file_name}")
-                    
+                
                 except Exception as e:
                     print(f"   ❌ Error subiendo {file_name}: {e}")
         else:
             print("⚠️ Carpeta 'episodes' no encontrada")
         
-        # 2. SIEMPRE ACTUALIZAR EL RSS
+        # 2. ACTUALIZAR EL RSS SI HA CAMBIADO
         rss_file = Path('podcast.xml')
+        rss_status = "❌ No encontrado"
         if rss_file.exists():
-            print(f"\n📄 Actualizando RSS en {rss_path}...")
-            try:
-                sftp.put(str(rss_file), rss_path)
-                print("✅ RSS actualizado correctamente")
-            except Exception as e:
-                print(f"❌ Error actualizando RSS: {e}")
-                print(f"💡 Verifica que el directorio padre de {rss_path} existe")
+            # Primero las páginas de archivo (RFC 5005) para que los enlaces
+            # del RSS principal funcionen en cuanto se publique
+            for archive in archive_files(str(rss_file)):
+                remote_archive = posixpath.join(posixpath.dirname(rss_path), os.path.basename(archive))
+                upload_feed_file(sftp, Path(archive), remote_archive, uploaded_files)
+            rss_status = upload_feed_file(sftp, rss_file, rss_path, uploaded_files)
+            # JSON Feed y episodes.json de la web, junto al RSS (la web lee
+            # rss.xml y episodes.json de la misma carpeta). Las rutas son las
+            # del show (con los mismos valores por defecto que PodcastManager);
+            # las que estén a None no se generan
+            show_config = SHOWS[DEFAULT_SHOW]
+            json_feed_file = show_config.get('json_feed_file', f"{os.path.splitext(show_config.get('rss_file', 'podcast.xml'))[0]}.json")
+            for json_file in (json_feed_file, show_config.get('web_index_file')):
+                if json_file and os.path.exists(json_file):
+                    remote_json = posixpath.join(posixpath.dirname(rss_path), os.path.basename(json_file))
+                    upload_feed_file(sftp, Path(json_file), remote_json, uploaded_files)
         else:
             print("⚠️ Archivo podcast.xml no encontrado")
             print("💡 Ejecuta 'python main.py update' para generar el RSS")
@@ -203,10 +255,10 @@ def update_podcast():
         print(f"   Nuevos: {len(new_episodes)}")
         print(f"   Actualizados: {len(updated_episodes)}")
         print(f"   Omitidos: {len(skipped_episodes)}")
-        print(f"   RSS: ✅ Actualizado")
+        print(f"   RSS: {rss_status}")
         
         return True
-        
+    
     except paramiko.AuthenticationException:
         print("❌ Error de autenticación. Verifica tu usuario y contraseña.")
         return False
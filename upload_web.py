@@ -2,20 +2,24 @@
 """
 Script para subir el frontend web estático al servidor
 """
+import glob
 import os
 import paramiko
 from pathlib import Path
 from load_env import load_env_file
+from precompress import precompress_files, variants
 
-def upload_web_frontend():
-    """Sube el frontend web estático al servidor"""
+def upload_web_frontend(env=None):
+    """Sube el frontend web estático al servidor (credenciales de env o de .env)"""
     
-    load_env_file()
+    if env is None:
+        load_env_file()
+        env = os.environ
     
-    host = os.getenv('FTP_HOST')
-    port = int(os.getenv('FTP_PORT', '22'))
-    username = os.getenv('FTP_USERNAME')
-    password = os.getenv('FTP_PASSWORD')
+    host = env.get('FTP_HOST')
+    port = int(env.get('FTP_PORT', '22'))
+    username = env.get('FTP_USERNAME')
+    password = env.get('FTP_PASSWORD')
     
     print("🌐 Subiendo Frontend Web de Podgaku")
     print("=" * 35)
@@ -43,18 +47,37 @@ def upload_web_frontend():
             ('web_static/app.js', '/www/app.js'),
             ('web_static/admin.js', '/www/admin.js'),
             ('web_static/style.css', '/www/style.css'),
+            ('web_static/episodes.json', '/www/episodes.json'),
             ('web_static/img/banner.png', '/www/img/banner.png'),
             ('web_static/img/logo.jpg', '/www/img/logo.jpg'),
             ('web_static/img/logo3000.png', '/www/img/logo3000.png')
         ]
         
-        # Crear directorio img si no existe
-        try:
-            sftp.stat('/www/img')
-            print("📁 Directorio /www/img existe")
-        except FileNotFoundError:
-            print("📁 Creando directorio /www/img...")
-            sftp.mkdir('/www/img')
+        # Web estática generada por static_site.py (python main.py update):
+        # portada paginada con los episodios ya en el HTML, páginas de episodio y sitemap
+        site_dir = 'site'
+        if os.path.exists(os.path.join(site_dir, 'index.html')):
+            web_files[0] = (os.path.join(site_dir, 'index.html'), '/www/index.html')
+            web_files.append((os.path.join(site_dir, 'sitemap.xml'), '/www/sitemap.xml'))
+            for page in sorted(glob.glob(os.path.join(site_dir, 'pagina-*.html'))):
+                web_files.append((page, f"/www/{os.path.basename(page)}"))
+            for page in sorted(glob.glob(os.path.join(site_dir, 'episodios', '*.html'))):
+                web_files.append((page, f"/www/episodios/{os.path.basename(page)}"))
+        
+        # Crear directorios si no existen
+        for remote_dir in ('/www/img', '/www/episodios'):
+            try:
+                sftp.stat(remote_dir)
+                print(f"📁 Directorio {remote_dir} existe")
+            except FileNotFoundError:
+                print(f"📁 Creando directorio {remote_dir}...")
+                sftp.mkdir(remote_dir)
+        
+        # Versiones .gz / .br de HTML, JS y CSS (solo se regeneran si han cambiado)
+        compressed = precompress_files([local_path for local_path, _ in web_files])
+        for local_path, written in compressed.items():
+            for variant in written:
+                print(f"🗜️  Comprimido: {variant}")
         
         # Subir archivos
         print(f"\n📁 Subiendo {len(web_files)} archivos web...")
@@ -64,6 +87,8 @@ def upload_web_frontend():
             if local_file.exists():
                 print(f"   [{i}/{len(web_files)}] {local_file.name}...")
                 try:
+                    for variant in variants(local_path):
+                        sftp.put(variant, remote_path + variant[len(local_path):])
                     sftp.put(str(local_file), remote_path)
                     print(f"   ✅ Subido: {local_file.name}")
                 except Exception as e:
@@ -81,7 +106,7 @@ def upload_web_frontend():
         print(f"   📡 RSS Feed: https://podgaku.jdlcgarcia.es/rss.xml")
         
         return True
-        
+    
     except Exception as e:
         print(f"❌ Error: {e}")
         return False
@@ -3,24 +3,127 @@ Servidor web Flask para el frontend del podcast
 """
 import os
 import json
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from werkzeug.utils import secure_filename
+import base64
+import io
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+from flask import Flask, Response, abort, render_template, request, jsonify
+from werkzeug.utils import safe_join, secure_filename
+from werkzeug.wsgi import wrap_file
 from mutagen import File as MutagenFile
 from mutagen.id3 import ID3NoHeaderError
-from podcast_manager import PodcastManager
+from podcast_registry import PodcastRegistry
+from episode_manager import Episode
+from feed_cache import FeedCache, RSS_MIMETYPE, JSON_FEED_MIMETYPE
+from chunked_upload import UploadStore, ChecksumMismatchError, UploadOffsetError
+from rss_generator import archive_file
+from media_index import mime_type_for_name
+from jobs import JobQueue, JobQueueFullError, STATUSES
+from podcast_config import JOBS_CONFIG
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['EPISODES_FOLDER'] = 'episodes'
+# Audios servidos a la vez como mucho; el resto recibe 503 + Retry-After
+# para que los reproductores no acaparen todos los hilos del servidor
+app.config['MAX_AUDIO_STREAMS'] = 32
 
-# Crear carpetas si no existen
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['EPISODES_FOLDER'], exist_ok=True)
+# Gestores de los podcasts, creados al usarlos. Las rutas /api/... sin prefijo
+# trabajan sobre el show por defecto; /api/shows/<show_id>/... sobre cualquiera.
+# El RSS se regenera en segundo plano: las peticiones no esperan a escribirlo
+registry = PodcastRegistry(background_rebuilds=True)
 
-# Inicializar el gestor del podcast
-podcast_manager = PodcastManager()
+def get_show(show_id=None):
+    """Gestor del show de la petición (404 si no existe)"""
+    manager = registry.get(show_id)
+    if manager is None:
+        abort(404, description=f"Show desconocido: {show_id}")
+    return manager
+
+# Subidas reanudables por trozos (/api/uploads) y trabajos en segundo plano
+# (/api/jobs: metadatos de las subidas, RSS y despliegue; las peticiones los
+# encolan y responden sin esperarlos). Los crea init_app(), no el import
+upload_store: Optional[UploadStore] = None
+job_queue: Optional[JobQueue] = None
+_init_lock = threading.Lock()
+
+# RSS y JSON Feed en memoria, recargados cuando se regeneran en disco
+feed_cache = FeedCache()
+
+# Los clientes (o la caché que haya delante) revalidan siempre, y la
+# revalidación es un 304 sin cuerpo
+FEED_CACHE_CONTROL = "public, no-cache"
+
+# Rutas que sirven el feed o los audios y no necesitan el almacén
+FEED_ENDPOINTS = ('serve_feed', 'serve_feed_archive', 'serve_json_feed', 'serve_episode')
+
+def init_app():
+    """
+    Prepara el servidor: carpetas, subidas y cola de trabajos, limpiando lo
+    que dejaron a medias ejecuciones anteriores
+    
+    Se hace una sola vez, desde preload() o con la primera petición, para
+    que importar el módulo no cree ni borre nada en disco.
+    """
+    global upload_store, job_queue
+    if job_queue is not None:
+        return
+    with _init_lock:
+        if job_queue is not None:
+            return
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        os.makedirs(app.config['EPISODES_FOLDER'], exist_ok=True)
+        upload_store = UploadStore(app.config['UPLOAD_FOLDER'])
+        upload_store.cleanup()
+        queue = JobQueue(**JOBS_CONFIG)
+        for kind, (handler, max_attempts) in JOB_HANDLERS.items():
+            queue.register(kind, handler, max_attempts=max_attempts)
+        queue.cleanup()
+        # Lo último: las demás peticiones esperan hasta aquí
+        job_queue = queue
+
+def preload():
+    """
+    Carga todos los shows y sus feeds antes de arrancar los procesos del
+    servidor de producción: los heredan con fork ya cargados en lugar de
+    leer cada uno los episodios y los feeds de disco
+    """
+    init_app()
+    for manager in registry.preload():
+        feed_cache.get(manager.rss_file, RSS_MIMETYPE)
+        if manager.json_feed_file:
+            feed_cache.get(manager.json_feed_file, JSON_FEED_MIMETYPE)
+    registry.before_fork()
+
+@app.before_request
+def setup():
+    """Prepara el servidor con la primera petición si no se hizo con preload()"""
+    init_app()
+
+@app.before_request
+def start_jobs():
+    """Arranca el pool de trabajos de este proceso (tras el fork, en cada hijo)"""
+    if request.endpoint not in FEED_ENDPOINTS:
+        job_queue.start()
+
+@app.before_request
+def refresh_episodes():
+    """Recoge los cambios hechos por otros procesos (CLI, scripts de importación)"""
+    if request.endpoint in FEED_ENDPOINTS:
+        return
+    manager = registry.get((request.view_args or {}).get('show_id'))
+    if manager is not None:
+        manager.episode_manager.refresh()
+
+@app.after_request
+def reload_feeds(response):
+    """Tras una petición que puede regenerar el RSS, servir ya la versión nueva"""
+    if request.method not in ('GET', 'HEAD'):
+        feed_cache.invalidate()
+    return response
 
 def extract_mp3_metadata(file_path):
     """Extrae metadatos de un archivo MP3"""
@@ -65,7 +168,7 @@ def extract_mp3_metadata(file_path):
         metadata['file_name'] = os.path.basename(file_path)
         
         return metadata
-        
+    
     except Exception as e:
         print(f"Error extrayendo metadatos: {e}")
         return {}
@@ -80,8 +183,23 @@ def admin():
     """Panel de administración"""
     return render_template('admin.html')
 
-@app.route('/api/upload', methods=['POST'])
-def upload_file():
+@app.route('/api/shows', methods=['GET'])
+def get_shows():
+    """Listar los podcasts de esta instalación"""
+    shows = []
+    for show_id in registry.show_ids():
+        manager = registry.get(show_id)
+        shows.append({
+            'id': show_id,
+            'title': manager.config['title'],
+            'rss_url': f"{manager.server_config['base_url']}{manager.server_config['rss_path']}",
+            'default': show_id == registry.default_show
+        })
+    return jsonify(shows)
+
+@app.route('/api/upload', methods=['POST'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/upload', methods=['POST'])
+def upload_file(show_id):
     """API para subir archivos y extraer metadatos"""
     if 'file' not in request.files:
         return jsonify({'error': 'No se encontró archivo'}), 400
@@ -94,46 +212,212 @@ def upload_file():
         filename = secure_filename(file.filename)
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(file_path)
-        
-        # Extraer metadatos
-        metadata = extract_mp3_metadata(file_path)
-        
-        # Obtener episodios existentes para sugerir número
-        episodes = podcast_manager.episode_manager.get_episodes()
-        next_episode = len(episodes) + 1 if episodes else 1
-        
-        return jsonify({
-            'success': True,
-            'filename': filename,
-            'metadata': metadata,
-            'suggested_episode': next_episode,
-            'file_path': file_path
-        })
+        return uploaded_file_response(show_id, filename, file_path)
     
     return jsonify({'error': 'Formato de archivo no válido. Solo se permiten archivos MP3'}), 400
 
-@app.route('/api/episodes', methods=['GET'])
-def get_episodes():
-    """Obtener lista de episodios"""
-    episodes = podcast_manager.episode_manager.get_episodes()
-    return jsonify([ep.to_dict() for ep in episodes])
+def uploaded_file_info(show_id, filename, file_path):
+    """Metadatos del archivo recién subido y número de episodio sugerido"""
+    # Extraer metadatos
+    metadata = extract_mp3_metadata(file_path)
+    
+    # Obtener episodios existentes para sugerir número
+    episodes = get_show(show_id).episode_manager.get_episodes()
+    next_episode = len(episodes) + 1 if episodes else 1
+    
+    return {
+        'success': True,
+        'filename': filename,
+        'metadata': metadata,
+        'suggested_episode': next_episode,
+        'file_path': file_path
+    }
+
+def uploaded_file_response(show_id, filename, file_path):
+    """
+    Respuesta a una subida terminada: los metadatos se extraen en un trabajo
+    (202 con el trabajo que hay que consultar en /api/jobs/<id>). Con la cola
+    llena se extraen aquí, como antes.
+    """
+    get_show(show_id)
+    try:
+        job = job_queue.submit('probe', {'show_id': show_id, 'filename': filename})
+    except JobQueueFullError:
+        return jsonify(uploaded_file_info(show_id, filename, file_path))
+    return jsonify({
+        'success': True,
+        'filename': filename,
+        'file_path': file_path,
+        'job': job
+    }), 202, {'Location': f"/api/jobs/{job['id']}"}
+
+def upload_headers(info):
+    """Cabeceras tus con el estado de una subida"""
+    return {
+        'Tus-Resumable': '1.0.0',
+        'Upload-Offset': str(UploadStore.offset(info)),
+        'Upload-Length': str(info['size']),
+        'Cache-Control': 'no-store'
+    }
 
-@app.route('/api/episodes', methods=['POST'])
-def add_episode():
+@app.route('/api/uploads', methods=['POST'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/uploads', methods=['POST'])
+def create_upload(show_id):
+    """
+    Crear una subida reanudable
+    
+    Upload-Length: tamaño total; Upload-Metadata: "filename <base64>" (tus).
+    Devuelve 201 con Location, el id y el tamaño de trozo recomendado.
+    """
+    get_show(show_id)
+    try:
+        size = int(request.headers.get('Upload-Length', ''))
+        metadata = {}
+        for pair in request.headers.get('Upload-Metadata', '').split(','):
+            if pair.strip():
+                key, _, value = pair.strip().partition(' ')
+                metadata[key] = base64.b64decode(value).decode('utf-8')
+        filename = secure_filename(metadata.get('filename', ''))
+    except ValueError:
+        return jsonify({'error': 'Faltan Upload-Length o Upload-Metadata válidos'}), 400
+    if not filename.lower().endswith('.mp3'):
+        return jsonify({'error': 'Formato de archivo no válido. Solo se permiten archivos MP3'}), 400
+    if size > app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({'error': 'El archivo es demasiado grande'}), 413
+    
+    info = upload_store.create(filename, size)
+    response = jsonify({'id': info['id'], 'chunk_size': upload_store.chunk_size, 'size': size})
+    response.status_code = 201
+    response.headers.update(upload_headers(info))
+    response.headers['Location'] = f"{request.path.rstrip('/')}/{info['id']}"
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['HEAD', 'GET'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/uploads/<upload_id>', methods=['HEAD', 'GET'])
+def get_upload(show_id, upload_id):
+    """Estado de una subida: Upload-Offset y, en el cuerpo, los rangos recibidos"""
+    info = upload_store.get(upload_id)
+    if info is None:
+        return jsonify({'error': 'Subida no encontrada'}), 404
+    response = jsonify({'id': info['id'], 'size': info['size'], 'received': info['received'],
+                        'offset': UploadStore.offset(info), 'chunk_size': upload_store.chunk_size})
+    response.headers.update(upload_headers(info))
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['PATCH'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/uploads/<upload_id>', methods=['PATCH'])
+def upload_chunk(show_id, upload_id):
+    """
+    Recibir un trozo (Content-Type: application/offset+octet-stream)
+    
+    Upload-Offset indica dónde va y Upload-Checksum (opcional) su checksum.
+    Los trozos pueden enviarse en paralelo y en cualquier orden.
+    """
+    if request.mimetype != 'application/offset+octet-stream':
+        return jsonify({'error': 'Content-Type debe ser application/offset+octet-stream'}), 415
+    if request.content_length is None:
+        # Sin Content-Length (chunked) no se puede saber si el trozo llegó entero
+        return jsonify({'error': 'Falta Content-Length'}), 411
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        info = upload_store.write_chunk(upload_id, offset, request.stream,
+                                        request.content_length,
+                                        request.headers.get('Upload-Checksum'))
+    except KeyError:
+        return jsonify({'error': 'Subida no encontrada'}), 404
+    except ChecksumMismatchError as e:
+        # 460: código de tus para un checksum que no coincide
+        return jsonify({'error': str(e)}), 460
+    except UploadOffsetError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return '', 204, upload_headers(info)
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(show_id, upload_id):
+    """Cerrar una subida completa: mismo resultado que /api/upload"""
+    info = upload_store.get(upload_id)
+    if info is None:
+        return jsonify({'error': 'Subida no encontrada'}), 404
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], info['filename'])
+    try:
+        upload_store.finish(upload_id, file_path)
+    except KeyError:
+        return jsonify({'error': 'Subida no encontrada'}), 404
+    except UploadOffsetError as e:
+        return jsonify({'error': str(e)}), 409
+    return uploaded_file_response(show_id, info['filename'], file_path)
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(show_id, upload_id):
+    """Cancelar una subida"""
+    if not upload_store.delete(upload_id):
+        return jsonify({'error': 'Subida no encontrada'}), 404
+    return '', 204, {'Tus-Resumable': '1.0.0'}
+
+@app.route('/api/episodes', methods=['GET'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/episodes', methods=['GET'])
+def get_episodes(show_id):
+    """
+    Obtener lista de episodios
+    
+    Sin parámetros devuelve el catálogo completo (como antes). Con limit,
+    cursor, season, from, to o since devuelve una página:
+    {"episodes", "next_cursor", "has_more", "total", "deleted", "next_since", "reset"}
+    """
+    manager = get_show(show_id)
+    query_params = ('limit', 'cursor', 'season', 'from', 'to', 'since')
+    if not any(param in request.args for param in query_params):
+        return jsonify(full_catalog(manager))
+    
+    try:
+        page = manager.episode_manager.query(
+            limit=request.args.get('limit', 50, type=int),
+            cursor=request.args.get('cursor') or None,
+            season=request.args.get('season', type=int),
+            date_from=request.args.get('from') or None,
+            date_to=request.args.get('to') or None,
+            since=request.args.get('since') or None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(page.to_dict())
+
+# Catálogo completo serializado por show, reutilizado mientras no cambie
+_full_catalogs = {}
+
+def full_catalog(manager):
+    """Lista de episodios en dict, serializada solo cuando cambia el almacén"""
+    generation = manager.episode_manager.generation
+    cached = _full_catalogs.get(manager.show_id)
+    if cached is None or cached[0] != generation:
+        cached = _full_catalogs[manager.show_id] = (
+            generation, [ep.to_dict() for ep in manager.episode_manager.get_episodes()])
+    return cached[1]
+
+@app.route('/api/episodes', methods=['POST'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/episodes', methods=['POST'])
+def add_episode(show_id):
     """Añadir nuevo episodio"""
+    manager = get_show(show_id)
     try:
         data = request.json
         
-        # Mover archivo de uploads a episodes
-        source_path = data['file_path']
-        filename = os.path.basename(source_path)
-        dest_path = os.path.join(app.config['EPISODES_FOLDER'], filename)
-        
-        if os.path.exists(source_path):
-            os.rename(source_path, dest_path)
+        # Mover archivo de uploads a la carpeta de episodios del show. Solo el
+        # nombre que devolvió la subida: nada fuera de UPLOAD_FOLDER
+        filename = data.get('filename') or ''
+        source_path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+        if source_path is None or filename != secure_filename(filename) or not os.path.isfile(source_path):
+            return jsonify({'error': 'Archivo subido no encontrado'}), 400
+        os.makedirs(manager.episodes_folder, exist_ok=True)
+        dest_path = os.path.join(manager.episodes_folder, filename)
+        os.rename(source_path, dest_path)
         
         # Añadir episodio
-        podcast_manager.add_new_episode(
+        manager.add_new_episode(
             title=data['title'],
             description=data['description'],
             audio_filename=filename,
@@ -144,37 +428,450 @@ def add_episode():
         )
         
         return jsonify({'success': True, 'message': 'Episodio añadido exitosamente'})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/episodes/<int:index>', methods=['DELETE'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/episodes/<int:index>', methods=['DELETE'])
+def delete_episode(show_id, index):
+    """Ruta antigua por posición: borraba el episodio equivocado si la lista cambiaba entre medias"""
+    path = f"/api/shows/{show_id}/episodes/id/<id>" if show_id else "/api/episodes/id/<id>"
+    return jsonify({'error': f'Ya no se puede eliminar por posición; usa DELETE {path}'}), 410
+
+@app.route('/api/episodes/id/<episode_id>', methods=['GET'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/episodes/id/<episode_id>', methods=['GET'])
+def get_episode_by_id(show_id, episode_id):
+    """Obtener un episodio por su id estable"""
+    episode = get_show(show_id).episode_manager.get_episode(episode_id)
+    if episode is None:
+        return jsonify({'error': 'Episodio no encontrado'}), 404
+    return jsonify(episode.to_dict())
+
+@app.route('/api/episodes/id/<episode_id>', methods=['PUT'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/episodes/id/<episode_id>', methods=['PUT'])
+def update_episode_by_id(show_id, episode_id):
+    """Editar un episodio por su id estable"""
+    manager = get_show(show_id)
+    try:
+        episode = manager.episode_manager.get_episode(episode_id)
+        if episode is None:
+            return jsonify({'error': 'Episodio no encontrado'}), 404
         
+        data = episode.to_dict()
+        editable_fields = ['title', 'description', 'duration', 'pub_date',
+                           'episode_number', 'season', 'tracklist']
+        data.update({field: value for field, value in request.json.items() if field in editable_fields})
+        
+        manager.episode_manager.update_episode_by_id(episode_id, Episode.from_dict(data))
+        manager.request_rss_update()
+        return jsonify({'success': True, 'message': 'Episodio actualizado'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/episodes/<int:episode_id>', methods=['DELETE'])
-def delete_episode(episode_id):
-    """Eliminar episodio"""
+@app.route('/api/episodes/id/<episode_id>', methods=['DELETE'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/episodes/id/<episode_id>', methods=['DELETE'])
+def delete_episode_by_id(show_id, episode_id):
+    """Eliminar episodio por su id estable"""
+    manager = get_show(show_id)
     try:
-        episodes = podcast_manager.episode_manager.get_episodes()
-        if 0 <= episode_id < len(episodes):
-            podcast_manager.episode_manager.delete_episode(episode_id)
-            podcast_manager.update_rss()
+        if manager.episode_manager.delete_episode_by_id(episode_id):
+            manager.request_rss_update()
             return jsonify({'success': True, 'message': 'Episodio eliminado'})
         else:
             return jsonify({'error': 'Episodio no encontrado'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/rss/update', methods=['POST'])
-def update_rss():
-    """Actualizar RSS manualmente"""
+@app.route('/api/rss/update', methods=['POST'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/rss/update', methods=['POST'])
+def update_rss(show_id):
+    """Actualizar RSS manualmente (en segundo plano, sin esperar a la ventana)"""
+    manager = get_show(show_id)
     try:
-        podcast_manager.update_rss()
-        return jsonify({'success': True, 'message': 'RSS actualizado'})
+        manager.rss_scheduler.request(delay=0)
+        return jsonify({'success': True, 'message': 'Actualización del RSS en curso',
+                        'status': manager.rss_scheduler.status()}), 202
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/episodes/<filename>')
-def serve_episode(filename):
+@app.route('/api/rss/status', methods=['GET'], defaults={'show_id': None})
+@app.route('/api/shows/<show_id>/rss/status', methods=['GET'])
+def rss_status(show_id):
+    """Estado de la regeneración del RSS: idle, pending o building, y la última duración"""
+    return jsonify(get_show(show_id).rss_scheduler.status())
+
+@app.route('/api/rss/update-all', methods=['POST'])
+def update_all_rss():
+    """Regenerar el RSS de todos los shows en paralelo (en un trabajo)"""
+    return submit_job_response('rebuild_all', {})
+
+# Trabajos en segundo plano. Cada función recibe los parámetros del trabajo y
+# devuelve su resultado (JSON); si lanza una excepción el trabajo se reintenta
+# hasta max_attempts veces y después queda como fallido
+
+def probe_job(filename, show_id=None):
+    """Metadatos de un archivo ya subido a UPLOAD_FOLDER"""
+    file_path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+    if file_path is None or not os.path.isfile(file_path):
+        raise FileNotFoundError(f"Archivo no encontrado: {filename}")
+    if registry.get(show_id) is None:
+        raise ValueError(f"Show desconocido: {show_id}")
+    return uploaded_file_info(show_id, filename, file_path)
+
+def rebuild_job(show_id=None):
+    """Regenera el RSS (y el JSON Feed) de un show"""
+    manager = registry.get(show_id)
+    if manager is None:
+        raise ValueError(f"Show desconocido: {show_id}")
+    manager.update_rss()
+    feed_cache.invalidate()
+    return {'episodes': len(manager.episode_manager.get_episodes())}
+
+def rebuild_all_job():
+    """Regenera el RSS de todos los shows en paralelo"""
+    results = registry.rebuild_feeds()
+    feed_cache.invalidate()
+    failed = [show_id for show_id, count in results.items() if count is None]
+    if failed:
+        raise RuntimeError(f"Error regenerando: {', '.join(failed)}")
+    return {'episodes': results}
+
+def deploy_job():
+    """
+    Los pasos de deploy_all.py dentro del servidor: regenerar el RSS, subir
+    episodios y RSS (update_podcast.py) y subir la web (upload_web.py)
+    
+    Solo para el show por defecto: los archivos que se suben y las rutas
+    remotas de .env son los suyos. Las credenciales se leen de .env sin
+    cambiar el entorno del servidor.
+    """
+    # paramiko y dotenv solo hacen falta para desplegar
+    from load_env import read_env_file
+    from update_podcast import update_podcast
+    from upload_web import upload_web_frontend
+    
+    env = read_env_file()
+    if env is None:
+        raise RuntimeError("Falta el archivo .env con las credenciales del servidor")
+    steps = rebuild_job()
+    if not update_podcast(env):
+        raise RuntimeError("Error subiendo episodios y RSS")
+    if not upload_web_frontend(env):
+        raise RuntimeError("Error subiendo el frontend web")
+    steps['deployed'] = True
+    return steps
+
+# Tipos de trabajo: función e intentos como mucho (init_app los registra)
+JOB_HANDLERS = {
+    'probe': (probe_job, 1),
+    'rebuild': (rebuild_job, 2),
+    'rebuild_all': (rebuild_all_job, 2),
+    # Un despliegue fallido puede haber subido parte de los archivos: no se
+    # repite solo, se reintenta a mano con /api/jobs/<id>/retry
+    'deploy': (deploy_job, 1),
+}
+
+def submit_job_response(kind, params):
+    """202 con el trabajo encolado (Location: /api/jobs/<id>)"""
+    try:
+        job = job_queue.submit(kind, params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except JobQueueFullError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    return jsonify({'success': True, 'job': job}), 202, {'Location': f"/api/jobs/{job['id']}"}
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Encolar un trabajo: {"kind": "deploy", "params": {...}}"""
+    data = request.get_json(silent=True) or {}
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'error': 'params debe ser un objeto'}), 400
+    return submit_job_response(data.get('kind'), params)
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Trabajos más recientes, filtrando con ?kind=...&status=...&limit=..."""
+    status = request.args.get('status')
+    if status and status not in STATUSES:
+        return jsonify({'error': f"Estado no válido: {status}"}), 400
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify({'jobs': job_queue.list(request.args.get('kind'), status, limit),
+                    'kinds': job_queue.kinds()})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Estado de un trabajo: queued, running, succeeded o failed, con su resultado"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/retry', methods=['POST'])
+def retry_job(job_id):
+    """Volver a encolar un trabajo fallido"""
+    try:
+        job = job_queue.retry(job_id)
+    except JobQueueFullError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    if job is None:
+        return jsonify({'error': 'Solo se pueden reintentar trabajos fallidos'}), 409
+    return jsonify({'success': True, 'job': job}), 202, {'Location': f"/api/jobs/{job_id}"}
+
+def feed_response(path, mimetype):
+    """
+    Respuesta con un documento del feed, con GET condicional y gzip
+    
+    ETag fuerte (distinto para la versión gzip) y Last-Modified; si el
+    cliente ya tiene esa versión se responde 304 sin cuerpo.
+    """
+    document = feed_cache.get(path, mimetype) if path else None
+    if document is None:
+        abort(404)
+    
+    use_gzip = document.gzip_body is not None and request.accept_encodings['gzip'] > 0
+    etag = document.gzip_etag() if use_gzip else document.etag
+    headers = {
+        'Cache-Control': FEED_CACHE_CONTROL,
+        'Vary': 'Accept-Encoding'
+    }
+    
+    # If-None-Match manda sobre If-Modified-Since (RFC 9110)
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = (request.if_modified_since is not None
+                        and document.last_modified <= request.if_modified_since)
+    if not_modified:
+        response = Response(status=304, headers=headers)
+    else:
+        response = Response(document.gzip_body if use_gzip else document.body,
+                            content_type=document.mimetype, headers=headers)
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.last_modified = document.last_modified
+    return response
+
+@app.route('/podcast.xml', defaults={'show_id': None})
+@app.route('/shows/<show_id>/podcast.xml')
+def serve_feed(show_id):
+    """RSS del show"""
+    return feed_response(get_show(show_id).rss_file, RSS_MIMETYPE)
+
+@app.route('/podcast-archive-<int:page>.xml', defaults={'show_id': None})
+@app.route('/shows/<show_id>/podcast-archive-<int:page>.xml')
+def serve_feed_archive(show_id, page):
+    """Página de archivo del RSS (RFC 5005)"""
+    return feed_response(archive_file(get_show(show_id).rss_file, page), RSS_MIMETYPE)
+
+@app.route('/podcast.json', defaults={'show_id': None})
+@app.route('/shows/<show_id>/podcast.json')
+def serve_json_feed(show_id):
+    """JSON Feed del show"""
+    return feed_response(get_show(show_id).json_feed_file, JSON_FEED_MIMETYPE)
+
+# Los audios no cambian una vez publicados (uno nuevo lleva otro nombre)
+AUDIO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Más rangos que estos en una petición se responden con el archivo entero
+MAX_RANGES = 16
+
+AUDIO_READ_SIZE = 64 * 1024
+
+audio_streams = threading.BoundedSemaphore(app.config['MAX_AUDIO_STREAMS'])
+
+class AudioStreamFile(io.FileIO):
+    """
+    Archivo de audio que devuelve su plaza de MAX_AUDIO_STREAMS al cerrarse
+    
+    El servidor WSGI cierra el cuerpo de la respuesta al terminar de enviarlo
+    (o si el cliente corta), y eso cierra el archivo.
+    """
+    
+    def close(self):
+        if not self.closed:
+            try:
+                super().close()
+            finally:
+                audio_streams.release()
+
+def parse_ranges(size):
+    """Rangos pedidos como (inicio, fin exclusivo), ordenados y fusionados"""
+    ranges = []
+    for begin, end in request.range.ranges:
+        if begin < 0:
+            start, stop = max(0, size + begin), size
+        else:
+            start, stop = begin, min(end if end is not None else size, size)
+        if start < stop:
+            ranges.append([start, stop])
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return merged
+
+def if_range_matches(etag, last_modified):
+    """If-Range: sin cabecera o con el ETag (fuerte) o fecha actuales"""
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return last_modified <= if_range.date
+    return True
+
+class FileRange:
+    """
+    Los bytes [start, stop) de un archivo abierto, como objeto tipo archivo
+    
+    read() no pasa de stop y tell()/seek() usan posiciones del archivo, así
+    que sirve tanto para leer por bloques como para sendfile (con
+    remaining, o con Content-Length en gunicorn).
+    """
+    
+    def __init__(self, f, start, stop):
+        self.file = f
+        self.stop = stop
+        self.position = start
+        f.seek(start)
+    
+    @property
+    def remaining(self):
+        return max(0, self.stop - self.position)
+    
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        if not size:
+            return b""
+        if self.file.tell() != self.position:
+            self.file.seek(self.position)
+        data = self.file.read(size)
+        self.position += len(data)
+        return data
+    
+    def seek(self, position, whence=os.SEEK_SET):
+        if whence != os.SEEK_SET:
+            raise io.UnsupportedOperation("solo posiciones absolutas")
+        self.position = position
+        return self.file.seek(position)
+    
+    def tell(self):
+        return self.position
+    
+    def fileno(self):
+        return self.file.fileno()
+    
+    def close(self):
+        self.file.close()
+
+def file_body(f, start, stop):
+    """
+    Cuerpo con los bytes [start, stop) del archivo
+    
+    Con wsgi.file_wrapper del servidor (production_server.py, gunicorn...)
+    se envía con sendfile; si no, se lee por bloques. En ambos casos no se
+    pasa de stop.
+    """
+    return wrap_file(request.environ, FileRange(f, start, stop), AUDIO_READ_SIZE)
+
+def read_ranges(f, parts, closing, separator=b"\r\n"):
+    """Cuerpo multipart/byteranges: cada parte con sus cabeceras y sus bytes"""
+    try:
+        for header, start, stop in parts:
+            yield header
+            f.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                block = f.read(min(AUDIO_READ_SIZE, remaining))
+                if not block:
+                    return
+                remaining -= len(block)
+                yield block
+            yield separator
+        yield closing
+    finally:
+        f.close()
+
+def audio_response(folder, filename, media_index):
+    """
+    Audio con Range (uno o varios rangos), If-Range, ETag fuerte y caché larga
+    
+    Un archivo completo o un único rango se entregan con wsgi.file_wrapper,
+    que production_server.py y otros servidores WSGI (gunicorn...) envían
+    con sendfile sin copiar los datos al proceso. Cada respuesta ocupa una plaza de
+    MAX_AUDIO_STREAMS hasta que termina de enviarse.
+    """
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    if not audio_streams.acquire(blocking=False):
+        return jsonify({'error': 'Demasiadas descargas simultáneas'}), 503, {'Retry-After': '5'}
+    try:
+        f = AudioStreamFile(path, 'rb')
+    except OSError:
+        audio_streams.release()
+        abort(404)
+    
+    try:
+        stat = os.fstat(f.fileno())
+        entry = media_index.entry(filename, stat) if media_index else None
+        size = stat.st_size
+        etag = entry["etag"] if entry else f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+        mimetype = entry["mime_type"] if entry else mime_type_for_name(filename)
+        last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+        headers = {'Accept-Ranges': 'bytes', 'Cache-Control': AUDIO_CACHE_CONTROL}
+        
+        ranges = None
+        if request.range and request.range.units == 'bytes' and if_range_matches(etag, last_modified):
+            ranges = parse_ranges(size)
+        if request.if_none_match and request.if_none_match.contains_weak(etag):
+            response = Response(status=304, headers=headers)
+            f.close()
+        elif ranges is not None and not ranges:
+            headers['Content-Range'] = f"bytes */{size}"
+            response = Response(status=416, headers=headers)
+            f.close()
+        elif ranges and len(ranges) == 1:
+            start, stop = ranges[0]
+            headers['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+            response = Response(file_body(f, start, stop), status=206, mimetype=mimetype,
+                                headers=headers, direct_passthrough=True)
+            response.content_length = stop - start
+        elif ranges and len(request.range.ranges) <= MAX_RANGES:
+            boundary = uuid.uuid4().hex
+            parts = [((f"--{boundary}\r\nContent-Type: {mimetype}\r\n"
+                       f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n").encode('ascii'), start, stop)
+                     for start, stop in ranges]
+            closing = f"--{boundary}--\r\n".encode('ascii')
+            length = sum(len(header) + stop - start + 2 for header, start, stop in parts) + len(closing)
+            response = Response(read_ranges(f, parts, closing), status=206, headers=headers,
+                                content_type=f"multipart/byteranges; boundary={boundary}",
+                                direct_passthrough=True)
+            response.content_length = length
+        else:
+            response = Response(file_body(f, 0, size), mimetype=mimetype,
+                                headers=headers, direct_passthrough=True)
+            response.content_length = size
+    except BaseException:
+        f.close()
+        raise
+    
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+@app.route('/episodes/<filename>', defaults={'show_id': None})
+@app.route('/shows/<show_id>/episodes/<filename>')
+def serve_episode(show_id, filename):
     """Servir archivos de episodios"""
-    return send_from_directory(app.config['EPISODES_FOLDER'], filename)
+    manager = get_show(show_id)
+    return audio_response(manager.episodes_folder, filename, manager.media_index)
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8080)
@@ -66,7 +66,11 @@ class AdminViewer {
     }
 
     async init() {
-        await this.loadPodcastData();
+        // episodes.json lo genera el mismo proceso que el RSS; si no está, se
+        // lee el RSS como antes
+        if (!(await this.loadPodcastIndex())) {
+            await this.loadPodcastData();
+        }
         // Inicializar con todos los episodios
         this.filteredEpisodes = [...this.episodes];
         this.renderPodcastInfo();
@@ -75,6 +79,32 @@ class AdminViewer {
         this.updateEpisodeCount();
     }
 
+    async loadPodcastIndex() {
+        try {
+            const response = await fetch('episodes.json');
+            if (!response.ok) {
+                return false;
+            }
+            
+            const data = await response.json();
+            this.podcastInfo = data.podcast;
+            this.episodes = data.episodes.map(episode => ({
+                title: episode.title || 'Sin título',
+                description: episode.description || '',
+                audio_url: episode.audio_url || '',
+                pub_date: episode.pub_date || '',
+                duration: this.formatDuration(episode.duration ? String(episode.duration) : ''),
+                episode_number: episode.episode_number || null,
+                season: episode.season || null,
+                tracklist: episode.tracklist || []
+            }));
+            return true;
+        } catch (error) {
+            console.warn('No se pudo cargar episodes.json, se usa el RSS:', error);
+            return false;
+        }
+    }
+
     async loadPodcastData() {
         try {
             const response = await fetch('rss.xml');
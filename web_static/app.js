@@ -8,6 +8,7 @@ class PodcastViewer {
         this.filteredEpisodes = [];
         this.currentFilter = 'all';
         this.initializeNavigation();
+        this.initializePlayback();
         this.init();
     }
 
@@ -23,6 +24,24 @@ class PodcastViewer {
         });
     }
 
+    initializePlayback() {
+        // Un solo listener para los botones de reproducir (también los de la web estática):
+        // la URL va en data-audio-url y nunca se ejecuta como código
+        if (PodcastViewer.playbackBound) return;
+        PodcastViewer.playbackBound = true;
+        document.addEventListener('click', (e) => {
+            const button = e.target.closest('[data-audio-url]');
+            if (button) {
+                this.playEpisode(button.dataset.audioUrl);
+            }
+        });
+    }
+
+    escapeAttribute(value) {
+        return String(value ?? '').replace(/&/g, '&amp;').replace(/"/g, '&quot;')
+            .replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    }
+
     updateActiveNavButton(activeButton) {
         // Remover clase active de todos los botones
         document.querySelectorAll('.nav-btn').forEach(btn => {
@@ -65,13 +84,49 @@ class PodcastViewer {
     }
 
     async init() {
-        await this.loadEpisodesFromRSS();
+        // episodes.json lo genera el mismo proceso que el RSS; si no está, se
+        // lee el RSS como antes
+        if (!(await this.loadEpisodesFromIndex())) {
+            await this.loadEpisodesFromRSS();
+        }
         // Inicializar con todos los episodios
         this.filteredEpisodes = [...this.episodes];
         this.renderEpisodes();
         this.updateEpisodeCount();
     }
 
+    async loadEpisodesFromIndex() {
+        try {
+            const response = await fetch('episodes.json');
+            if (!response.ok) {
+                return false;
+            }
+            
+            const data = await response.json();
+            this.episodes = data.episodes.map(episode => {
+                let formattedDate = '';
+                if (episode.pub_date) {
+                    formattedDate = new Date(episode.pub_date).toLocaleDateString('es-ES');
+                }
+                return {
+                    title: episode.title || 'Sin título',
+                    description: episode.description || '',
+                    audio_url: episode.audio_url || '',
+                    pub_date: episode.pub_date || '',
+                    formatted_date: formattedDate,
+                    duration: this.formatDuration(episode.duration ? String(episode.duration) : ''),
+                    episode_number: episode.episode_number || null,
+                    season: episode.season || null,
+                    tracklist: episode.tracklist || []
+                };
+            });
+            return true;
+        } catch (error) {
+            console.warn('No se pudo cargar episodes.json, se usa el RSS:', error);
+            return false;
+        }
+    }
+
     async loadEpisodesFromRSS() {
         try {
             // Cargar el RSS XML
@@ -186,10 +241,10 @@ class PodcastViewer {
                         </div>
                     </div>
                     <div class="episode-actions">
-                        <button class="btn btn-small btn-outline" onclick="podcastViewer.playEpisode('${episode.audio_url}')">
+                        <button class="btn btn-small btn-outline" data-audio-url="${this.escapeAttribute(episode.audio_url)}">
                             <i class="fas fa-play"></i> Reproducir
                         </button>
-                        <a href="${episode.audio_url}" download class="btn btn-small btn-secondary">
+                        <a href="${this.escapeAttribute(episode.audio_url)}" download class="btn btn-small btn-secondary">
                             <i class="fas fa-download"></i> Descargar
                         </a>
                     </div>